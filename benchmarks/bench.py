@@ -0,0 +1,196 @@
+# -*- coding: utf-8 -*-
+"""
+Benchmarks of the public functions of photoprotectionpy.
+
+Times ispf, adjspf (every mode, solver and integration), uvapf, uvdose
+and criticalwave on synthetic batches, recording throughput (treatments
+per second) and peak traced memory, and compares them to a stored
+baseline. The "import" case times ``import photoprotectionpy`` in a
+fresh interpreter, excluding numpy, and fails if SciPy gets imported.
+Runs offline with only the package dependencies.
+
+Usage::
+
+    python benchmarks/bench.py                    # compare to baseline.json
+    python benchmarks/bench.py --save             # record a new baseline
+    python benchmarks/bench.py --sizes 1 100 1000 --only ispf criticalwave
+
+Exits with status 1 when a case is slower than the baseline throughput
+divided by --slowdown, or uses more than --memory times its peak memory.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+import tracemalloc
+import numpy as np
+SRC=os.path.join(os.path.dirname(os.path.abspath(__file__)),os.pardir,"src")
+sys.path.insert(0,SRC)
+import photoprotectionpy as pp
+
+BASELINE=os.path.join(os.path.dirname(os.path.abspath(__file__)),"baseline.json")
+SIZES=[1,100,10000,100000]
+
+def synthetic(size,seed=0):
+    """
+    Sunscreen-like absorbance spectra, 111 rows by size columns.
+    """
+    rng=np.random.default_rng(seed)
+    wavelengths=np.arange(290,401)
+    shape=1.6*np.exp(-(wavelengths-290)/60)[:,None]+0.4*np.exp(-((wavelengths-355)/25)**2)[:,None]
+    return shape*rng.uniform(0.6,1.4,size)+rng.normal(0,0.01,(111,size))
+
+def targets(size,seed=0):
+    """
+    Target SPF of each synthetic column.
+    """
+    return np.random.default_rng(seed+1).uniform(8,25,size)
+
+_buffers={}
+
+def buffers(A):
+    """
+    float32 copy of A with output and workspace arrays, prepared once
+    per batch so that only the evaluation itself is measured.
+    """
+    if _buffers.get("source") is not A:
+        _buffers.update(source=A,data=A.astype(np.float32),out=np.empty(A.shape[1],np.float32),
+                        workspace=np.empty(A.size,np.float32))
+    return _buffers["data"],_buffers["out"],_buffers["workspace"]
+
+# An in-house weighting, to check that registered spectra cost the same
+# as the built-in tables.
+pp.register_spectrum("bench",np.linspace(1,0.1,111))
+
+# name: (call, largest size). Each call takes the data and targets and
+# returns nothing; the step solver is limited to smaller batches.
+CASES={
+    "ispf/trapz":(lambda A,T:pp.ispf(A,"trapz",axis=0),None),
+    "ispf/simpson":(lambda A,T:pp.ispf(A,"simpson",axis=0),None),
+    "ispf/registered":(lambda A,T:pp.ispf(A,axis=0,spectrum="bench"),None),
+    "ispf/float32":(lambda A,T:pp.ispf(buffers(A)[0],axis=0,out=buffers(A)[1],workspace=buffers(A)[2]),None),
+    "adjspf/adj/trapz":(lambda A,T:pp.adjspf(A,"adj",1.2,integration="trapz",axis=0),None),
+    "adjspf/adj/simpson":(lambda A,T:pp.adjspf(A,"adj",1.2,integration="simpson",axis=0),None),
+    "adjspf/calc/step/trapz":(lambda A,T:pp.adjspf(A,"calc",T,parameters=[1e-3,5000],integration="trapz",axis=0),10000),
+    "adjspf/calc/step/simpson":(lambda A,T:pp.adjspf(A,"calc",T,parameters=[1e-3,5000],integration="simpson",axis=0),10000),
+    "adjspf/calc/newton/trapz":(lambda A,T:pp.adjspf(A,"calc",T,integration="trapz",solver="newton",axis=0),None),
+    "adjspf/calc/newton/simpson":(lambda A,T:pp.adjspf(A,"calc",T,integration="simpson",solver="newton",axis=0),None),
+    "adjspf/calc/bisect/trapz":(lambda A,T:pp.adjspf(A,"calc",T,integration="trapz",solver="bisect",axis=0),None),
+    "adjspf/all/step/trapz":(lambda A,T:pp.adjspf(A,"all",T,parameters=[1e-3,5000],integration="trapz",axis=0),10000),
+    "adjspf/all/newton/trapz":(lambda A,T:pp.adjspf(A,"all",T,integration="trapz",solver="newton",axis=0),None),
+    "adjspf/all/newton/simpson":(lambda A,T:pp.adjspf(A,"all",T,integration="simpson",solver="newton",axis=0),None),
+    "uvapf/trapz":(lambda A,T:pp.uvapf(A,1.2,"trapz",axis=0),None),
+    "uvapf/simpson":(lambda A,T:pp.uvapf(A,1.2,"simpson",axis=0),None),
+    "uvapf/float32":(lambda A,T:pp.uvapf(buffers(A)[0],1.2,axis=0,out=buffers(A)[1],workspace=buffers(A)[2]),None),
+    "uvdose":(lambda A,T:pp.uvdose(T),None),
+    "criticalwave/trapz":(lambda A,T:pp.criticalwave(A,"trapz",axis=0),None),
+    "criticalwave/simpson":(lambda A,T:pp.criticalwave(A,"simpson",axis=0),None),
+    "criticalwave/interpolate":(lambda A,T:pp.criticalwave(A,axis=0,interpolate=True),None),
+}
+
+def measure(call,size,repeat):
+    """
+    Best wall time of repeat runs and peak traced memory of one run.
+    """
+    A=synthetic(size)
+    T=targets(size)
+    call(A,T)
+    times=[]
+    for i in range(repeat):
+        start=time.perf_counter()
+        call(A,T)
+        times.append(time.perf_counter()-start)
+    tracemalloc.start()
+    call(A,T)
+    peak=tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return min(times),peak
+
+def import_time(repeat):
+    """
+    Best import time of the package in a fresh interpreter, minus the
+    time spent importing numpy, and the SciPy modules it pulled in.
+    """
+    times=[]
+    for i in range(repeat):
+        log=subprocess.run([sys.executable,"-X","importtime","-c","import photoprotectionpy"],
+                           env=dict(os.environ,PYTHONPATH=SRC),capture_output=True,text=True,check=True).stderr
+        cumulative={}
+        for line in log.splitlines()[1:]:
+            fields=line.split("|")
+            cumulative[fields[2].strip()]=int(fields[1])
+        times.append((cumulative["photoprotectionpy"]-cumulative.get("numpy",0))*1e-6)
+    return min(times),sorted(name for name in cumulative if name.split(".")[0]=="scipy")
+
+def run(sizes,names,repeat):
+    """
+    Run the selected cases and return their results by case and size.
+    """
+    results={}
+    if "import" in names:
+        seconds,scipy=import_time(repeat)
+        results["import"]={"seconds":seconds,"throughput":1/seconds,"peak_bytes":0,"scipy":scipy}
+        print("%-40s %12.1f ms%s"%("import",seconds*1e3," (imports scipy)" if scipy else ""))
+        names=[name for name in names if name!="import"]
+    for name in names:
+        call,largest=CASES[name]
+        for size in sizes:
+            if largest is not None and size>largest:
+                continue
+            seconds,peak=measure(call,size,repeat)
+            key="%s[%d]"%(name,size)
+            results[key]={"seconds":seconds,"throughput":size/seconds,"peak_bytes":peak}
+            print("%-40s %12.1f /s %10.1f KiB"%(key,size/seconds,peak/1024))
+    return results
+
+def compare(results,baseline,slowdown,memory):
+    """
+    List the cases that regressed with respect to the baseline.
+    """
+    failures=[]
+    for key,result in results.items():
+        if result.get("scipy"):
+            failures.append("%s: imports %s"%(key,", ".join(result["scipy"])))
+        if key not in baseline:
+            continue
+        reference=baseline[key]
+        if result["throughput"]<reference["throughput"]/slowdown:
+            failures.append("%s: %.1f/s, baseline %.1f/s"%(key,result["throughput"],reference["throughput"]))
+        # Small allocations fluctuate between runs; ignore anything under 64 KiB.
+        if result["peak_bytes"]>max(reference["peak_bytes"]*memory,65536):
+            failures.append("%s: %d bytes, baseline %d bytes"%(key,result["peak_bytes"],reference["peak_bytes"]))
+    return failures
+
+def main(argv=None):
+    parser=argparse.ArgumentParser(description=__doc__.split("\n\n")[0].strip())
+    parser.add_argument("--sizes",type=int,nargs="+",default=SIZES,help="numbers of columns")
+    parser.add_argument("--only",nargs="+",default=None,help="cases to run (prefix match)")
+    parser.add_argument("--repeat",type=int,default=3,help="timed runs per case")
+    parser.add_argument("--baseline",default=BASELINE,help="baseline JSON file")
+    parser.add_argument("--save",action="store_true",help="write the results as the new baseline")
+    parser.add_argument("--slowdown",type=float,default=2.0,help="allowed throughput loss factor")
+    parser.add_argument("--memory",type=float,default=1.5,help="allowed peak memory growth factor")
+    args=parser.parse_args(argv)
+    names=[name for name in ["import"]+list(CASES) if args.only is None or any(name.startswith(prefix) for prefix in args.only)]
+    results=run(args.sizes,names,args.repeat)
+    if args.save:
+        with open(args.baseline,"w") as handle:
+            json.dump({"machine":platform.platform(),"python":platform.python_version(),
+                       "numpy":np.__version__,"results":results},handle,indent=1,sort_keys=True)
+        print("Baseline written to %s"%args.baseline)
+        return 0
+    if not os.path.exists(args.baseline):
+        print("No baseline at %s, run with --save first"%args.baseline)
+        return 0
+    with open(args.baseline) as handle:
+        baseline=json.load(handle)["results"]
+    failures=compare(results,baseline,args.slowdown,args.memory)
+    for failure in failures:
+        print("REGRESSION",failure)
+    return 1 if failures else 0
+
+if __name__=="__main__":
+    sys.exit(main())
@@ -3,4 +3,37 @@ from .adjusted_spf import adjspf
 from .uva_protectionfactor import uvapf
 from .uv_exposuredose import uvdose
 from .critical_wavelength import criticalwave
-__all__ = ['ispf', 'adjspf', 'uvapf', 'uvadose', 'criticalwave']
+from .photostability import photostability
+from .bootstrap import bootstrap
+from .results import Results, as_results
+from .cache import ResultCache, enable_cache, disable_cache, cache_info
+from .validation import validate, ValidationError, ShapeError, OptionError, ColumnError
+from .instrumentation import instrument, add_listener, remove_listener
+__all__ = ['ispf', 'adjspf', 'uvapf', 'uvdose', 'criticalwave', 'iso24443', 'photostability', 'read_chunks', 'stream',
+           'archive_append', 'archive_open', 'archive_blocks', 'archive_evaluate',
+           'bootstrap', 'aggregate', 'screen', 'Dataset', 'Results', 'as_results', 'ResultCache', 'enable_cache', 'disable_cache', 'cache_info',
+           'register_spectrum', 'unregister_spectrum', 'list_spectra',
+           'validate', 'ValidationError', 'ShapeError', 'OptionError', 'ColumnError',
+           'instrument', 'add_listener', 'remove_listener']
+
+# Modules beyond the metrics are imported on first use, which keeps
+# "import photoprotectionpy" fast (see the import case of
+# benchmarks/bench.py). bootstrap and photostability stay eager: their
+# modules share the name of the function, which importing them later
+# would replace in the package namespace.
+_lazy = {'iso24443': 'pipeline', 'read_chunks': 'reader', 'stream': 'reader', 'aggregate': 'grouping',
+         'screen': 'screening', 'Dataset': 'dataset',
+         'register_spectrum': 'spectra', 'unregister_spectrum': 'spectra', 'list_spectra': 'spectra',
+         'archive_append': 'archive', 'archive_open': 'archive', 'archive_blocks': 'archive',
+         'archive_evaluate': 'archive'}
+
+def __getattr__(name):
+    if name not in _lazy:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    import importlib
+    value = getattr(importlib.import_module("." + _lazy[name], __name__), name)
+    globals()[name] = value
+    return value
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,413 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024 Santiago Guerrero-Higareda
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import functools
+import numpy as np
+from .validation import OptionError,ShapeError,_fail
+
+def _readonly(values):
+    """
+    Return values as a read-only float64 numpy.array.
+    """
+    array=np.array(values,dtype=np.float64)
+    array.flags.writeable=False
+    return array
+
+wavelengths=_readonly(np.arange(290,401))
+uva_wavelengths=wavelengths[30:]
+erythema=_readonly([1.0,1.0,1.0,1.0,1.0,1.0,1.0,1.0,1.0,0.805,0.649,0.522,0.421,0.339,0.273,0.22,0.177,0.143,0.115,0.0925,0.0745,0.06,0.0483,0.0389,
+                    0.0313,0.0252,0.0203,0.0164,0.0132,0.0106,0.00855,0.00689,0.00555,0.00447,0.0036,0.0029,0.00233,0.00188,0.00151,0.00141,0.00136,
+                    0.00132,0.00127,0.00123,0.00119,0.00115,0.00111,0.00107,0.00104,0.001,0.000966,0.000933,0.000902,0.000871,0.000841,0.000813,0.000785,
+                    0.000759,0.000733,0.000708,0.000684,0.000661,0.000638,0.000617,0.000596,0.000575,0.000556,0.000537,0.000519,0.000501,0.000484,0.000468,
+                    0.000452,0.000437,0.000422,0.000407,0.000394,0.00038,0.000367,0.000355,0.000343,0.000331,0.00032,0.000309,0.000299,0.000288,0.000279,
+                    0.000269,0.00026,0.000251,0.000243,0.000234,0.000226,0.000219,0.000211,0.000204,0.000197,0.000191,0.000184,0.000178,0.000172,0.000166,
+                    0.00016,0.000155,0.00015,0.000145,0.00014,0.000135,0.00013,0.000126,0.000122])
+uv_ssr=_readonly([8.74e-06,1.45e-05,2.66e-05,4.57e-05,0.000101,0.000259,0.000704,0.00168,0.00373,0.00794,0.0148,0.0251,0.0418,0.0622,0.0869,0.122,0.162,
+                  0.199,0.248,0.289,0.336,0.387,0.431,0.488,0.512,0.557,0.596,0.626,0.657,0.688,0.724,0.737,0.768,0.796,0.799,0.829,0.844,0.856,0.879,
+                  0.895,0.901,0.916,0.943,0.944,0.943,0.957,0.966,0.977,0.977,0.997,0.994,1.01,1.01,1.01,1.02,1.03,1.03,1.03,1.04,1.03,1.05,1.04,1.04,
+                  1.04,1.04,1.05,1.04,1.04,1.03,1.04,1.04,1.03,1.02,1.02,0.998,0.996,0.967,0.965,0.939,0.919,0.898,0.873,0.847,0.812,0.784,0.742,0.715,
+                  0.669,0.628,0.586,0.534,0.493,0.448,0.393,0.343,0.299,0.257,0.215,0.18,0.149,0.119,0.094,0.0727,0.0553,0.0401,0.0289,0.0207,0.014,
+                  0.00951,0.00619,0.00417])
+ppd=_readonly([1.0,0.975,0.95,0.925,0.9,0.875,0.85,0.825,0.8,0.775,0.75,0.725,0.7,0.675,0.65,0.625,
+               0.6,0.575,0.55,0.525,0.5,0.494,0.488,0.481,0.475,0.469,0.463,0.457,0.45,0.444,0.438,0.432,0.426,0.419,0.413,0.407,0.401,0.395,0.388,0.382,0.376,0.37,
+               0.364,0.357,0.351,0.345,0.339,0.333,0.326,0.32,0.314,0.308,0.302,0.295,0.289,0.283,0.277,0.271,0.264,0.258,0.252,0.246,0.24,0.233,0.227,0.221,0.215,
+               0.209,0.202,0.196,0.19,0.184,0.178,0.171,0.165,0.159,0.153,0.147,0.14,0.134,0.128])
+uva_source=_readonly([4.84e-06,8.47e-06,1.36e-05,2.07e-05,3.03e-05,4.29e-05,
+                      5.74e-05,7.6e-05,9.85e-05,0.000122,0.000151,0.000181,0.000213,0.000244,0.000283,0.000319,0.000359,0.000398,0.000439,0.000478,0.00052,
+                      0.000561,0.0006,0.000638,0.000674,0.000712,0.000747,0.000778,0.000818,0.000843,0.000875,0.000904,0.000929,0.000949,0.000973,0.000986,
+                      0.00101,0.00103,0.00105,0.00106,0.00108,0.00109,0.0011,0.0011,0.0011,0.0011,0.00109,0.00109,0.00108,0.00107,0.00105,0.00103,0.000995,
+                      0.00097,0.000937,0.000906,0.000876,0.000843,0.000806,0.000761,0.000711,0.000666,0.000612,0.000556,0.000499,0.000443,0.000388,0.000336,
+                      0.000287,0.000241,0.000201,0.000164,0.000131,0.000103,7.9e-05,5.98e-05,4.46e-05,3.26e-05,2.3e-05,1.58e-05,1.05e-05])
+effects={"spf":_readonly(erythema*uv_ssr),"uvapf":_readonly(ppd*uva_source)}
+# Kind of every effect spectrum: "spf" (111 readings from 290 nm) or
+# "uvapf" (81 readings from 320 nm).
+kinds={"spf":"spf","uvapf":"uvapf"}
+# Spectra added with register_spectrum, sent along to worker processes.
+registered={}
+
+def install(entries):
+    """
+    Add registered spectra {key: (kind, effect)} and drop the kernels
+    compiled from any spectrum they replace.
+    """
+    changed=False
+    for key,(kind,effect) in entries.items():
+        if effects.get(key) is not effect:
+            effects[key]=effect
+            kinds[key]=kind
+            registered[key]=(kind,effect)
+            changed=True
+    if changed:
+        kernel.cache_clear()
+        typed_kernel.cache_clear()
+
+def uninstall(key):
+    """
+    Remove a registered spectrum and the kernels compiled from it.
+    """
+    del effects[key],kinds[key],registered[key]
+    kernel.cache_clear()
+    typed_kernel.cache_clear()
+
+def check_spectrum(spectrum,kind,errors=None):
+    """
+    Key of the effect spectrum to use for a protection factor of the
+    given kind, kind itself by default, or None (after printing or
+    raising OptionError) when spectrum is not a registered key of that
+    kind.
+    """
+    if spectrum is None:
+        return kind
+    if not isinstance(spectrum,str) or kinds.get(spectrum)!=kind:
+        return _fail(errors,OptionError,"Error: Enter a registered %s spectrum"%kind.upper())
+    return spectrum
+
+def signature(name):
+    """
+    Tag identifying the weighting of name in cache keys; empty for
+    the built-in SPF spectrum so that existing entries stay valid.
+    """
+    if name=="spf":
+        return ()
+    import hashlib
+    return (name,hashlib.blake2b(effects[name].tobytes(),digest_size=16).hexdigest())
+
+@functools.lru_cache(maxsize=None)
+def weights(integration,n):
+    """
+    Quadrature weights of n readings taken 1 nm apart.
+
+    Parameters
+    ----------
+    integration : string
+        "trapz" or "simpson".
+    n : int
+        Number of readings.
+
+    Returns
+    -------
+    weights : numpy.array
+        Read-only weights w such that y @ w equals np.trapz(y)
+        or scipy.integrate.simpson(y) for any y of length n.
+
+    """
+    w=np.zeros(n)
+    if integration=="trapz":
+        if n>1:
+            w[:]=1
+            w[[0,-1]]=0.5
+    elif n==2:
+        w[:]=0.5
+    elif n>2:
+        # Composite Simpson over the largest odd number of readings; with an
+        # even number the last interval gets the correction scipy applies.
+        m=n if n%2 else n-1
+        w[1:m-1:2]=4/3
+        w[2:m-1:2]=2/3
+        w[[0,m-1]]=1/3
+        if m<n:
+            w[-3:]+=[-1/12,8/12,5/12]
+    return _readonly(w)
+
+@functools.lru_cache(maxsize=None)
+def tail_weights(integration):
+    """
+    Quadrature weights of the integral from each reading between
+    290 and 400 nm up to 400 nm, one row per starting reading.
+    """
+    w=np.zeros((111,111))
+    for k in range(111):
+        w[k,k:]=weights(integration,111-k)
+    return _readonly(w)
+
+@functools.lru_cache(maxsize=None)
+def kernel(name,integration):
+    """
+    Precompiled weights of a protection factor.
+
+    Parameters
+    ----------
+    name : string
+        "spf" (erythema × UV-SSR, 290 to 400 nm), "uvapf"
+        (PPD × UVA source, 320 to 400 nm) or the key of a
+        spectrum added with register_spectrum.
+    integration : string
+        "trapz" or "simpson".
+
+    Returns
+    -------
+    numerator, weights : float, numpy.array
+        Integral of the unprotected effective spectrum and the
+        read-only vector w such that the protected integral of
+        a transmittance T is T @ w.
+
+    """
+    effect=effects[name]
+    w=effect*weights(integration,effect.size)
+    return float(w.sum()),_readonly(w)
+
+@functools.lru_cache(maxsize=64)
+def _resampling(grid,start):
+    """
+    Matrix R such that y @ R linearly interpolates readings y taken at
+    the wavelengths in grid onto the 1 nm grid from start to 400 nm.
+    """
+    grid=np.array(grid)
+    order=np.argsort(grid)
+    ordered=grid[order]
+    targets=np.arange(start,401)
+    i=np.clip(np.searchsorted(ordered,targets,side="right")-1,0,grid.size-2)
+    fraction=(targets-ordered[i])/(ordered[i+1]-ordered[i])
+    R=np.zeros((grid.size,targets.size))
+    columns=np.arange(targets.size)
+    R[order[i],columns]=1-fraction
+    R[order[i+1],columns]+=fraction
+    return _readonly(R)
+
+def resample(data,grid,axis=None,start=290,errors=None):
+    """
+    Map spectra read at arbitrary wavelengths onto the reference grid.
+
+    Parameters
+    ----------
+    data : numpy.array
+        Absorbance readings.
+    grid : list or numpy.array
+        Wavelength of each reading in nm, strictly increasing or
+        decreasing and covering start to 400 nm.
+    axis : int (optional)
+        Axis of data holding the readings. Default 0.
+    start : int
+        First wavelength of the reference grid, 290 or 320.
+    errors : string (optional)
+        "raise" to raise ShapeError instead of printing.
+
+    Returns
+    -------
+    data : numpy.array
+        data with the readings replaced by their linear
+        interpolation at every nm from start to 400, or None
+        when grid is not valid. The matrix doing the mapping
+        is built once per distinct grid and cached.
+
+    """
+    if axis is None:
+        axis=0
+    grid=np.asarray(grid,dtype="float")
+    if data.ndim==0 or grid.ndim!=1 or grid.size!=data.shape[axis]:
+        return _fail(errors,ShapeError,"Wavelengths do not match the number of readings")
+    steps=np.diff(grid)
+    if grid.size<2 or not np.isfinite(grid).all() or not ((steps>0).all() or (steps<0).all()):
+        return _fail(errors,ShapeError,"Wavelengths must be strictly increasing or decreasing")
+    if grid.min()>start or grid.max()<400:
+        return _fail(errors,ShapeError,"Wavelengths must cover %d to 400 nm"%start)
+    if grid.size==401-start and (grid==np.arange(start,401)).all():
+        return data
+    R=_resampling(tuple(grid.tolist()),start)
+    if data.dtype==np.float32:
+        R=R.astype(np.float32)
+    return np.moveaxis(np.moveaxis(data,axis,-1)@R,-1,axis)
+
+@functools.lru_cache(maxsize=None)
+def typed_kernel(name,integration,dtype):
+    """
+    kernel() with the weights as the given numpy dtype, their natural
+    logarithm and the denominator below which a protection factor is
+    recomputed in log space.
+    """
+    numerator,w=kernel(name,integration)
+    with np.errstate(divide="ignore"):
+        log_weights=np.log(w).astype(dtype)
+    w=w.astype(dtype)
+    w.flags.writeable=False
+    log_weights.flags.writeable=False
+    info=np.finfo(dtype)
+    # Transmittance terms lost to underflow stay below the rounding error
+    # of any denominator above this bound.
+    return numerator,w,log_weights,float(info.tiny/info.eps*1e9)
+
+def resample_gradient(gradient,grid,start=290):
+    """
+    Derivatives with respect to readings taken at the wavelengths in
+    grid, from those with respect to the reference grid (along the
+    last axis), i.e. the chain rule through resample().
+    """
+    grid=np.asarray(grid,dtype="float")
+    if grid.size==401-start and (grid==np.arange(start,401)).all():
+        return gradient
+    R=_resampling(tuple(grid.tolist()),start)
+    return gradient@R.T.astype(gradient.dtype)
+
+def check_buffers(out,workspace,shape,size,dtype,errors=None):
+    """
+    Print why out (result of the given shape) or workspace (at least
+    size elements of dtype) cannot be used, and return False, or
+    return True when they can (raising ShapeError instead of printing
+    when errors is "raise").
+    """
+    if out is not None and (not isinstance(out,np.ndarray) or out.shape!=tuple(shape)):
+        _fail(errors,ShapeError,"Dimensions of out do not match the results")
+        return False
+    if workspace is not None and (not isinstance(workspace,np.ndarray) or workspace.dtype!=dtype
+                                  or workspace.size<size or not workspace.flags.c_contiguous):
+        _fail(errors,ShapeError,"workspace must be a contiguous %s array of at least %d elements"
+              %(np.dtype(dtype).name,size))
+        return False
+    return True
+
+def transmittance(data,C=None,workspace=None):
+    """
+    Transmittance 10**(-data*C) of every reading, as used by
+    protection().
+
+    Parameters
+    ----------
+    data : numpy.array
+        Absorbance. float32 data is evaluated in float32, anything
+        else in float64.
+    C : numpy.array or None
+        Coefficient of adjustment of each spectrum (data without
+        its last axis), or None for 1.
+    workspace : numpy.array (optional)
+        Contiguous buffer of the evaluation dtype with at least
+        data.size elements, used instead of allocating the result.
+
+    Returns
+    -------
+    transmitted : numpy.array
+        Array with the shape of data.
+
+    """
+    dtype=np.float32 if data.dtype==np.float32 else np.float64
+    if workspace is None:
+        work=np.empty_like(data,dtype=dtype)
+    elif data.flags.f_contiguous and not data.flags.c_contiguous:
+        # Keep the layout of transposed input so the copy streams.
+        work=workspace.reshape(-1)[:data.size].reshape(data.shape[::-1]).T
+    else:
+        work=workspace.reshape(-1)[:data.size].reshape(data.shape)
+    np.negative(data,out=work)
+    if C is not None:
+        work*=np.asarray(C,dtype)[...,None]
+    np.power(10,work,out=work)
+    return work
+
+def protection(data,C,name,integration,out=None,workspace=None,timer=None,gradient=False,transmitted=None):
+    """
+    Protection factor of every spectrum of an absorbance array.
+
+    Parameters
+    ----------
+    data : numpy.array
+        Absorbance with the readings of the kernel along the last
+        axis. float32 data is evaluated in float32, anything else
+        in float64.
+    C : numpy.array or None
+        Coefficient of adjustment of each spectrum, or None for 1.
+    name : string
+        Effect spectrum, see kernel().
+    integration : string
+        "trapz" or "simpson".
+    out : numpy.array (optional)
+        Buffer of shape data.shape[:-1] receiving the results.
+    workspace : numpy.array (optional)
+        Contiguous buffer of the evaluation dtype with at least
+        data.size elements, used instead of allocating temporaries.
+    timer : optional
+        Instrumentation record receiving stage timings.
+    gradient : boolean
+        If true, also return the derivatives of the factor with
+        respect to every reading and to C.
+    transmitted : numpy.array (optional)
+        transmittance(data,C) when already at hand, e.g. a slice
+        from 320 nm of the transmittance of whole spectra, which
+        then serves both SPF and UVA-PF. workspace is not used.
+
+    Returns
+    -------
+    factor : numpy.array
+        numerator / (10**(-data*C) @ weights). Spectra whose
+        transmittance underflows are evaluated as
+        exp(log(numerator) - logsumexp(-ln(10)*data*C + log(weights))).
+    dA, dC : numpy.array
+        With gradient, factor*ln(10)*C*share and
+        factor*ln(10)*(share @ data), share being each reading's
+        part weights*10**(-data*C) / denominator of the protected
+        integral (a softmax of the log terms where it underflows).
+
+    """
+    dtype=np.float32 if data.dtype==np.float32 else np.float64
+    numerator,weights,log_weights,smallest=typed_kernel(name,integration,dtype)
+    if transmitted is None:
+        work=transmittance(data,C,workspace)
+        if timer:
+            timer.mark("exponentiation")
+    else:
+        work=transmitted
+    denominator=np.asarray(work@weights)
+    low=None
+    if denominator.size and not np.minimum.reduce(denominator,axis=None)>=smallest:
+        low=~(denominator>=smallest)
+    if gradient:
+        with np.errstate(divide="ignore",invalid="ignore"):
+            share=work*weights
+            share/=denominator[...,None]
+    factor=np.divide(numerator,denominator,out=denominator if out is None else out,
+                     where=True if low is None else ~low)
+    if low is not None:
+        exponent=data[low]*(-np.log(10))
+        if C is not None:
+            exponent*=np.broadcast_to(C,low.shape)[low][:,None]
+        exponent+=log_weights
+        shift=exponent.max(axis=-1)
+        terms=np.exp(exponent-shift[:,None])
+        exponent=terms.sum(axis=-1)
+        with np.errstate(over="ignore"):
+            factor[low]=np.exp(np.log(numerator)-np.log(exponent)-shift)
+        if gradient:
+            share[low]=terms/exponent[:,None]
+    if timer:
+        timer.mark("integration")
+    if not gradient:
+        return factor
+    scale=factor*np.log(10)
+    dC=np.einsum("...i,...i->...",share,data)*scale
+    if C is not None:
+        scale=scale*C
+    share*=np.asarray(scale)[...,None]
+    if timer:
+        timer.mark("gradient")
+    return factor,share,dC
@@ -0,0 +1,98 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024 Santiago Guerrero-Higareda
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import numpy as np
+from . import _kernels
+# Below this many treatments the cost of starting workers outweighs the gain.
+threshold=1024
+
+def _share(array):
+    """
+    Copy array into a new shared memory block.
+    """
+    from multiprocessing import shared_memory
+    block=shared_memory.SharedMemory(create=True,size=max(array.nbytes,1))
+    np.ndarray(array.shape,dtype=array.dtype,buffer=block.buf)[...]=array
+    return block
+
+def _task(function,names,specs,start,stop,args,spectra):
+    """
+    Run function on rows start:stop of the shared arrays, with the
+    spectra registered in the calling process.
+    """
+    from multiprocessing import shared_memory
+    _kernels.install(spectra)
+    blocks=[shared_memory.SharedMemory(name=name) for name in names]
+    try:
+        arrays=[np.ndarray(shape,dtype=dtype,buffer=block.buf)[start:stop]
+                for block,(shape,dtype) in zip(blocks,specs)]
+        result=tuple(np.array(column) for column in function(*arrays,*args))
+        del arrays
+        return result
+    finally:
+        for block in blocks:
+            block.close()
+
+def map_rows(function,arrays,args,workers):
+    """
+    Apply function to the rows of arrays, split across a pool of
+    processes.
+
+    Parameters
+    ----------
+    function : callable
+        Module-level function taking the row slices of arrays
+        followed by args and returning a tuple of numpy.array
+        with one entry per row.
+    arrays : list of numpy.array
+        Arrays sharing their first dimension. They are passed to
+        the workers through shared memory instead of pickling.
+    args : tuple
+        Additional arguments of function. Output buffers (out,
+        workspace) only help in the calling process, so callers
+        pass None for them when workers>1 and each worker
+        allocates its own.
+    workers : int or None
+        Number of processes. None, 1 or fewer rows than
+        threshold run function in the calling process.
+
+    Returns
+    -------
+    return : tuple of numpy.array
+        Results of function for every row, in the original order.
+
+    """
+    size=arrays[0].shape[0]
+    if workers is None or workers<=1 or size<threshold:
+        return function(*arrays,*args)
+    # Imported here so that serial use does not pay for multiprocessing.
+    from concurrent.futures import ProcessPoolExecutor
+    # A few slices per worker even out columns that need more iterations.
+    bounds=np.linspace(0,size,min(4*workers,size)+1).astype(int)
+    arrays=[np.ascontiguousarray(array) for array in arrays]
+    blocks=[_share(array) for array in arrays]
+    try:
+        names=[block.name for block in blocks]
+        specs=[(array.shape,array.dtype.str) for array in arrays]
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            futures=[executor.submit(_task,function,names,specs,start,stop,args,_kernels.registered)
+                     for start,stop in zip(bounds[:-1],bounds[1:])]
+            parts=[future.result() for future in futures]
+    finally:
+        for block in blocks:
+            block.close()
+            block.unlink()
+    return tuple(np.concatenate(columns) for columns in zip(*parts))
@@ -1,507 +1,539 @@
-# -*- coding: utf-8 -*-
-"""
-Copyright © 2024 Santiago Guerrero-Higareda
-
-   Licensed under the Apache License, Version 2.0 (the "License");
-   you may not use this file except in compliance with the License.
-   You may obtain a copy of the License at
-
-       http://www.apache.org/licenses/LICENSE-2.0
-
-   Unless required by applicable law or agreed to in writing, software
-   distributed under the License is distributed on an "AS IS" BASIS,
-   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
-   See the License for the specific language governing permissions and
-   limitations under the License.
-"""
-import numpy as np
-import scipy.integrate as sci
-def adjspf(data,mode,values,parameters=None,integration=None, batch=None):
-    """
-    This function is used for adjusted *in vitro* SPF calculations.
-    Determine coefficient of adjustment "C" or use one to 
-    calculate adjusted *in vitro* SPF.
-    
-    Parameters
-    ----------
-    data : list, pandas.DataFrame or numpy.array
-        Each column of the array is a treatment, 
-        where rows correspond to each read measured 
-        from 290 to 400 nm (dλ=1).
-    mode : string
-        Use "calc" to determine C and,
-        Use "adj" to adjust *in vitro* SPF to a 
-        given C value.
-        Use "all" to compute C and use it to 
-        compute the adjusted *in vitro* SPF.
-    values : float and/or array
-        -In "calc" mode give the funtion the 
-        target(s) or spected SPF(s) to calculate
-        corresponding C value.
-        -In "adj" mode give the function the 
-         C value(s) to use.
-        -In "all" give the function the target(s) 
-         or spected SPF(s).
-    parameters : float and/or array (optional)
-        -Additionally Δλ and number of iterations can 
-        be given for calculations as [Δλ,iterations]. 
-        Default Δλ=1e-05 and #iterations=1.5e5
-    integration : string
-        Choose between "trapz" (default)
-        or "simpson"
-    batch : boolean
-        By default False. If true, will determine C or SPF of 
-        all data samples against a single target SPF or an
-        already calculated C value.
-        
-    Returns
-    -------
-    return : list
-        Returns the determined C value and/or 
-        adjusted calculated *in vitro* SPF.
-
-    """
-    wavelengths=[290,291,292,293,294,295,296,297,298,299,300,301,302,303,304,305,306,307,308,309,310,311,312,313,314,315,316,317,318,319,320,
-                  321,322,323,324,325,326,327,328,329,330,331,332,333,334,335,336,337,338,339,340,341,342,343,344,345,346,347,348,349,350,351,
-                  352,353,354,355,356,357,358,359,360,361,362,363,364,365,366,367,368,369,370,371,372,373,374,375,376,377,378,379,380,381,382,
-                  383,384,385,386,387,388,389,390,391,392,393,394,395,396,397,398,399,400]
-    erythema=[1.0,1.0,1.0,1.0,1.0,1.0,1.0,1.0,1.0,0.805,0.649,0.522,0.421,0.339,0.273,0.22,0.177,0.143,0.115,0.0925,0.0745,0.06,0.0483,0.0389,
-              0.0313,0.0252,0.0203,0.0164,0.0132,0.0106,0.00855,0.00689,0.00555,0.00447,0.0036,0.0029,0.00233,0.00188,0.00151,0.00141,0.00136,
-              0.00132,0.00127,0.00123,0.00119,0.00115,0.00111,0.00107,0.00104,0.001,0.000966,0.000933,0.000902,0.000871,0.000841,0.000813,0.000785,
-              0.000759,0.000733,0.000708,0.000684,0.000661,0.000638,0.000617,0.000596,0.000575,0.000556,0.000537,0.000519,0.000501,0.000484,0.000468,
-              0.000452,0.000437,0.000422,0.000407,0.000394,0.00038,0.000367,0.000355,0.000343,0.000331,0.00032,0.000309,0.000299,0.000288,0.000279,
-              0.000269,0.00026,0.000251,0.000243,0.000234,0.000226,0.000219,0.000211,0.000204,0.000197,0.000191,0.000184,0.000178,0.000172,0.000166,
-              0.00016,0.000155,0.00015,0.000145,0.00014,0.000135,0.00013,0.000126,0.000122]
-    uv_ssr=[8.74e-06,1.45e-05,2.66e-05,4.57e-05,0.000101,0.000259,0.000704,0.00168,0.00373,0.00794,0.0148,0.0251,0.0418,0.0622,0.0869,0.122,0.162,
-            0.199,0.248,0.289,0.336,0.387,0.431,0.488,0.512,0.557,0.596,0.626,0.657,0.688,0.724,0.737,0.768,0.796,0.799,0.829,0.844,0.856,0.879,
-            0.895,0.901,0.916,0.943,0.944,0.943,0.957,0.966,0.977,0.977,0.997,0.994,1.01,1.01,1.01,1.02,1.03,1.03,1.03,1.04,1.03,1.05,1.04,1.04,
-            1.04,1.04,1.05,1.04,1.04,1.03,1.04,1.04,1.03,1.02,1.02,0.998,0.996,0.967,0.965,0.939,0.919,0.898,0.873,0.847,0.812,0.784,0.742,0.715,
-            0.669,0.628,0.586,0.534,0.493,0.448,0.393,0.343,0.299,0.257,0.215,0.18,0.149,0.119,0.094,0.0727,0.0553,0.0401,0.0289,0.0207,0.014,
-            0.00951,0.00619,0.00417]
-    dl=[]
-    iterations=[]
-    if parameters is None:
-        dl=1e-5
-        iterations=150000
-    params=np.asarray(parameters)
-    if params.size==2:
-        dl=params[0]
-        iterations=int(params[1])
-    elif params.size>2:
-        print("Error: Too many parameters")
-    data=np.asarray(data)
-    values=np.asarray(values)
-    dims=data.ndim
-    size_values=values.size
-    if len(data.shape)==1:
-        shape=data.shape[0]
-        if shape==111:
-            ...
-        elif shape!=111:
-            print("Invalid row number")
-            return
-    elif len(data.shape)==2:
-        shape=data.shape[0]
-        if shape==111:
-            ...
-        elif shape!=111:
-            print("Invalid row number")
-            return
-    if dims>1 and size_values>1:
-        size_data=data.shape[1]
-    if batch==True:
-        batch_list=[]
-        if len(data.shape)==1:
-            print("More than one sample is needed")
-            return
-        size_data=data.shape[1]
-        if size_values==1:
-            for i in range(size_data):
-                batch_list.append(values)
-            values=np.asarray(batch_list)
-            size_values=values.size
-        else:
-            print("Error: more values that needed for batch mode")
-    elif batch==False:
-        if size_values==1:
-            print("More values are needed")
-            return
-        else:
-            ...
-    elif batch==None:
-        ...
-    elif batch!=False or batch!=True:
-        print("Error: Enter a True or False")
-        return
-    else:
-        print("Error: Enter a True or False")
-    if integration is None:
-        integration="trapz"
-    if isinstance(integration, str):
-        if integration=="trapz":
-            if mode=="calc":
-                if size_values==1 and dims==1:
-                    targetspf=float(values)
-                    arrays=[erythema,uv_ssr,np.power(10,-data)]
-                    spf=np.trapz(np.multiply(erythema,uv_ssr))/np.trapz(np.prod(np.vstack(arrays),axis=0))
-                    n=0
-                    C=0
-                    if spf>targetspf:
-                        for i in range(iterations):
-                            arrays=[erythema,uv_ssr,np.power(10,-data*C)]
-                            spf=np.trapz(np.multiply(erythema,uv_ssr))/np.trapz(np.prod(np.vstack(arrays),axis=0))
-                            n=n+1
-                            C=C+dl
-                            if spf>=targetspf:
-                                return C
-                                break
-                            elif n==iterations:
-                                return C
-                                break
-                    elif spf<targetspf:
-                        for i in range(iterations):
-                            arrays=[erythema,uv_ssr,np.power(10,-data*C)]
-                            spf=np.trapz(np.multiply(erythema,uv_ssr))/np.trapz(np.prod(np.vstack(arrays),axis=0))
-                            n=n+1
-                            C=C+dl
-                            if spf>=targetspf:
-                                return C
-                                break
-                            elif n==iterations:
-                                return C
-                                break
-                
-                elif size_values>1 and dims>1:
-                    targetspf_array=np.asarray(values, dtype="float")
-                    C_array=[]
-                    if size_data==size_values:
-                        for i in range(size_data):
-                            targetspf=targetspf_array[i]
-                            arrays=[erythema,uv_ssr,np.power(10,-data[:,i])]
-                            spf=np.trapz(np.multiply(erythema,uv_ssr))/np.trapz(np.prod(np.vstack(arrays),axis=0))
-                            n=0
-                            C=0
-                            if spf>targetspf:
-                                for j in range(iterations):
-                                    arrays=[erythema,uv_ssr,np.power(10,-data[:,i]*C)]
-                                    spf=np.trapz(np.multiply(erythema,uv_ssr))/np.trapz(np.prod(np.vstack(arrays),axis=0))
-                                    n=n+1
-                                    C=C+dl
-                                    if spf>=targetspf:
-                                        C_array.append(C)
-                                        break
-                                    elif n==iterations:
-                                        C_array.append(C)
-                                        break
-                            elif spf<targetspf:
-                                for j in range(iterations):
-                                    arrays=[erythema,uv_ssr,np.power(10,-data[:,i]*C)]
-                                    spf=np.trapz(np.multiply(erythema,uv_ssr))/np.trapz(np.prod(np.vstack(arrays),axis=0))
-                                    n=n+1
-                                    C=C+dl
-                                    if spf>=targetspf:
-                                        C_array.append(C)
-                                        break
-                                    elif n==iterations:
-                                        C_array.append(C)
-                                        break
-                        return C_array
-                    else:
-                        print("Dimensions of data and value arrays do not match")
-                else:
-                    print("Error, more values/parameters where given than needed")
-                    
-            elif mode=="adj":
-                spf=[]
-                dims=data.ndim
-                if dims==1 and size_values==1:
-                    arrays=[erythema,uv_ssr,np.power(10,-data*values)]
-                    spf.append(np.trapz(np.multiply(erythema,uv_ssr))/np.trapz(np.prod(np.vstack(arrays),axis=0)))
-                elif dims>1:
-                    if size_data==size_values:
-                        for i in range(size_data):
-                            arrays=[erythema,uv_ssr,np.power(10,-data[:,i]*values[i])]
-                            spf.append(np.trapz(np.multiply(erythema,uv_ssr))/np.trapz(np.prod(np.vstack(arrays),axis=0)))
-                    else:
-                        print("Dimensions of data and value arrays do not match")
-                else:
-                    print("Dimensions of data and value arrays do not match")
-                return spf
-            
-            elif mode=="all":
-                C_all=[]
-                if size_values==1 and dims==1:
-                    targetspf=float(values)
-                    arrays=[erythema,uv_ssr,np.power(10,-data)]
-                    spf=np.trapz(np.multiply(erythema,uv_ssr))/np.trapz(np.prod(np.vstack(arrays),axis=0))
-                    n=0
-                    C=0
-                    if spf>targetspf:
-                        for i in range(iterations):
-                            arrays=[erythema,uv_ssr,np.power(10,-data*C)]
-                            spf=np.trapz(np.multiply(erythema,uv_ssr))/np.trapz(np.prod(np.vstack(arrays),axis=0))
-                            n=n+1
-                            C=C+dl
-                            if spf>=targetspf:
-                                C_all.append(C)
-                                break
-                            elif n==iterations:
-                                C_all.append(C)
-                                break
-                    elif spf<targetspf:
-                        for i in range(iterations):
-                            arrays=[erythema,uv_ssr,np.power(10,-data*C)]
-                            spf=np.trapz(np.multiply(erythema,uv_ssr))/np.trapz(np.prod(np.vstack(arrays),axis=0))
-                            n=n+1
-                            C=C+dl
-                            if spf>=targetspf:
-                                C_all.append(C)
-                                break
-                            elif n==iterations:
-                                C_all.append(C)
-                                break
-                elif size_values>1 and dims>1:
-                    targetspf_array=np.asarray(values, dtype="float")
-                    C_array=[]
-                    if size_data==size_values:
-                        for i in range(size_values):
-                            targetspf=targetspf_array[i]
-                            arrays=[erythema,uv_ssr,np.power(10,-data[:,i])]
-                            spf=np.trapz(np.multiply(erythema,uv_ssr))/np.trapz(np.prod(np.vstack(arrays),axis=0))
-                            n=0
-                            C=0
-                            if spf>targetspf:
-                                for j in range(iterations):
-                                    arrays=[erythema,uv_ssr,np.power(10,-data[:,i]*C)]
-                                    spf=np.trapz(np.multiply(erythema,uv_ssr))/np.trapz(np.prod(np.vstack(arrays),axis=0))
-                                    n=n+1
-                                    C=C+dl
-                                    if spf>=targetspf:
-                                        C_array.append(C)
-                                        break
-                                    elif n==iterations:
-                                        C_array.append(C)
-                                        break
-                            elif spf<targetspf:
-                                for j in range(iterations):
-                                    arrays=[erythema,uv_ssr,np.power(10,-data[:,i]*C)]
-                                    spf=np.trapz(np.multiply(erythema,uv_ssr))/np.trapz(np.prod(np.vstack(arrays),axis=0))
-                                    n=n+1
-                                    C=C+dl
-                                    if spf>=targetspf:
-                                        C_array.append(C)
-                                        break
-                                    elif n==iterations:
-                                        C_array.append(C)
-                                        break
-                spf=[]
-                if dims==1 and np.asarray(C_all).size==1:
-                    arrays=[erythema,uv_ssr,np.power(10,-data*C_all)]
-                    spf.append(np.trapz(np.multiply(erythema,uv_ssr))/np.trapz(np.prod(np.vstack(arrays),axis=0)))
-                    return list([["C", "adjSPF"],[C,spf[0]]])
-                elif dims>1:
-                    if size_data==size_values:
-                        for i in range(size_data):
-                            arrays=[erythema,uv_ssr,np.power(10,-data[:,i]*C_array[i])]
-                            spf.append(np.trapz(np.multiply(erythema,uv_ssr))/np.trapz(np.prod(np.vstack(arrays),axis=0)))
-                        return list([["C", "adjSPF"],C_array,spf])
-                    else:
-                        print("Dimensions of data and value arrays do not match")
-                else:
-                    print("Dimensions of data and value arrays do not match")
-            else:
-                print('Please choose a valid mode')
-        elif integration=="simpson":
-            if mode=="calc":
-                if size_values==1 and dims==1:
-                    targetspf=float(values)
-                    arrays=[erythema,uv_ssr,np.power(10,-data)]
-                    spf=sci.simpson(y=np.multiply(erythema,uv_ssr),x=wavelengths)/sci.simpson(y=np.prod(np.vstack(arrays),axis=0),x=wavelengths)
-                    n=0
-                    C=0
-                    if spf>targetspf:
-                        for i in range(iterations):
-                            arrays=[erythema,uv_ssr,np.power(10,-data*C)]
-                            spf=sci.simpson(y=np.multiply(erythema,uv_ssr),x=wavelengths)/sci.simpson(y=np.prod(np.vstack(arrays),axis=0),x=wavelengths)
-                            n=n+1
-                            C=C+dl
-                            if spf>=targetspf:
-                                return C
-                                break
-                            elif n==iterations:
-                                return C
-                                break
-                    elif spf<targetspf:
-                        for i in range(iterations):
-                            arrays=[erythema,uv_ssr,np.power(10,-data*C)]
-                            spf=sci.simpson(y=np.multiply(erythema,uv_ssr),x=wavelengths)/sci.simpson(y=np.prod(np.vstack(arrays),axis=0),x=wavelengths)
-                            n=n+1
-                            C=C+dl
-                            if spf>=targetspf:
-                                return C
-                                break
-                            elif n==iterations:
-                                return C
-                                break
-                
-                elif size_values>1 and dims>1:
-                    targetspf_array=np.asarray(values, dtype="float")
-                    C_array=[]
-                    if size_data==size_values:
-                        for i in range(size_data):
-                            targetspf=targetspf_array[i]
-                            arrays=[erythema,uv_ssr,np.power(10,-data[:,i])]
-                            spf=sci.simpson(y=np.multiply(erythema,uv_ssr),x=wavelengths)/sci.simpson(y=np.prod(np.vstack(arrays),axis=0),x=wavelengths)
-                            n=0
-                            C=0
-                            if spf>targetspf:
-                                for j in range(iterations):
-                                    arrays=[erythema,uv_ssr,np.power(10,-data[:,i]*C)]
-                                    spf=sci.simpson(y=np.multiply(erythema,uv_ssr),x=wavelengths)/sci.simpson(y=np.prod(np.vstack(arrays),axis=0),x=wavelengths)
-                                    n=n+1
-                                    C=C+dl
-                                    if spf>=targetspf:
-                                        C_array.append(C)
-                                        break
-                                    elif n==iterations:
-                                        C_array.append(C)
-                                        break
-                            elif spf<targetspf:
-                                for j in range(iterations):
-                                    arrays=[erythema,uv_ssr,np.power(10,-data[:,i]*C)]
-                                    spf=sci.simpson(y=np.multiply(erythema,uv_ssr),x=wavelengths)/sci.simpson(y=np.prod(np.vstack(arrays),axis=0),x=wavelengths)
-                                    n=n+1
-                                    C=C+dl
-                                    if spf>=targetspf:
-                                        C_array.append(C)
-                                        break
-                                    elif n==iterations:
-                                        C_array.append(C)
-                                        break
-                        return C_array
-                    else:
-                        print("Dimensions of data and value arrays do not match")
-                else:
-                    print("Error, more values/parameters where given than needed")
-                       
-            elif mode=="adj":
-                if integration=="trapz":
-                    spf=[]
-                    if dims==1 and size_values==1:
-                        arrays=[erythema,uv_ssr,np.power(10,-data*C)]
-                        spf.append(np.trapz(np.multiply(erythema,uv_ssr))/np.trapz(np.prod(np.vstack(arrays),axis=0)))
-                    elif dims>1:
-                        if size_data==size_values:
-                            for i in range(size_data):
-                                arrays=[erythema,uv_ssr,np.power(10,-data[:,i]*C[i])]
-                                spf.append(np.trapz(np.multiply(erythema,uv_ssr))/np.trapz(np.prod(np.vstack(arrays),axis=0)))
-                        else:
-                            print("Dimensions of data and value arrays do not match")
-                    else:
-                        print("Dimensions of data and value arrays do not match")
-                    return spf
-                elif integration=="simpson":
-                    spf=[]
-                    if dims==1 and size_values==1:
-                        arrays=[erythema,uv_ssr,np.power(10,-data*C)]
-                        spf.append(sci.simpson(y=np.multiply(erythema,uv_ssr),x=wavelengths)/sci.simpson(y=np.prod(np.vstack(arrays),axis=0),x=wavelengths))
-                    elif dims>1:
-                        if size_data==size_values:
-                            for i in range(size_data):
-                                arrays=[erythema,uv_ssr,np.power(10,-data[:,i]*C[i])]
-                                spf.append(sci.simpson(y=np.multiply(erythema,uv_ssr),x=wavelengths)/sci.simpson(y=np.prod(np.vstack(arrays),axis=0),x=wavelengths))
-                        else:
-                            print("Dimensions of data and value arrays do not match")
-                    else:
-                        print("Dimensions of data and value arrays do not match")
-                    return spf
-                else:
-                    print("Error: Enter a valid integration method")
-                    
-            elif mode=="all":
-                C_all=[]
-                if size_values==1 and dims==1:
-                    targetspf=float(values)
-                    arrays=[erythema,uv_ssr,np.power(10,-data)]
-                    spf=sci.simpson(y=np.multiply(erythema,uv_ssr),x=wavelengths)/sci.simpson(y=np.prod(np.vstack(arrays),axis=0),x=wavelengths)
-                    n=0
-                    C=0
-                    if spf>targetspf:
-                        for i in range(iterations):
-                            arrays=[erythema,uv_ssr,np.power(10,-data*C)]
-                            spf=sci.simpson(y=np.multiply(erythema,uv_ssr),x=wavelengths)/sci.simpson(y=np.prod(np.vstack(arrays),axis=0),x=wavelengths)
-                            n=n+1
-                            C=C+dl
-                            if spf>=targetspf:
-                                C_all.append(C)
-                                break
-                            elif n==iterations:
-                                C_all.append(C)
-                                break
-                    elif spf<targetspf:
-                        for i in range(iterations):
-                            arrays=[erythema,uv_ssr,np.power(10,-data*C)]
-                            spf=sci.simpson(y=np.multiply(erythema,uv_ssr),x=wavelengths)/sci.simpson(y=np.prod(np.vstack(arrays),axis=0),x=wavelengths)
-                            n=n+1
-                            C=C+dl
-                            if spf>=targetspf:
-                                C_all.append(C)
-                                break
-                            elif n==iterations:
-                                C_all.append(C)
-                                break
-                elif size_values>1 and dims>1:
-                    targetspf_array=np.asarray(values, dtype="float")
-                    C_array=[]
-                    if size_data==size_values:
-                        for i in range(size_data):
-                            targetspf=targetspf_array[i]
-                            arrays=[erythema,uv_ssr,np.power(10,-data[:,i])]
-                            spf=sci.simpson(y=np.multiply(erythema,uv_ssr),x=wavelengths)/sci.simpson(y=np.prod(np.vstack(arrays),axis=0),x=wavelengths)
-                            n=0
-                            C=0
-                            if spf>targetspf:
-                                for j in range(iterations):
-                                    arrays=[erythema,uv_ssr,np.power(10,-data[:,i]*C)]
-                                    spf=sci.simpson(y=np.multiply(erythema,uv_ssr),x=wavelengths)/sci.simpson(y=np.prod(np.vstack(arrays),axis=0),x=wavelengths)
-                                    n=n+1
-                                    C=C+dl
-                                    if spf>=targetspf:
-                                        C_array.append(C)
-                                        break
-                                    elif n==iterations:
-                                        C_array.append(C)
-                                        break
-                            elif spf<targetspf:
-                                for j in range(iterations):
-                                    arrays=[erythema,uv_ssr,np.power(10,-data[:,i]*C)]
-                                    spf=sci.simpson(y=np.multiply(erythema,uv_ssr),x=wavelengths)/sci.simpson(y=np.prod(np.vstack(arrays),axis=0),x=wavelengths)
-                                    n=n+1
-                                    C=C+dl
-                                    if spf>=targetspf:
-                                        C_array.append(C)
-                                        break
-                                    elif n==iterations:
-                                        C_array.append(C)
-                                        break
-                spf=[]
-                if dims==1 and np.asarray(C_all).size==1:
-                    arrays=[erythema,uv_ssr,np.power(10,-data*C_all)]
-                    spf.append(sci.simpson(y=np.multiply(erythema,uv_ssr),x=wavelengths)/sci.simpson(y=np.prod(np.vstack(arrays),axis=0),x=wavelengths))
-                    return C,spf[0]
-                elif dims>1:
-                    if size_data==size_values:
-                        for i in range(size_values):
-                            arrays=[erythema,uv_ssr,np.power(10,-data[:,i]*C_array[i])]
-                            spf.append(sci.simpson(y=np.multiply(erythema,uv_ssr),x=wavelengths)/sci.simpson(y=np.prod(np.vstack(arrays),axis=0),x=wavelengths))
-                        return C_array,spf
-                    else:
-                        print("Dimensions of data and value arrays do not match")
-                else:
-                    print("Dimensions of data and value arrays do not match")
-            else:
-                print('Please choose a valid mode')
-        else:
-            print("Error: Enter a valid integration method")
-    else:
-        print("Error: Enter a valid integration method")
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024 Santiago Guerrero-Higareda
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import numpy as np
+from ._kernels import check_buffers,check_spectrum,kernel,protection,resample,resample_gradient,signature
+from ._parallel import map_rows
+from .cache import _active,_rows
+from .instrumentation import _call
+from .results import _results
+from .validation import OptionError,ShapeError,_expand,_fail,_report,_screen
+
+def _step_c(data,targets,weights,dl,iterations,timer=None):
+    """
+    Increase C by dl from 0 until SPF(C) reaches the target, advancing
+    every column of data that has not reached its target together.
+
+    Parameters
+    ----------
+    data : numpy.array
+        Absorbance matrix with one treatment per row and the
+        readings from 290 to 400 nm (dλ=1) along the columns.
+    targets : numpy.array
+        Target SPF of each row.
+    weights : tuple
+        Numerator and weight vector of the SPF, as returned
+        by kernel("spf", integration).
+    dl : float
+        Increment of C.
+    iterations : int
+        Maximum number of increments.
+    timer : optional
+        Instrumentation record receiving stage timings.
+
+    Returns
+    -------
+    C, reached, iterations : numpy.array
+        Coefficient of adjustment of each row, whether its
+        target was reached before the last increment and the
+        number of SPF evaluations it used.
+
+    """
+    numerator,weights=weights
+    C_array=np.zeros(data.shape[0])
+    n=np.zeros(data.shape[0],dtype=int)
+    active=np.ones(data.shape[0],dtype=bool)
+    C=0
+    for i in range(iterations):
+        idx=np.flatnonzero(active)
+        if idx.size==0:
+            break
+        transmitted=np.power(10,-data[idx]*C)
+        if timer:
+            timer.mark("exponentiation")
+        spf=numerator/(transmitted@weights)
+        if timer:
+            timer.mark("integration")
+        n[idx]+=1
+        C=C+dl
+        done=spf>=targets[idx]
+        C_array[idx[done]]=C
+        active[idx[done]]=False
+    C_array[active]=C
+    if timer:
+        timer.mark("search")
+    return C_array,~active,n
+
+def _solve_c(data,targets,weights,solver,tol,xtol,iterations,timer=None):
+    """
+    Solve SPF(C)=target for every row of data at once.
+
+    Parameters
+    ----------
+    data : numpy.array
+        Absorbance matrix with one treatment per row and the
+        readings from 290 to 400 nm (dλ=1) along the columns.
+    targets : numpy.array
+        Target SPF of each row.
+    weights : tuple
+        Numerator and weight vector of the SPF, as returned
+        by kernel("spf", integration).
+    solver : string
+        "newton" or "bisect".
+    tol : float
+        Absolute tolerance on the SPF.
+    xtol : float
+        Absolute tolerance on C.
+    iterations : int
+        Maximum number of SPF evaluations per row.
+    timer : optional
+        Instrumentation record receiving stage timings.
+
+    Returns
+    -------
+    C, converged, iterations : numpy.array
+        Coefficient of adjustment, convergence flag and number
+        of SPF evaluations used by each row.
+
+    """
+    size=data.shape[0]
+    numerator,weights=weights
+    C=np.zeros(size)
+    n=np.zeros(size,dtype=int)
+    converged=np.zeros(size,dtype=bool)
+    active=np.ones(size,dtype=bool)
+    if solver=="newton":
+        # ln of the SPF denominator is convex in C, so Newton steps taken
+        # from C=0 approach the root monotonically without overshooting,
+        # after one step past it for targets below SPF(C=0).
+        for i in range(iterations):
+            idx=np.flatnonzero(active)
+            if idx.size==0:
+                break
+            absorbance=data[idx]
+            transmitted=np.power(10,-absorbance*C[idx,None])
+            if timer:
+                timer.mark("exponentiation")
+            denominator=transmitted@weights
+            spf=numerator/denominator
+            n[idx]+=1
+            done=np.abs(spf-targets[idx])<=tol
+            # A flat SPF (e.g. all-zero readings) has no step; it stalls.
+            with np.errstate(divide="ignore",invalid="ignore"):
+                slope=-np.log(10)*((absorbance*transmitted)@weights)/denominator
+                if timer:
+                    timer.mark("integration")
+                step=(np.log(denominator)-np.log(numerator/targets[idx]))/slope
+            stalled=~done & ~(np.isfinite(step) & (slope<0))
+            moving=~done & ~stalled
+            C[idx[moving]]-=step[moving]
+            small=moving & (np.abs(step)<=xtol)
+            converged[idx[done | small]]=True
+            active[idx[done | small | stalled]]=False
+    elif solver=="bisect":
+        # SPF(C=0) is the same for every row; targets below it are
+        # bracketed on the negative side, as Newton finds them there.
+        negative=targets<numerator/weights.sum()
+        lo=np.where(negative,-1.0,0.0)
+        hi=np.where(negative,0.0,1.0)
+        bracketed=np.zeros(size,dtype=bool)
+        active&=targets>0
+        for i in range(iterations):
+            idx=np.flatnonzero(~bracketed & active)
+            if idx.size==0:
+                break
+            down=negative[idx]
+            probe=np.where(down,lo[idx],hi[idx])
+            transmitted=np.power(10,-data[idx]*probe[:,None])
+            if timer:
+                timer.mark("exponentiation")
+            spf=numerator/(transmitted@weights)
+            if timer:
+                timer.mark("integration")
+            n[idx]+=1
+            outside=np.where(down,spf>targets[idx],spf<targets[idx])
+            bracketed[idx[~outside]]=True
+            up=idx[outside & ~down]
+            lo[up]=hi[up]
+            hi[up]*=2
+            further=idx[outside & down]
+            hi[further]=lo[further]
+            lo[further]*=2
+            active[idx[~np.isfinite(spf) | (np.abs(probe)>5e11)]]=False
+        active&=bracketed
+        C=(lo+hi)/2
+        for i in range(iterations-n.max(initial=0)):
+            idx=np.flatnonzero(active)
+            if idx.size==0:
+                break
+            transmitted=np.power(10,-data[idx]*C[idx,None])
+            if timer:
+                timer.mark("exponentiation")
+            spf=numerator/(transmitted@weights)
+            if timer:
+                timer.mark("integration")
+            n[idx]+=1
+            done=np.abs(spf-targets[idx])<=tol
+            below=spf<targets[idx]
+            lo[idx[below & ~done]]=C[idx[below & ~done]]
+            hi[idx[~below & ~done]]=C[idx[~below & ~done]]
+            C[idx[~done]]=(lo[idx[~done]]+hi[idx[~done]])/2
+            small=~done & (hi[idx]-lo[idx]<=xtol)
+            converged[idx[done | small]]=True
+            active[idx[done | small]]=False
+    if timer:
+        timer.mark("search")
+    return C,converged,n
+
+def _adjust(matrix,values,mode,integration,solver,dl,iterations,tol,xtol,timer=None,
+            out=None,workspace=None,spectrum="spf",gradient=False):
+    """
+    Determine C and/or the adjusted SPF of every row of matrix, the
+    latter written to out when given.
+
+    Returns
+    -------
+    C, spf, converged, iterations : numpy.array
+        In "adj" mode C is values. spf is empty in "calc" mode,
+        and converged and iterations are left empty (False, 0)
+        in "adj" mode. With gradient ("adj" mode), followed by the
+        derivatives of spf with respect to the readings and C.
+
+    """
+    numerator,weights=kernel(spectrum,integration)
+    size=matrix.shape[0]
+    converged=np.zeros(size,dtype=bool)
+    n=np.zeros(size,dtype=int)
+    if mode=="adj":
+        C_array=values
+    elif solver=="step":
+        C_array,converged,n=_step_c(matrix,values,(numerator,weights),dl,iterations,timer)
+    else:
+        C_array,converged,n=_solve_c(matrix,values,(numerator,weights),
+                                     solver,tol,xtol,iterations,timer)
+    if gradient:
+        spf,dA,dC=protection(matrix,C_array,spectrum,integration,out,workspace,timer,True)
+        return C_array,spf,converged,n,dA,dC
+    spf=np.empty(0)
+    if mode!="calc":
+        spf=protection(matrix,C_array,spectrum,integration,out,workspace,timer)
+    return C_array,spf,converged,n
+
+def _find_c(matrix,targets,integration,solver,dl,iterations,tol,xtol,timer=None,workers=None,
+            spectrum="spf"):
+    """
+    C, convergence flag and iterations of every row of matrix, looked
+    up in the active cache (see enable_cache) where possible.
+    """
+    if solver=="step":
+        tag=("C",integration,solver,float(dl),int(iterations))+signature(spectrum)
+    else:
+        tag=("C",integration,solver,int(iterations),float(tol),float(xtol))+signature(spectrum)
+    def solve(rows,values):
+        C_array,spf,converged,n=map_rows(_adjust,[rows,values],("calc",integration,solver,dl,iterations,
+                                                              tol,xtol,timer,None,None,spectrum),workers)
+        return C_array,converged,n
+    return _rows(tag,matrix,targets,solve,(np.float64,bool,int))
+
+def _format(C_array,spf,converged,n,mode,integration,solver,full_output,axis,batch_shape,dims):
+    """
+    Results of the "calc" and "all" modes in the layout returned by
+    adjspf.
+    """
+    results=[["C"],C_array]
+    if mode=="all":
+        results[0].append("adjSPF")
+        results.append(spf)
+    if full_output==True:
+        results[0].extend(["converged","iterations"])
+        results.extend([converged,n])
+    if axis is not None:
+        results[1:]=[column.reshape(batch_shape) for column in results[1:]]
+    elif dims==1:
+        results[1:]=[column[0] for column in results[1:]]
+    else:
+        results[1:]=[list(column) for column in results[1:]]
+    if mode=="calc" and len(results)==2:
+        return results[1]
+    if axis is None and solver=="step" and mode=="all":
+        if integration=="simpson":
+            return tuple(results[1:])
+        if dims==1:
+            return list([results[0],results[1:]])
+    return results
+
+def adjspf(data,mode,values,parameters=None,integration=None, batch=None,
+           solver=None,tol=None,xtol=None,full_output=None,axis=None,workers=None,
+           wavelengths=None,out=None,workspace=None,errors=None,spectrum=None,gradient=None,
+           output=None):
+    """
+    This function is used for adjusted *in vitro* SPF calculations.
+    Determine coefficient of adjustment "C" or use one to 
+    calculate adjusted *in vitro* SPF.
+    
+    Parameters
+    ----------
+    data : list, pandas.DataFrame or numpy.array
+        Each column of the array is a treatment, 
+        where rows correspond to each read measured 
+        from 290 to 400 nm (dλ=1).
+    mode : string
+        Use "calc" to determine C and,
+        Use "adj" to adjust *in vitro* SPF to a 
+        given C value.
+        Use "all" to compute C and use it to 
+        compute the adjusted *in vitro* SPF.
+    values : float and/or array
+        -In "calc" mode give the funtion the 
+        target(s) or spected SPF(s) to calculate
+        corresponding C value.
+        -In "adj" mode give the function the 
+         C value(s) to use.
+        -In "all" give the function the target(s) 
+         or spected SPF(s).
+    parameters : float and/or array (optional)
+        -Additionally Δλ and number of iterations can 
+        be given for calculations as [Δλ,iterations]. 
+        Default Δλ=1e-05 and #iterations=1.5e5
+    integration : string
+        Choose between "trapz" (default)
+        or "simpson"
+    batch : boolean
+        By default False. If true, will determine C or SPF of 
+        all data samples against a single target SPF or an
+        already calculated C value.
+    solver : string (optional)
+        Method used to find C in "calc" and "all" modes.
+        "step" (default) increases C by Δλ until the target
+        is reached. "newton" uses the analytic derivative of
+        SPF(C) and "bisect" brackets and halves the interval;
+        both solve every column at once and only use the
+        #iterations entry of parameters (default 100).
+        Unlike "step", they give a negative C for targets
+        below the unadjusted SPF at C=0.
+    tol : float (optional)
+        Absolute tolerance on the SPF for "newton" and
+        "bisect". Default 1e-06.
+    xtol : float (optional)
+        Absolute tolerance on C for "newton" and "bisect".
+        Default 1e-09.
+    full_output : boolean (optional)
+        By default False. If true, "calc" and "all" modes also
+        return the convergence flag and number of iterations
+        used by each column.
+    axis : int (optional)
+        Axis of data holding the 111 readings. When given,
+        data can have any number of other dimensions, values
+        are broadcast against them and results are returned
+        as numpy.array with the shape of data without the
+        wavelength axis.
+    workers : int (optional)
+        Number of processes used to split the treatments.
+        By default, and for batches too small to benefit,
+        everything runs in the calling process.
+    wavelengths : list or numpy.array (optional)
+        Wavelength of each reading in nm, when data is not
+        read from 290 to 400 nm at dλ=1 (e.g. 0.5, 2 or
+        5 nm steps). Readings are linearly interpolated onto
+        that grid before evaluation.
+    out : numpy.array (optional)
+        Preallocated array receiving the adjusted SPF in "adj"
+        and "all" modes, with the shape of data without the
+        wavelength axis.
+    workspace : numpy.array (optional)
+        Contiguous scratch array with at least as many elements
+        as data, of float32 for float32 data and float64
+        otherwise, reused instead of allocating temporaries
+        when computing the adjusted SPF.
+    errors : string (optional)
+        "mask" checks every treatment and value first (see
+        validate), so that failed treatments are skipped
+        instead of searched for the maximum number of
+        iterations; their C and adjusted SPF are NaN.
+        "raise" raises ShapeError, OptionError or ColumnError
+        instead of printing and returning None. By default
+        readings are evaluated as given.
+    spectrum : string (optional)
+        Key of the SPF weighting (see register_spectrum), used
+        both to find C and to compute the adjusted SPF.
+        Default "spf", the erythema action spectrum × UV-SSR.
+    gradient : boolean (optional)
+        By default False. If true, "adj" mode also returns the
+        analytic derivatives of every adjusted SPF with respect
+        to each reading and to C, computed in the same pass.
+    output : string (optional)
+        "results" returns a Results (see as_results) with the
+        columns "C", "adjSPF" ("all" mode), "converged" and
+        "iterations" ("adjSPF" and, with gradient, "dadjSPF/dA"
+        and "dadjSPF/dC" in "adj" mode) shaped like the batch,
+        instead of lists. With errors="mask", the "failed",
+        "flags" and "reasons" of the report are further columns.
+        
+    Returns
+    -------
+    return : list
+        Returns the determined C value and/or 
+        adjusted calculated *in vitro* SPF. With
+        errors="mask", returns (result, report), report
+        being the output of validate() for the batch. With
+        gradient, "adj" mode returns [["adjSPF","dadjSPF/dA",
+        "dadjSPF/dC"],adjSPF,dA,dC], where dA has the shape of
+        data and dC that of the adjusted SPF array.
+
+    """
+    timer=_call("adjspf")
+    if errors not in (None,"mask","raise"):
+        print("Error: Enter a valid errors option")
+        return
+    if parameters is None:
+        dl=1e-5
+        iterations=150000
+    else:
+        params=np.asarray(parameters)
+        if params.size!=2:
+            return _fail(errors,OptionError,"Error: Too many parameters")
+        dl=params[0]
+        iterations=int(params[1])
+    if solver is None:
+        solver="step"
+    if solver not in ("step","newton","bisect"):
+        return _fail(errors,OptionError,"Error: Enter a valid solver")
+    if solver!="step":
+        if parameters is None:
+            iterations=100
+        if tol is None:
+            tol=1e-6
+        if xtol is None:
+            xtol=1e-9
+    data=np.asarray(data)
+    if wavelengths is not None:
+        data=resample(data,wavelengths,axis,errors=errors)
+        if data is None:
+            return
+    values=np.asarray(values,dtype="float")
+    if axis is None:
+        if data.ndim>2 or data.shape[0]!=111:
+            return _fail(errors,ShapeError,"Invalid row number")
+        dims=data.ndim
+        data=data.T
+        batch_shape=data.shape[:-1]
+        if batch==True:
+            if dims==1:
+                return _fail(errors,ShapeError,"More than one sample is needed")
+            if values.size!=1:
+                return _fail(errors,ShapeError,"Error: more values that needed for batch mode")
+            values=np.full(batch_shape,values.item())
+        elif batch==False:
+            if values.size==1:
+                return _fail(errors,ShapeError,"More values are needed")
+        elif batch is not None:
+            return _fail(errors,OptionError,"Error: Enter a True or False")
+        if values.size!=data[...,0].size:
+            if mode=="calc" and solver=="step":
+                return _fail(errors,ShapeError,"Error, more values/parameters where given than needed")
+            return _fail(errors,ShapeError,"Dimensions of data and value arrays do not match")
+        values=values.reshape(batch_shape)
+    else:
+        if data.ndim==0 or data.shape[axis]!=111:
+            return _fail(errors,ShapeError,"Invalid row number")
+        data=np.moveaxis(data,axis,-1)
+        batch_shape=data.shape[:-1]
+        try:
+            values=np.broadcast_to(values,batch_shape)
+        except ValueError:
+            return _fail(errors,ShapeError,"Dimensions of data and value arrays do not match")
+    if integration is None:
+        integration="trapz"
+    if integration not in ("trapz","simpson"):
+        return _fail(errors,OptionError,"Error: Enter a valid integration method")
+    if mode not in ("calc","adj","all"):
+        return _fail(errors,OptionError,'Please choose a valid mode')
+    if output not in (None,"results"):
+        return _fail(errors,OptionError,"Error: Enter a valid output")
+    if gradient==True and mode!="adj":
+        return _fail(errors,OptionError,'Error: gradient is only available in "adj" mode')
+    spectrum=check_spectrum(spectrum,"spf",errors)
+    if spectrum is None:
+        return
+    matrix=data.reshape(-1,111)
+    values=values.reshape(-1)
+    dtype=np.float32 if matrix.dtype==np.float32 else np.float64
+    if not check_buffers(out,workspace,batch_shape,matrix.size,dtype,errors):
+        return
+    flags=_screen(errors,matrix,values,batch_shape)
+    if timer:
+        timer.mark("validation")
+    buffers=(None,None) if workers is not None and workers>1 or mode=="calc" else (out,workspace)
+    valid=None
+    if flags is not None and flags.any():
+        valid=flags==0
+        matrix=matrix[valid]
+        values=values[valid]
+        buffers=(None,buffers[1])
+    if buffers[0] is not None:
+        buffers=(out.reshape(-1),workspace)
+    derivatives=()
+    if mode=="adj" or not _active:
+        C_array,spf,converged,n,*derivatives=map_rows(_adjust,[matrix,values],
+                                                      (mode,integration,solver,dl,iterations,tol,xtol,timer)
+                                                      +buffers+(spectrum,gradient==True),workers)
+    else:
+        C_array,converged,n=_find_c(matrix,values,integration,solver,dl,iterations,tol,xtol,timer,workers,
+                                    spectrum)
+        spf=np.empty(0)
+        if mode=="all":
+            spf=map_rows(_adjust,[matrix,C_array],
+                         ("adj",integration,solver,dl,iterations,tol,xtol,timer)+buffers+(spectrum,),workers)[1]
+    if valid is not None:
+        C_array=_expand(C_array,valid,np.nan)
+        converged=_expand(converged,valid,False)
+        n=_expand(n,valid,0)
+        if mode!="calc":
+            spf=_expand(spf,valid,np.nan)
+        derivatives=[_expand(column,valid,np.nan) for column in derivatives]
+    if out is not None and mode!="calc" and not np.shares_memory(spf,out):
+        out[...]=spf.reshape(batch_shape)
+    if timer:
+        timer.finish(mode=mode,integration=integration,solver=solver,columns=matrix.shape[0],
+                     iterations=n,converged=converged,capped=~converged & (n>=iterations))
+    if output=="results":
+        if mode=="adj":
+            table={"adjSPF":spf.reshape(batch_shape)}
+            if gradient==True:
+                dA=derivatives[0].reshape(batch_shape+(111,))
+                if wavelengths is not None:
+                    dA=resample_gradient(dA,wavelengths)
+                table.update({"dadjSPF/dA":dA,"dadjSPF/dC":derivatives[1].reshape(batch_shape)})
+        else:
+            table={"C":C_array.reshape(batch_shape)}
+            if mode=="all":
+                table["adjSPF"]=spf.reshape(batch_shape)
+            table.update({"converged":converged.reshape(batch_shape),"iterations":n.reshape(batch_shape)})
+        return _results(table,None if flags is None else flags.reshape(batch_shape))
+    if mode=="adj":
+        results=list(spf) if axis is None else spf.reshape(batch_shape)
+        if gradient==True:
+            dA=derivatives[0].reshape(batch_shape+(111,))
+            if wavelengths is not None:
+                dA=resample_gradient(dA,wavelengths)
+            dA=dA.T if axis is None else np.moveaxis(dA,-1,axis)
+            results=[["adjSPF","dadjSPF/dA","dadjSPF/dC"],results,dA,derivatives[1].reshape(batch_shape)]
+    else:
+        results=_format(C_array,spf,converged,n,mode,integration,solver,full_output,axis,
+                        batch_shape,dims if axis is None else None)
+    if errors=="mask":
+        return results,_report(flags.reshape(batch_shape))
+    return results
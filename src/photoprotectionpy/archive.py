@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024 Santiago Guerrero-Higareda
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import itertools
+import json
+import os
+import numpy as np
+from .results import Results
+def _read_index(path):
+    """
+    Read the index of the archive at path, None if there is none.
+    """
+    try:
+        with open(os.path.join(path,"index.json")) as handle:
+            return json.load(handle)
+    except FileNotFoundError:
+        return None
+
+def archive_append(path,data,ids=None,dtype=None):
+    """
+    Append absorbance spectra to an on-disk archive, creating it
+    if needed.
+
+    The archive is a directory holding spectra.bin (one row of
+    111 readings per treatment, readable with numpy.memmap),
+    ids.txt (one treatment name per line) and index.json.
+
+    Parameters
+    ----------
+    path : string or path
+        Directory of the archive.
+    data : list, pandas.DataFrame or numpy.array
+        Each column of the array is a treatment, where rows
+        correspond to each read measured from 290 to 400 nm
+        (dλ=1).
+    ids : list (optional)
+        Name of each treatment. Defaults to their position in
+        the archive.
+    dtype : string (optional)
+        Storage type when creating the archive, "float64"
+        (default) or "float32".
+
+    Returns
+    -------
+    count : int
+        Number of treatments in the archive.
+
+    """
+    data=np.asarray(data)
+    if data.ndim>2 or data.shape[0]!=111:
+        print("Invalid row number")
+        return
+    rows=data.reshape(111,-1).T
+    index=_read_index(path)
+    if index is None:
+        if dtype is None:
+            dtype="float64"
+        if dtype not in ("float64","float32"):
+            print("Error: Enter a valid dtype")
+            return
+        os.makedirs(path,exist_ok=True)
+        index={"version":1,"dtype":dtype,"readings":111,"count":0,"ids_bytes":0}
+    if ids is None:
+        ids=range(index["count"],index["count"]+rows.shape[0])
+    ids=[str(name) for name in ids]
+    if len(ids)!=rows.shape[0]:
+        print("Dimensions of data and ids do not match")
+        return
+    if any("\n" in name for name in ids):
+        print("Error: ids cannot contain line breaks")
+        return
+    row_bytes=111*np.dtype(index["dtype"]).itemsize
+    # Anything past the indexed size is left over from an interrupted append.
+    with open(os.path.join(path,"spectra.bin"),"ab") as handle:
+        handle.truncate(index["count"]*row_bytes)
+        handle.write(np.ascontiguousarray(rows,dtype=np.dtype(index["dtype"]).newbyteorder("<")).tobytes())
+    encoded="".join(name+"\n" for name in ids).encode()
+    with open(os.path.join(path,"ids.txt"),"ab") as handle:
+        handle.truncate(index["ids_bytes"])
+        handle.write(encoded)
+    index["count"]+=rows.shape[0]
+    index["ids_bytes"]+=len(encoded)
+    temporary=os.path.join(path,"index.json.tmp")
+    with open(temporary,"w") as handle:
+        json.dump(index,handle)
+    os.replace(temporary,os.path.join(path,"index.json"))
+    return index["count"]
+
+def archive_open(path):
+    """
+    Open the spectra of an archive without reading them into memory.
+
+    Parameters
+    ----------
+    path : string or path
+        Directory of the archive.
+
+    Returns
+    -------
+    spectra : numpy.memmap
+        Read-only array with one row of 111 readings (290 to
+        400 nm) per treatment.
+
+    """
+    index=_read_index(path)
+    if index is None:
+        print("Error: No archive found")
+        return
+    dtype=np.dtype(index["dtype"]).newbyteorder("<")
+    if index["count"]==0:
+        return np.empty((0,index["readings"]),dtype=dtype)
+    return np.memmap(os.path.join(path,"spectra.bin"),dtype=dtype,mode="r",
+                     shape=(index["count"],index["readings"]))
+
+def archive_blocks(path,chunk=None,start=None,stop=None):
+    """
+    Iterate over the spectra of an archive in blocks.
+
+    Parameters
+    ----------
+    path : string or path
+        Directory of the archive.
+    chunk : int (optional)
+        Number of treatments per block. Default 65536.
+    start, stop : int (optional)
+        Range of treatments to read, all of them by default.
+
+    Yields
+    ------
+    ids, block : list, numpy.array
+        Names of the treatments in the block and a view of their
+        absorbance with one column per treatment, as taken by
+        the other functions.
+
+    """
+    if chunk is None:
+        chunk=65536
+    spectra=archive_open(path)
+    if spectra is None:
+        return
+    start,stop,_=slice(start,stop).indices(spectra.shape[0])
+    # Only "\n" ends an id; ids may hold "\r".
+    with open(os.path.join(path,"ids.txt"),encoding="utf-8",newline="\n") as handle:
+        names=(line.rstrip("\n") for line in itertools.islice(handle,start,stop))
+        for i in range(start,stop,chunk):
+            block=spectra[i:min(i+chunk,stop)]
+            yield list(itertools.islice(names,block.shape[0])),block.T
+
+def archive_evaluate(path,function,*args,chunk=None,start=None,stop=None,**kwargs):
+    """
+    Evaluate one of the package functions over an archive block by
+    block, without loading the whole archive.
+
+    Parameters
+    ----------
+    path : string or path
+        Directory of the archive.
+    function : callable
+        ispf, adjspf, uvapf or criticalwave. It is called as
+        function(block, *args, axis=0, **kwargs).
+    chunk, start, stop : int (optional)
+        See archive_blocks.
+
+    Returns
+    -------
+    return : numpy.array, list, Results or tuple
+        Result of function for every treatment, in archive
+        order. Results with a header row (e.g. adjspf "all")
+        keep it and concatenate each of the following arrays,
+        Results (output="results") concatenate each column and
+        the (values, report) of errors="mask" concatenate both.
+        None if function fails on a block.
+
+    """
+    results=[]
+    for ids,block in archive_blocks(path,chunk,start,stop):
+        result=function(block,*args,axis=0,**kwargs)
+        if result is None:
+            return
+        results.append(result)
+    if not results:
+        return np.empty(0)
+    return _concatenate(results)
+
+def _concatenate(results):
+    """
+    Join the results of consecutive blocks along the treatments.
+    """
+    first=results[0]
+    if isinstance(first,tuple):
+        return tuple(_concatenate([result[i] for result in results]) for i in range(len(first)))
+    if isinstance(first,Results):
+        return Results({name:np.concatenate([result[name] for result in results]) for name in first})
+    if isinstance(first,list):
+        return [first[0]]+[np.concatenate([result[i] for result in results]) for i in range(1,len(first))]
+    return np.concatenate(results)
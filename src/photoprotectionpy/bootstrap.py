@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024 Santiago Guerrero-Higareda
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import numpy as np
+from ._kernels import check_spectrum,protection,resample
+from .critical_wavelength import _critical
+from .grouping import _group_stats
+# Random draws generated at a time, bounding the memory of the replicates.
+_draws=1<<22
+def bootstrap(data,groups,metric=None,C=None,integration=None,replicates=None,
+              confidence=None,seed=None,wavelengths=None,spectrum=None):
+    """
+    Per-product mean, standard deviation, coefficient of variation
+    and bootstrap confidence interval of a metric over plates.
+
+    Parameters
+    ----------
+    data : list, pandas.DataFrame or numpy.array
+        Each column of the array is a plate, where rows
+        correspond to each read measured from 290 to 400 nm
+        (dλ=1).
+    groups : list or numpy.array
+        Product of each plate (column of data).
+    metric : string (optional)
+        "spf" (default), "uvapf" or "cw".
+    C : float and/or array (optional)
+        Coefficient(s) of adjustment applied to "spf" and
+        "uvapf", one per plate or a single value. Default 1.
+    integration : string
+        Choose between "trapz" (default)
+        or "simpson"
+    replicates : int (optional)
+        Number of bootstrap replicates. Default 10000.
+    confidence : float (optional)
+        Confidence level of the interval. Default 0.95.
+    seed : int (optional)
+        Seed of the random generator.
+    wavelengths : list or numpy.array (optional)
+        Wavelength of each reading in nm, when data is not
+        read from 290 to 400 nm at dλ=1 (e.g. 0.5, 2 or
+        5 nm steps). Readings are linearly interpolated onto
+        that grid before evaluation.
+    spectrum : string (optional)
+        Key of the weighting of "spf" or "uvapf" (see
+        register_spectrum). Default the built-in table of
+        the metric.
+
+    Returns
+    -------
+    return : list
+        [["product","n","mean","SD","CV","CI_low","CI_high"]]
+        followed by one array per column, with one entry per
+        product. n counts the plates with a value (a CW found
+        for "cw"); the others are left out of the statistics
+        and of the resampling. CV is given in %.
+
+    """
+    if metric is None:
+        metric="spf"
+    if replicates is None:
+        replicates=10000
+    if confidence is None:
+        confidence=0.95
+    if C is None:
+        C=1.0
+    data=np.asarray(data,dtype="float")
+    groups=np.asarray(groups)
+    if wavelengths is not None:
+        data=resample(data,wavelengths,0)
+        if data is None:
+            return
+    if data.ndim!=2 or data.shape[0]!=111:
+        print("Invalid row number")
+        return
+    plates=data.T
+    if groups.shape!=(plates.shape[0],):
+        print("Dimensions of data and groups do not match")
+        return
+    try:
+        C=np.broadcast_to(np.asarray(C,dtype="float"),plates.shape[0])
+    except ValueError:
+        print("Dimensions of data and value arrays do not match")
+        return
+    if integration is None:
+        integration="trapz"
+    if integration not in ("trapz","simpson"):
+        print("Error: Enter a valid integration method")
+        return
+    if metric in ("spf","uvapf"):
+        spectrum=check_spectrum(spectrum,metric)
+        if spectrum is None:
+            return
+    if metric=="spf":
+        values=protection(plates,C,spectrum,integration)
+    elif metric=="uvapf":
+        values=protection(plates[:,30:],C,spectrum,integration)
+    elif metric=="cw":
+        values=_critical(plates,integration,None).astype(float)
+        values[values<0]=np.nan
+    else:
+        print("Error: Enter a valid metric")
+        return
+    products,inverse=np.unique(groups,return_inverse=True)
+    inverse=inverse.reshape(-1)
+    n,mean,sd,cv=_group_stats(values,inverse,products.size)
+    finite=np.isfinite(values)
+    # Plates with a value sorted by product, so product g owns
+    # ordered[start[g]:start[g]+n[g]].
+    ordered=values[finite][np.argsort(inverse[finite],kind="stable")]
+    start=np.concatenate([[0],np.cumsum(n)[:-1]])
+    size=max(n.max(),1)
+    used=np.arange(size)<n[:,None]
+    if not ordered.size:
+        ordered=np.full(1,np.nan)
+    last=ordered.size-1
+    rng=np.random.default_rng(seed)
+    means=np.empty((replicates,products.size))
+    # Replicates are drawn in chunks; the stream of random numbers, and
+    # so the result for a given seed, does not depend on the chunk size.
+    step=max(_draws//(products.size*size),1)
+    with np.errstate(divide="ignore",invalid="ignore"):
+        for first in range(0,replicates,step):
+            draws=(rng.random((min(step,replicates-first),products.size,size))*n[:,None]).astype(int)
+            picked=ordered[np.minimum(start[:,None]+draws,last)]
+            means[first:first+draws.shape[0]]=np.where(used,picked,0).sum(axis=-1)/n
+    alpha=(1-confidence)/2*100
+    low,high=np.percentile(means,[alpha,100-alpha],axis=0)
+    return [["product","n","mean","SD","CV","CI_low","CI_high"],
+            products,n,mean,sd,cv,low,high]
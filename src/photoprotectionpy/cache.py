@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024 Santiago Guerrero-Higareda
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import collections
+import numpy as np
+_active=[]
+
+class ResultCache:
+    """
+    Per-spectrum results kept in memory (least recently used entries
+    are evicted first) and optionally in an SQLite file. Both tiers
+    are guarded by a lock, so the cache can be shared by threads
+    (e.g. the executor threads of the service).
+    """
+    def __init__(self,maxsize=None,path=None):
+        if maxsize is None:
+            maxsize=100000
+        self.maxsize=maxsize
+        self.path=path
+        self.entries=collections.OrderedDict()
+        self.hits=0
+        self.disk_hits=0
+        self.misses=0
+        import threading
+        self.db=None
+        self.lock=threading.Lock()
+        if path is not None:
+            import sqlite3
+            # The connection is used from whichever thread holds the lock.
+            self.db=sqlite3.connect(path,check_same_thread=False)
+            self.db.execute("CREATE TABLE IF NOT EXISTS results (key BLOB PRIMARY KEY, value BLOB)")
+
+    def _remember(self,key,value):
+        self.entries[key]=value
+        self.entries.move_to_end(key)
+        while len(self.entries)>self.maxsize:
+            self.entries.popitem(last=False)
+
+    def get(self,keys):
+        """
+        Cached value of every key, None where it is missing.
+        """
+        with self.lock:
+            values=[None]*len(keys)
+            missing=[]
+            for i,key in enumerate(keys):
+                value=self.entries.get(key)
+                if value is None:
+                    missing.append(i)
+                else:
+                    self.entries.move_to_end(key)
+                    values[i]=value
+            self.hits+=len(keys)-len(missing)
+            if self.db is not None and missing:
+                found={}
+                # Stay below SQLite's limit on the number of query parameters.
+                for start in range(0,len(missing),900):
+                    batch=[keys[i] for i in missing[start:start+900]]
+                    query="SELECT key, value FROM results WHERE key IN (%s)"%",".join("?"*len(batch))
+                    found.update(self.db.execute(query,batch).fetchall())
+                still=[]
+                for i in missing:
+                    value=found.get(keys[i])
+                    if value is None:
+                        still.append(i)
+                    else:
+                        values[i]=np.frombuffer(value)
+                        self._remember(keys[i],values[i])
+                self.disk_hits+=len(missing)-len(still)
+                missing=still
+            self.misses+=len(missing)
+            return values
+
+    def put(self,keys,values):
+        """
+        Store values (float arrays) under keys in every tier.
+        """
+        with self.lock:
+            for key,value in zip(keys,values):
+                self._remember(key,value)
+            if self.db is not None:
+                with self.db:
+                    self.db.executemany("INSERT OR REPLACE INTO results VALUES (?, ?)",
+                                        [(key,value.tobytes()) for key,value in zip(keys,values)])
+
+    def info(self):
+        """
+        Counters and size of the cache.
+
+        Returns
+        -------
+        info : dict
+            {"hits", "disk_hits", "misses", "size", "maxsize", "path"},
+            where size is the number of entries held in memory.
+
+        """
+        with self.lock:
+            return {"hits":self.hits,"disk_hits":self.disk_hits,"misses":self.misses,
+                    "size":len(self.entries),"maxsize":self.maxsize,"path":self.path}
+
+    def clear(self):
+        """
+        Remove every entry from memory and disk and reset the counters.
+        """
+        with self.lock:
+            self.entries.clear()
+            self.hits=self.disk_hits=self.misses=0
+            if self.db is not None:
+                with self.db:
+                    self.db.execute("DELETE FROM results")
+
+    def close(self):
+        """
+        Close the disk tier.
+        """
+        with self.lock:
+            if self.db is not None:
+                self.db.close()
+                self.db=None
+
+def enable_cache(maxsize=None,path=None):
+    """
+    Cache the coefficient of adjustment "C" found for each spectrum,
+    so that re-submitted plates are looked up instead of searched.
+
+    Entries are keyed by a hash of the spectrum bytes, the target SPF,
+    the integration method, the solver and its parameters, and are
+    shared by adjspf and iso24443 ("calc" and "all" modes).
+
+    Parameters
+    ----------
+    maxsize : int (optional)
+        Number of spectra kept in memory. Default 100000.
+    path : string (optional)
+        SQLite file keeping every entry across runs. By default
+        the cache lives only in memory.
+
+    Returns
+    -------
+    cache : ResultCache
+        The active cache; info() returns its hit and miss counters.
+
+    """
+    disable_cache()
+    _active.append(ResultCache(maxsize,path))
+    return _active[0]
+
+def disable_cache():
+    """
+    Stop caching and close the disk tier of the active cache.
+    """
+    while _active:
+        _active.pop().close()
+
+def cache_info():
+    """
+    info() of the active cache, or None when caching is disabled.
+    """
+    return _active[0].info() if _active else None
+
+def _rows(tag,matrix,values,solve,dtypes):
+    """
+    Per-row results of solve(matrix,values), a tuple of arrays with the
+    given dtypes, taken from the active cache where available and
+    computed for the rest.
+    """
+    if not _active or matrix.shape[0]==0:
+        return solve(matrix,values)
+    import hashlib
+    cache=_active[0]
+    matrix=np.ascontiguousarray(matrix,dtype=np.float64)
+    values=np.ascontiguousarray(values,dtype=np.float64)
+    base=hashlib.blake2b(repr(tag).encode(),digest_size=16)
+    keys=[]
+    for row,value in zip(matrix,values):
+        key=base.copy()
+        key.update(value.tobytes())
+        key.update(row.tobytes())
+        keys.append(key.digest())
+    cached=cache.get(keys)
+    missing=np.array([i for i,value in enumerate(cached) if value is None],dtype=int)
+    if missing.size:
+        computed=np.column_stack(solve(matrix[missing],values[missing])).astype(np.float64)
+        cache.put([keys[i] for i in missing],list(computed))
+        for i,row in zip(missing,computed):
+            cached[i]=row
+    table=np.array(cached)
+    return tuple(table[:,j].astype(dtype) for j,dtype in enumerate(dtypes))
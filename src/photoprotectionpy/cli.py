@@ -0,0 +1,232 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024 Santiago Guerrero-Higareda
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import argparse
+import csv
+import glob
+import importlib.util
+import io
+import os
+import sys
+import numpy as np
+from .initial_spf import ispf
+from .adjusted_spf import adjspf
+from .uva_protectionfactor import uvapf
+from .critical_wavelength import criticalwave
+from .reader import read_chunks
+_metrics=["ispf","adjspf","uvapf","criticalwave"]
+
+def _columns(metrics):
+    """
+    Result columns written for the chosen metrics.
+    """
+    columns=["file","plate"]
+    if "ispf" in metrics:
+        columns.append("SPF")
+    if "adjspf" in metrics:
+        columns.extend(["C","adjSPF"])
+    if "uvapf" in metrics:
+        columns.append("UVAPF")
+    if "criticalwave" in metrics:
+        columns.append("CW")
+    return columns
+
+def _files(inputs,pattern):
+    """
+    Files named by inputs (files, directories or glob patterns),
+    sorted and without duplicates.
+    """
+    files=[]
+    for item in inputs:
+        if os.path.isdir(item):
+            files.extend(path for path in glob.glob(os.path.join(item,pattern)) if os.path.isfile(path))
+        elif os.path.isfile(item):
+            files.append(item)
+        else:
+            files.extend(path for path in glob.glob(item) if os.path.isfile(path))
+    return sorted(set(files))
+
+def _evaluate(path,options):
+    """
+    Result rows of every plate of one export, or an error message.
+    """
+    try:
+        return _plates(path,options)
+    except Exception as error:
+        return "%s: %s"%(type(error).__name__,error)
+
+def _plates(path,options):
+    """
+    Result rows of every plate of one export, see _evaluate.
+    """
+    names=[]
+    blocks=[]
+    for block_names,block in read_chunks(path,options["chunk"],options["delimiter"],options["header"],
+                                         options["index"],options["layout"]):
+        names.extend(block_names)
+        blocks.append(block)
+    if not blocks:
+        return "no spectra could be read"
+    data=np.concatenate(blocks,axis=1)
+    integration=options["integration"]
+    results=[]
+    if "ispf" in options["metrics"]:
+        results.append(ispf(data,integration,axis=0))
+    C=options["C"]
+    if "adjspf" in options["metrics"]:
+        adjusted=adjspf(data,"all",options["target"],integration=integration,solver=options["solver"],axis=0)
+        if adjusted is None:
+            return "adjspf failed"
+        results.extend(adjusted[1:])
+        C=adjusted[1]
+    if "uvapf" in options["metrics"]:
+        results.append(uvapf(data,C,integration,axis=0))
+    if "criticalwave" in options["metrics"]:
+        results.append(criticalwave(data,integration,axis=0))
+    if any(result is None for result in results):
+        return "evaluation failed"
+    file=os.path.relpath(path)
+    return [[file,str(name)]+[column[i].item() for column in results] for i,name in enumerate(names)]
+
+def _resume(checkpoint,columns):
+    """
+    Prepare checkpoint for appending and return the files it already
+    holds. The rows of the last file written are dropped, as a crash
+    may have cut them short, so that file is evaluated again.
+    """
+    with open(checkpoint,newline="") as handle:
+        lines=handle.readlines()
+    if not lines or next(csv.reader(lines[:1]))!=columns:
+        print("Error: %s does not hold results of the chosen metrics"%checkpoint,file=sys.stderr)
+        return
+    rows=[next(csv.reader([line])) for line in lines[1:] if line.endswith("\n")]
+    keep=len(rows)
+    while keep and rows[keep-1][0]==rows[-1][0]:
+        keep-=1
+    with open(checkpoint,"w",newline="") as handle:
+        handle.writelines(lines[:1+keep])
+    return {row[0] for row in rows[:keep]}
+
+def _parquet(checkpoint,output,columns):
+    """
+    Convert the finished CSV checkpoint into a Parquet file.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    with open(checkpoint,newline="") as handle:
+        rows=list(csv.reader(handle))[1:]
+    table={}
+    for j,name in enumerate(columns):
+        values=[row[j] for row in rows]
+        if name in ("file","plate"):
+            table[name]=pa.array(values,pa.string())
+        elif name=="CW":
+            table[name]=pa.array([int(value) for value in values],pa.int64())
+        else:
+            table[name]=pa.array([float(value) for value in values],pa.float64())
+    pq.write_table(pa.table(table),output)
+    os.remove(checkpoint)
+
+def main(argv=None):
+    """
+    Evaluate directories of plate exports from the command line.
+
+    Every file is read with read_chunks, the chosen metrics are
+    computed for each of its plates and one row per plate is appended
+    to a consolidated CSV or Parquet file. Run
+    ``photoprotectionpy --help`` for the options.
+
+    Returns
+    -------
+    status : int
+        0 on success, 1 if some files failed, 2 for invalid options.
+
+    """
+    parser=argparse.ArgumentParser(prog="photoprotectionpy",
+                                   description="Evaluate plate exports (files, directories or glob patterns).")
+    parser.add_argument("inputs",nargs="+",help="export files, directories or glob patterns")
+    parser.add_argument("-o","--output",required=True,help="results file, .csv or .parquet")
+    parser.add_argument("-m","--metrics",nargs="+",choices=_metrics,default=["ispf"],help="metrics to compute")
+    parser.add_argument("-w","--workers",type=int,default=1,help="files evaluated in parallel")
+    parser.add_argument("--resume",action="store_true",help="continue a run that was interrupted")
+    parser.add_argument("--integration",choices=["trapz","simpson"],default="trapz")
+    parser.add_argument("--solver",choices=["step","newton","bisect"],default=None,help="see adjspf")
+    parser.add_argument("--target",type=float,default=None,help="target SPF of adjspf")
+    parser.add_argument("--C",type=float,default=None,help="C of uvapf, by default the one found by adjspf")
+    parser.add_argument("--pattern",default="*.csv",help="files taken from directories (default *.csv)")
+    parser.add_argument("--delimiter",default=None,help="field separator, see read_chunks")
+    parser.add_argument("--header",action="store_true",help="first line holds names, see read_chunks")
+    parser.add_argument("--index",action="store_true",help="first field holds names, see read_chunks")
+    parser.add_argument("--layout",choices=["columns","rows"],default=None,help="see read_chunks")
+    parser.add_argument("--chunk",type=int,default=None,help="plates read at a time, see read_chunks")
+    args=parser.parse_args(argv)
+    if "adjspf" in args.metrics and args.target is None:
+        parser.error("adjspf needs --target")
+    if "uvapf" in args.metrics and "adjspf" not in args.metrics and args.C is None:
+        parser.error("uvapf needs --C or the adjspf metric")
+    parquet=args.output.lower().endswith(".parquet")
+    if parquet and importlib.util.find_spec("pyarrow") is None:
+        print("Error: Parquet output needs pyarrow",file=sys.stderr)
+        return 2
+    checkpoint=args.output+".partial.csv" if parquet else args.output
+    columns=_columns(args.metrics)
+    done=set()
+    if args.resume and os.path.exists(checkpoint):
+        done=_resume(checkpoint,columns)
+        if done is None:
+            return 2
+    elif os.path.exists(checkpoint) or os.path.exists(args.output):
+        print("Error: %s exists; use --resume or remove it"%args.output,file=sys.stderr)
+        return 2
+    else:
+        with open(checkpoint,"w",newline="") as handle:
+            csv.writer(handle).writerow(columns)
+    files=[path for path in _files(args.inputs,args.pattern) if os.path.relpath(path) not in done]
+    options={"metrics":args.metrics,"integration":args.integration,"solver":args.solver,
+             "target":args.target,"C":args.C,"chunk":args.chunk,"delimiter":args.delimiter,
+             "header":args.header,"index":args.index,"layout":args.layout}
+    failed=0
+    with open(checkpoint,"a",newline="") as handle:
+        def record(path,rows):
+            nonlocal failed
+            if isinstance(rows,str):
+                failed+=1
+                print("%s: %s"%(path,rows),file=sys.stderr)
+                return
+            # One write per file, so only the last file can be cut short.
+            text=io.StringIO()
+            csv.writer(text).writerows([[repr(value) if isinstance(value,float) else value for value in row]
+                                        for row in rows])
+            handle.write(text.getvalue())
+            handle.flush()
+            os.fsync(handle.fileno())
+        if args.workers>1 and len(files)>1:
+            from concurrent.futures import ProcessPoolExecutor,as_completed
+            with ProcessPoolExecutor(args.workers) as pool:
+                futures={pool.submit(_evaluate,path,options):path for path in files}
+                for future in as_completed(futures):
+                    try:
+                        rows=future.result()
+                    except Exception as error:
+                        rows="%s: %s"%(type(error).__name__,error)
+                    record(futures[future],rows)
+        else:
+            for path in files:
+                record(path,_evaluate(path,options))
+    if parquet:
+        _parquet(checkpoint,args.output,columns)
+    print("%d files evaluated, %d skipped, %d failed"%(len(files)-failed,len(done),failed),file=sys.stderr)
+    return 1 if failed else 0
@@ -15,12 +15,56 @@ Copyright 2024 Santiago Guerrero-Higareda
    limitations under the License.
 """
 import numpy as np
-import scipy.integrate as sci
-wavelengths=[290,291,292,293,294,295,296,297,298,299,300,301,302,303,304,305,306,307,308,309,310,311,312,313,314,315,316,317,318,319,320,
-              321,322,323,324,325,326,327,328,329,330,331,332,333,334,335,336,337,338,339,340,341,342,343,344,345,346,347,348,349,350,351,
-              352,353,354,355,356,357,358,359,360,361,362,363,364,365,366,367,368,369,370,371,372,373,374,375,376,377,378,379,380,381,382,
-              383,384,385,386,387,388,389,390,391,392,393,394,395,396,397,398,399,400]
-def criticalwave(data,integration=None):
+from ._kernels import resample,tail_weights
+from .instrumentation import _call
+from .results import _results
+from .validation import OptionError,ShapeError,_expand,_fail,_report,_screen
+def _tail_integrals(plates,integration):
+    """
+    Integral of every row of plates from each reading to 400 nm.
+    """
+    if integration=="trapz":
+        segments=(plates[:,1:]+plates[:,:-1])/2
+        tails=np.cumsum(segments[:,::-1],axis=-1)[:,::-1]
+        return np.concatenate([tails,np.zeros((plates.shape[0],1))],axis=-1)
+    return plates@tail_weights(integration).T
+
+def _locate(tails,interpolate):
+    """
+    Critical wavelength of every row of tails (output of
+    _tail_integrals), -1 (or NaN when interpolating) where none is found.
+    """
+    auc_10=tails[:,0]/10
+    # Readings whose tail (reading to 400 nm) still holds 10 % of the area,
+    # searched from 400 nm down as in the original stepwise definition.
+    reached=tails>=auc_10[:,None]
+    found=reached.any(axis=-1)
+    k=110-np.argmax(reached[:,::-1],axis=-1)
+    if interpolate==True:
+        nxt=np.minimum(k+1,110)
+        upper=tails[np.arange(k.size),k]
+        lower=tails[np.arange(k.size),nxt]
+        drop=upper-lower
+        with np.errstate(divide="ignore",invalid="ignore"):
+            fraction=np.where(drop>0,(upper-auc_10)/drop,0.0)
+        return np.where(found,290+k+fraction,np.nan)
+    # The original loop decremented the wavelength before testing it, so
+    # the integer CW is kept 1 nm below the reading k where the crossing
+    # starts (floor of the interpolated CW minus 1).
+    return np.where(found,289+k,-1)
+
+def _critical(plates,integration,interpolate,timer=None):
+    """
+    Critical wavelength of every row of plates (readings from 290
+    to 400 nm), -1 (or NaN when interpolating) where none is found.
+    """
+    tails=_tail_integrals(plates,integration)
+    if timer:
+        timer.mark("integration")
+    return _locate(tails,interpolate)
+
+def criticalwave(data,integration=None,axis=None,interpolate=None,wavelengths=None,errors=None,
+                 output=None):
     """
     Calculate the Critical Wavelength (CW)
 
@@ -31,85 +75,99 @@ def criticalwave(data,integration=None):
     integration : string
         Choose between "trapz" (default)
         or "simpson"
+    axis : int (optional)
+        Axis of data holding the 111 readings from 290 to
+        400 nm. When given, data can have any number of
+        other dimensions and every spectrum is evaluated
+        in one pass.
+    interpolate : boolean (optional)
+        By default False. If true, returns the fractional
+        wavelength at which the area from 290 nm reaches
+        90 % of the total, interpolated between readings.
+        The integer CW keeps the convention of the original
+        stepwise search and is 1 nm below the floor of this
+        value (e.g. 376 for an interpolated 377.29).
+    wavelengths : list or numpy.array (optional)
+        Wavelength of each reading in nm, when data is not
+        read from 290 to 400 nm at dλ=1 (e.g. 0.5, 2 or
+        5 nm steps). Readings are linearly interpolated onto
+        that grid before evaluation.
+    errors : string (optional)
+        "mask" checks every treatment first (see validate)
+        and evaluates only the valid ones, treating the rest
+        as if no CW was found. "raise" raises ShapeError,
+        OptionError or ColumnError instead of printing and
+        returning None. By default readings are evaluated
+        as given.
+    output : string (optional)
+        "results" returns a Results (see as_results) with the
+        column "CW" shaped like the batch (-1 or NaN where no
+        CW is found), instead of an int or list. With
+        errors="mask", the "failed", "flags" and "reasons" of
+        the report are further columns.
 
     Returns
     -------
     CW: int
-        Returns CW.
+        Returns CW. When axis is given, returns a
+        numpy.array of int with the shape of data without
+        the wavelength axis (-1 where no CW is found, or
+        NaN when interpolate is true). With errors="mask",
+        returns (CW, report), report being the output of
+        validate() for the batch; the list then keeps the
+        -1 (or NaN) of failed columns and of those without a
+        CW, so that its positions match the input columns.
 
     """
+    timer=_call("criticalwave")
+    if errors not in (None,"mask","raise"):
+        print("Error: Enter a valid errors option")
+        return
     data=np.asarray(data)
-    dims=data.ndim
-    if len(data.shape)==1:
-        shape=data.shape[0]
-        if shape==111:
-            ...
-        elif shape!=111:
-            print("Invalid row number")
+    if wavelengths is not None:
+        data=resample(data,wavelengths,axis,errors=errors)
+        if data is None:
             return
-    elif len(data.shape)==2:
-        shape=data.shape[0]
-        if shape==111:
-            ...
-        elif shape!=111:
-            print("Invalid row number")
-            return
-    if dims>1:
-        size=data.shape[1]
+    if axis is None:
+        if data.ndim>2 or data.shape[0]!=111:
+            return _fail(errors,ShapeError,"Invalid row number")
+        dims=data.ndim
+        data=data.T
+    else:
+        if data.ndim==0 or data.shape[axis]!=111:
+            return _fail(errors,ShapeError,"Invalid row number")
+        data=np.moveaxis(data,axis,-1)
+    batch_shape=data.shape[:-1]
     if integration is None:
         integration="trapz"
-    if isinstance(integration, str):
-        if integration=="trapz":
-            cw_arrays=[]
-            if dims==1:
-                cw=400
-                auc_10=np.trapz(data)/10
-                for i in range(111):
-                    auc=np.trapz(data[list.index(wavelengths,cw):])
-                    cw=cw-1
-                    if auc>=auc_10:
-                        cw_arrays.append(cw)
-                        return cw
-                        break
-            elif dims>1:
-                for i in range(size):
-                    cw=400
-                    auc_10=np.trapz(data[:,i])/10
-                    plates=data[:,i]
-                    for j in range(111):
-                        auc=np.trapz(plates[list.index(wavelengths,cw):])
-                        cw=cw-1
-                        if auc>=auc_10:
-                            cw_arrays.append(cw)
-                            break
-            return cw_arrays
-        elif integration=="simpson":
-            cw_arrays=[]
-            if dims==1:
-                cw=400
-                auc_10=sci.simpson(y=data,x=wavelengths)/10
-                for i in range(111):
-                    auc=sci.simpson(y=data[list.index(wavelengths,cw):],
-                                    x=wavelengths[list.index(wavelengths,cw):])
-                    cw=cw-1
-                    if auc>=auc_10:
-                        cw_arrays.append(cw)
-                        return cw_arrays
-                        break
-            elif dims>1:
-                for i in range(size):
-                    cw=400
-                    auc_10=sci.simpson(y=data[:,i],x=wavelengths)/10
-                    plates=data[:,i]
-                    for j in range(111):
-                        auc=sci.simpson(y=plates[list.index(wavelengths,cw):],
-                                        x=wavelengths[list.index(wavelengths,cw):])
-                        cw=cw-1
-                        if auc>=auc_10:
-                            cw_arrays.append(cw)
-                            break
-            return cw_arrays    
-        else:
-            print("Error: Enter a valid integration method")
+    if integration not in ("trapz","simpson"):
+        return _fail(errors,OptionError,"Error: Enter a valid integration method")
+    if output not in (None,"results"):
+        return _fail(errors,OptionError,"Error: Enter a valid output")
+    plates=data.reshape(-1,111)
+    flags=_screen(errors,plates,None,batch_shape)
+    if timer:
+        timer.mark("validation")
+    if flags is None or not flags.any():
+        cw_array=_critical(plates,integration,interpolate,timer)
+    else:
+        valid=flags==0
+        cw_array=_critical(plates[valid],integration,interpolate,timer)
+        cw_array=_expand(cw_array,valid,np.nan if interpolate==True else -1)
+    if timer:
+        timer.mark("search")
+        timer.finish(integration=integration,columns=cw_array.size)
+    if output=="results":
+        return _results({"CW":cw_array.reshape(batch_shape)},None if flags is None else flags.reshape(batch_shape))
+    if axis is not None:
+        cw_arrays=cw_array.reshape(batch_shape)
     else:
-        print("Error: Enter a valid integration method")
+        if errors!="mask":
+            # Columns without a CW are left out of the list.
+            cw_array=cw_array[cw_array>=0 if interpolate!=True else ~np.isnan(cw_array)]
+        cw_arrays=[(float(cw) if interpolate==True else int(cw)) for cw in cw_array]
+        if dims==1 and integration=="trapz":
+            cw_arrays=cw_arrays[0] if cw_arrays else None
+    if errors=="mask":
+        return cw_arrays,_report(flags.reshape(batch_shape))
+    return cw_arrays
@@ -0,0 +1,209 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024 Santiago Guerrero-Higareda
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import numpy as np
+from .grouping import _group_stats
+from .pipeline import iso24443
+_columns=["SPF","C","adjSPF","UVAPF0","D","UVAPF","CW"]
+
+class Dataset:
+    """
+    Plates of a study with their ISO 24443 results, recomputing only
+    the plates added or replaced since the last update.
+
+    Parameters
+    ----------
+    integration, solver, parameters, tol, xtol, interpolate, wavelengths
+        Passed to iso24443 for every plate, see iso24443.
+
+    """
+    def __init__(self,integration=None,solver=None,parameters=None,tol=None,xtol=None,
+                 interpolate=None,wavelengths=None):
+        self.options={"integration":integration,"solver":solver,"parameters":parameters,
+                      "tol":tol,"xtol":xtol,"interpolate":interpolate,"wavelengths":wavelengths}
+        self.plates={}
+        self.dirty=set()
+
+    def set(self,plates,pre,target,post=None,product=None):
+        """
+        Add plates, or replace them if already present.
+
+        Parameters
+        ----------
+        plates : hashable or list
+            Identifier of the plate, or a list of identifiers.
+        pre : list or numpy.array
+            Absorbance before UV exposure, read from 290 to 400 nm
+            (dλ=1) unless wavelengths was given, with one column
+            per plate when several are set.
+        target : float and/or array
+            Target or spected SPF(s), one per plate or a single value.
+        post : list or numpy.array (optional)
+            Absorbance after UV exposure, same layout as pre.
+            Default pre.
+        product : hashable and/or list (optional)
+            Product of each plate, used by summary(). Default None.
+
+        """
+        single=np.ndim(plates)==0
+        plates=[plates] if single else list(plates)
+        pre=np.asarray(pre,dtype="float")
+        post=pre if post is None else np.asarray(post,dtype="float")
+        if single:
+            pre=pre[:,None] if pre.ndim==1 else pre
+            post=post[:,None] if post.ndim==1 else post
+        if pre.ndim!=2 or pre.shape[1]!=len(plates):
+            print("Dimensions of data and plates do not match")
+            return
+        if pre.shape!=post.shape:
+            print("Dimensions of pre and post exposure data do not match")
+            return
+        if self.options["wavelengths"] is None and pre.shape[0]!=111:
+            print("Invalid row number")
+            return
+        try:
+            target=np.broadcast_to(np.asarray(target,dtype="float"),len(plates))
+        except ValueError:
+            print("Dimensions of data and value arrays do not match")
+            return
+        products=[product]*len(plates) if np.ndim(product)==0 else list(product)
+        if len(products)!=len(plates):
+            print("Dimensions of plates and products do not match")
+            return
+        for i,plate in enumerate(plates):
+            self.plates[plate]={"pre":pre[:,i].copy(),"post":post[:,i].copy(),"target":float(target[i]),
+                                "product":products[i],"excluded":False,"results":None}
+            self.dirty.add(plate)
+
+    def exclude(self,plate):
+        """
+        Leave plate out of summary() without discarding its results.
+        """
+        record=self.plates.get(plate)
+        if record is None:
+            print("Unknown plate")
+            return
+        record["excluded"]=True
+
+    def include(self,plate):
+        """
+        Count a previously excluded plate again.
+        """
+        record=self.plates.get(plate)
+        if record is None:
+            print("Unknown plate")
+            return
+        record["excluded"]=False
+
+    def remove(self,plate):
+        """
+        Delete plate and its results.
+        """
+        if plate not in self.plates:
+            print("Unknown plate")
+            return
+        del self.plates[plate]
+        self.dirty.discard(plate)
+
+    def update(self):
+        """
+        Evaluate the plates added or replaced since the last update,
+        in a single iso24443 call.
+
+        Returns
+        -------
+        count : int
+            Number of plates evaluated, or None if iso24443 failed.
+
+        """
+        plates=[plate for plate in self.plates if plate in self.dirty]
+        if not plates:
+            return 0
+        records=[self.plates[plate] for plate in plates]
+        results=iso24443(np.stack([record["pre"] for record in records],-1),
+                         np.stack([record["post"] for record in records],-1),
+                         [record["target"] for record in records],axis=0,**self.options)
+        if results is None:
+            return
+        table=np.column_stack(results[1:]).astype(float)
+        for record,row in zip(records,table):
+            record["results"]=row
+        self.dirty.clear()
+        return len(plates)
+
+    def results(self):
+        """
+        Results of every plate, after bringing them up to date.
+
+        Returns
+        -------
+        return : list
+            [["plate","product","excluded","SPF","C","adjSPF",
+            "UVAPF0","D","UVAPF","CW"]] followed by one list or
+            numpy.array per column, with one entry per plate in
+            the order they were first set.
+
+        """
+        if self.update() is None:
+            return
+        records=list(self.plates.values())
+        table=np.array([record["results"] for record in records]).reshape(len(records),len(_columns))
+        return [["plate","product","excluded"]+_columns,list(self.plates),
+                [record["product"] for record in records],
+                np.array([record["excluded"] for record in records],dtype=bool)]+list(table.T)
+
+    def summary(self,metric=None):
+        """
+        Per-product statistics of a result over the included plates,
+        after bringing them up to date.
+
+        Parameters
+        ----------
+        metric : string (optional)
+            "SPF" (default), "C", "adjSPF", "UVAPF0", "D",
+            "UVAPF" or "CW".
+
+        Returns
+        -------
+        return : list
+            [["product","n","mean","SD","CV"]] followed by one
+            list or numpy.array per column, with one entry per
+            product in the order they were first set. Results
+            that are not finite (e.g. NaN of plates failing
+            validation) are left out, and n counts the others.
+            CV is given in %.
+
+        """
+        if metric is None:
+            metric="SPF"
+        if metric not in _columns:
+            print("Error: Enter a valid metric")
+            return
+        if self.update() is None:
+            return
+        j=_columns.index(metric)
+        # Statistics are recomputed from the stored plate results rather
+        # than kept as running sums: those stay NaN once a failed plate is
+        # added, cannot exclude it again exactly and lose precision for
+        # large values with a small spread. A pass over a few floats per
+        # plate is small next to evaluating one.
+        records=[record for record in self.plates.values() if not record["excluded"]]
+        # Index of each product in order of appearance; products can be any hashable.
+        codes={}
+        inverse=np.array([codes.setdefault(record["product"],len(codes)) for record in records],dtype=int)
+        values=np.array([record["results"][j] for record in records],dtype=float)
+        n,mean,sd,cv=_group_stats(values,inverse,len(codes))
+        return [["product","n","mean","SD","CV"],list(codes),n,mean,sd,cv]
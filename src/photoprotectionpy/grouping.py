@@ -0,0 +1,241 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024 Santiago Guerrero-Higareda
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import numpy as np
+from ._kernels import check_spectrum,protection,resample,transmittance
+from .critical_wavelength import _critical
+from .instrumentation import _call
+from .validation import OptionError,ShapeError,_fail,_report,_screen
+_names={"spf":"SPF","uvapf":"UVAPF","ratio":"UVAPF/SPF","cw":"CW"}
+
+def _group_median(values,inverse,counts):
+    """
+    Median of the finite values of every group, NaN for groups
+    without any.
+    """
+    finite=np.isfinite(values)
+    # Groups in order, finite values first and sorted within each group.
+    ordered=values[np.lexsort((values,~finite,inverse))]
+    n=np.bincount(inverse,weights=finite,minlength=counts.size).astype(int)
+    starts=np.concatenate([[0],np.cumsum(counts)[:-1]])
+    last=values.size-1
+    lower=ordered[np.minimum(starts+np.maximum(n-1,0)//2,last)]
+    upper=ordered[np.minimum(starts+n//2,last)]
+    return np.where(n>0,(lower+upper)/2,np.nan)
+
+def _group_stats(values,inverse,groups):
+    """
+    Number of finite values, mean, SD and CV (%) of the finite values
+    of each of groups groups, group inverse[i] holding values[i]. The
+    SD is taken from the deviations to the mean (two passes), which
+    keeps its precision for large values with a small spread.
+    """
+    finite=np.isfinite(values)
+    n=np.bincount(inverse,weights=finite,minlength=groups)
+    with np.errstate(divide="ignore",invalid="ignore"):
+        mean=np.bincount(inverse,weights=np.where(finite,values,0),minlength=groups)/n
+        deviation=np.where(finite,values-mean[inverse],0)
+        sd=np.sqrt(np.bincount(inverse,weights=deviation**2,minlength=groups)/(n-1))
+        cv=sd/mean*100
+    return n.astype(int),mean,sd,cv
+
+def _group_outliers(values,inverse,counts,threshold):
+    """
+    Whether each value lies more than threshold modified z-scores
+    (0.6745 × deviation / MAD) from the median of its group.
+    """
+    median=_group_median(values,inverse,counts)
+    deviation=np.abs(values-median[inverse])
+    mad=_group_median(deviation,inverse,counts)
+    with np.errstate(divide="ignore",invalid="ignore"):
+        score=0.6745*deviation/mad[inverse]
+    return score>threshold
+
+def aggregate(data,products=None,plates=None,metrics=None,C=None,integration=None,
+              min_plates=None,outliers=None,interpolate=None,wavelengths=None,
+              spectrum=None,uva_spectrum=None,errors=None):
+    """
+    Evaluate labelled plates and summarize them per product.
+
+    Every plate is evaluated in one vectorized pass and the results
+    are reduced by product with array group-by operations, without
+    splitting data by product.
+
+    Parameters
+    ----------
+    data : list, pandas.DataFrame or numpy.array
+        Each column is a plate, where rows correspond to each read
+        measured from 290 to 400 nm (dλ=1).
+    products : list or numpy.array (optional)
+        Product of each plate. By default the column labels of a
+        DataFrame, or the first level of its MultiIndex columns.
+    plates : list or numpy.array (optional)
+        Label of each plate. By default the second level of
+        MultiIndex columns, or the position of the plate within
+        its product (0, 1, 2, ...).
+    metrics : list (optional)
+        Any of "spf", "uvapf", "ratio" (UVA-PF/SPF) and "cw".
+        Default ["spf","uvapf","cw"].
+    C : float and/or array (optional)
+        Coefficient(s) of adjustment applied to "spf" and
+        "uvapf", one per plate or a single value. Default 1.
+    integration : string
+        Choose between "trapz" (default)
+        or "simpson"
+    min_plates : int (optional)
+        Plates a product needs to be complete. Default 3, the
+        minimum of ISO 24443.
+    outliers : float (optional)
+        Modified z-score (deviation from the product median over
+        the median absolute deviation, × 0.6745) above which a
+        plate is flagged as an outlier. Default 3.5.
+    interpolate : boolean (optional)
+        By default False. If true, CW is interpolated between
+        readings, see criticalwave.
+    wavelengths : list or numpy.array (optional)
+        Wavelength of each reading in nm, when data is not
+        read from 290 to 400 nm at dλ=1. Readings are linearly
+        interpolated onto that grid before evaluation.
+    spectrum, uva_spectrum : string (optional)
+        Keys of the SPF and UVA-PF weightings, see
+        register_spectrum.
+    errors : string (optional)
+        "mask" checks every plate and C first (see validate) and
+        leaves failed plates out of the product statistics.
+        "raise" raises ShapeError, OptionError or ColumnError
+        instead of printing and returning None.
+
+    Returns
+    -------
+    return : list
+        [plate_results, product_results]. plate_results is
+        [["product","plate",<metrics>...,<metric>_outlier...]]
+        followed by one array per column with one entry per
+        plate in the order of data. product_results is
+        [["product","n","complete",<metric>_mean,<metric>_SD,
+        <metric>_CV...,"outliers"]] followed by one array per
+        column with one entry per product (sorted), where n
+        counts the plates evaluated, complete tells whether n reaches
+        min_plates and outliers counts the plates flagged for
+        any metric. CV is given in %. With errors="mask",
+        returns (results, report), report being the output of
+        validate() for the plates.
+
+    """
+    timer=_call("aggregate")
+    if errors not in (None,"mask","raise"):
+        print("Error: Enter a valid errors option")
+        return
+    columns=getattr(data,"columns",None)
+    if products is None and columns is not None:
+        if getattr(columns,"nlevels",1)>1:
+            products=columns.get_level_values(0)
+            if plates is None:
+                plates=columns.get_level_values(1)
+        else:
+            products=columns
+    if products is None:
+        return _fail(errors,ShapeError,"Error: Enter the product of each plate")
+    data=np.asarray(data,dtype="float")
+    if wavelengths is not None:
+        data=resample(data,wavelengths,errors=errors)
+        if data is None:
+            return
+    if data.ndim==1:
+        data=data[:,None]
+    if data.ndim!=2 or data.shape[0]!=111:
+        return _fail(errors,ShapeError,"Invalid row number")
+    data=data.T
+    products=np.asarray(products)
+    if products.shape!=(data.shape[0],):
+        return _fail(errors,ShapeError,"Dimensions of data and products do not match")
+    if plates is not None:
+        plates=np.asarray(plates)
+        if plates.shape!=products.shape:
+            return _fail(errors,ShapeError,"Dimensions of data and plates do not match")
+    try:
+        C=np.broadcast_to(np.asarray(1.0 if C is None else C,dtype="float"),data.shape[0])
+    except ValueError:
+        return _fail(errors,ShapeError,"Dimensions of data and value arrays do not match")
+    if metrics is None:
+        metrics=["spf","uvapf","cw"]
+    if isinstance(metrics,str) or not metrics or any(metric not in _names for metric in metrics):
+        return _fail(errors,OptionError,"Error: Enter valid metrics")
+    if integration is None:
+        integration="trapz"
+    if integration not in ("trapz","simpson"):
+        return _fail(errors,OptionError,"Error: Enter a valid integration method")
+    spectrum=check_spectrum(spectrum,"spf",errors)
+    uva_spectrum=check_spectrum(uva_spectrum,"uvapf",errors)
+    if spectrum is None or uva_spectrum is None:
+        return
+    if min_plates is None:
+        min_plates=3
+    if outliers is None:
+        outliers=3.5
+    flags=_screen(errors,data,C,(data.shape[0],))
+    if timer:
+        timer.mark("validation")
+    values={}
+    if {"spf","uvapf","ratio"} & set(metrics):
+        transmitted=transmittance(data,C)
+        if timer:
+            timer.mark("exponentiation")
+        values["spf"]=protection(data,C,spectrum,integration,timer=timer,transmitted=transmitted)
+        values["uvapf"]=protection(data[:,30:],C,uva_spectrum,integration,timer=timer,
+                                   transmitted=transmitted[:,30:])
+        values["ratio"]=values["uvapf"]/values["spf"]
+    if "cw" in metrics:
+        values["cw"]=_critical(data,integration,interpolate,timer).astype(float)
+        if interpolate!=True:
+            values["cw"][values["cw"]<0]=np.nan
+        if timer:
+            timer.mark("search")
+    if flags is not None:
+        for metric in values:
+            values[metric][flags!=0]=np.nan
+    groups,inverse,counts=np.unique(products,return_inverse=True,return_counts=True)
+    inverse=inverse.reshape(-1)
+    if plates is None:
+        # Position of each plate among those of its product, in column order.
+        order=np.argsort(inverse,kind="stable")
+        starts=np.concatenate([[0],np.cumsum(counts)[:-1]])
+        plates=np.empty(inverse.size,dtype=int)
+        plates[order]=np.arange(inverse.size)-starts[inverse[order]]
+    plate_results=[["product","plate"],products,plates]
+    # Failed plates do not count towards the plates of their product.
+    n=counts if flags is None else np.bincount(inverse,weights=flags==0,minlength=groups.size).astype(int)
+    product_results=[["product","n","complete"],groups,n,n>=min_plates]
+    flagged=np.zeros(inverse.size,dtype=bool)
+    for metric in metrics:
+        outlier=_group_outliers(values[metric],inverse,counts,outliers)
+        flagged|=outlier
+        plate_results[0].append(_names[metric])
+        plate_results.append(values[metric])
+        plate_results[0].append(_names[metric]+"_outlier")
+        plate_results.append(outlier)
+        _,mean,sd,cv=_group_stats(values[metric],inverse,groups.size)
+        product_results[0].extend([_names[metric]+"_mean",_names[metric]+"_SD",_names[metric]+"_CV"])
+        product_results.extend([mean,sd,cv])
+    product_results[0].append("outliers")
+    product_results.append(np.bincount(inverse,weights=flagged,minlength=groups.size).astype(int))
+    if timer:
+        timer.mark("reduction")
+        timer.finish(integration=integration,columns=data.shape[0])
+    results=[plate_results,product_results]
+    if errors=="mask":
+        return results,_report(flags)
+    return results
@@ -0,0 +1,140 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024 Santiago Guerrero-Higareda
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import contextlib
+import json
+import time
+import numpy as np
+_recorders=[]
+_listeners=[]
+
+class _Call:
+    """
+    Stage timings and per-column statistics of one function call.
+    """
+    def __init__(self,function):
+        self.function=function
+        self.start=self.last=time.perf_counter()
+        self.stages={}
+        self.info={}
+
+    def mark(self,stage):
+        """
+        Attribute the time elapsed since the previous mark to stage.
+        """
+        now=time.perf_counter()
+        self.stages[stage]=self.stages.get(stage,0.0)+now-self.last
+        self.last=now
+
+    def finish(self,**info):
+        """
+        Complete the record and hand it to recorders and listeners.
+        """
+        self.info.update(info)
+        record={"function":self.function,"seconds":time.perf_counter()-self.start,
+                "stages":self.stages}
+        for key,value in self.info.items():
+            record[key]=value.tolist() if isinstance(value,np.ndarray) else value
+        for recorder in _recorders:
+            recorder.records.append(record)
+        for listener in _listeners:
+            listener(record)
+
+def _call(function):
+    """
+    Start a record for function, or None when nothing is listening.
+    """
+    if _recorders or _listeners:
+        return _Call(function)
+    return None
+
+class Recorder:
+    """
+    Records collected inside an instrument() block.
+    """
+    def __init__(self):
+        self.records=[]
+
+    def to_dict(self):
+        """
+        Records of every call and a summary per function.
+
+        Returns
+        -------
+        stats : dict
+            {"calls": [...], "summary": {function: {"calls",
+            "seconds", "columns", "iterations", "capped",
+            "stages"}}}.
+
+        """
+        summary={}
+        for record in self.records:
+            entry=summary.setdefault(record["function"],{"calls":0,"seconds":0.0,"columns":0,
+                                                         "iterations":0,"capped":0,"stages":{}})
+            entry["calls"]+=1
+            entry["seconds"]+=record["seconds"]
+            entry["columns"]+=record.get("columns",0)
+            entry["iterations"]+=int(np.sum(record.get("iterations",0)))
+            entry["capped"]+=int(np.sum(record.get("capped",0)))
+            for stage,seconds in record["stages"].items():
+                entry["stages"][stage]=entry["stages"].get(stage,0.0)+seconds
+        return {"calls":list(self.records),"summary":summary}
+
+    def to_json(self,**kwargs):
+        """
+        to_dict() serialized as JSON; kwargs are passed to json.dumps.
+        """
+        return json.dumps(self.to_dict(),**kwargs)
+
+@contextlib.contextmanager
+def instrument():
+    """
+    Record timings and solver statistics of the calls made inside a
+    with block.
+
+    Each call of ispf, adjspf, uvapf, criticalwave, iso24443, screen,
+    photostability or aggregate adds a record with its total time, the
+    time spent in each stage ("validation", "mixing", "exponentiation",
+    "integration", "gradient", "search", "reduction"), the number of
+    columns and, when C is determined, the iterations used by each
+    column, whether it converged and whether it stopped at the
+    iteration limit ("capped").
+
+    Yields
+    ------
+    recorder : Recorder
+        Collected records, exportable with to_dict() or to_json().
+
+    """
+    recorder=Recorder()
+    _recorders.append(recorder)
+    try:
+        yield recorder
+    finally:
+        _recorders.remove(recorder)
+
+def add_listener(callback):
+    """
+    Call callback(record) after every instrumented call, e.g. to
+    forward records to a metrics pipeline. See instrument().
+    """
+    _listeners.append(callback)
+
+def remove_listener(callback):
+    """
+    Stop calling a callback registered with add_listener.
+    """
+    _listeners.remove(callback)
@@ -0,0 +1,182 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024 Santiago Guerrero-Higareda
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import numpy as np
+from ._kernels import check_spectrum,protection,resample,transmittance
+from .critical_wavelength import _critical
+from .uv_exposuredose import uvdose
+from .instrumentation import _call
+from .validation import OptionError,ShapeError,_fail,_report,_screen
+
+def _at_dose(doses,curves,D):
+    """
+    Linear interpolation of every curve (dose step × sample) at the
+    dose D of each sample, NaN outside the doses measured.
+    """
+    k=np.clip((doses<=D).sum(axis=0)-1,0,doses.shape[0]-2)[None]
+    lower=np.take_along_axis(doses,k,0)[0]
+    upper=np.take_along_axis(doses,k+1,0)[0]
+    fraction=(D-lower)/(upper-lower)
+    inside=(D>=doses[0]) & (D<=doses[-1])
+    results=[]
+    for curve in curves:
+        below=np.take_along_axis(curve,k,0)[0]
+        above=np.take_along_axis(curve,k+1,0)[0]
+        results.append(np.where(inside,below+(above-below)*fraction,np.nan))
+    return results
+
+def photostability(data,doses,C,integration=None,axis=None,dose_axis=None,iso=None,
+                   interpolate=None,wavelengths=None,errors=None,spectrum=None,uva_spectrum=None):
+    """
+    Evaluate adjusted *in vitro* SPF, UVA-PF and CW of every sample
+    at every step of a stepwise UV exposure, in a single pass.
+
+    Parameters
+    ----------
+    data : numpy.array
+        Absorbance of every sample after each dose step, with the
+        dose steps along dose_axis, the readings from 290 to 400
+        nm (dλ=1) along axis and any number of other dimensions
+        for the samples, e.g. dose step × 111 × plate.
+    doses : list or numpy.array
+        Dose received at each step in J/cm^2, either one value per
+        step shared by every sample or an array broadcasting to
+        dose step × sample. The first step is taken as the
+        unexposed state.
+    C : float and/or array
+        Coefficient of adjustment "C" of each sample (see adjspf),
+        broadcast against the sample dimensions.
+    integration : string
+        Choose between "trapz" (default)
+        or "simpson"
+    axis : int (optional)
+        Axis of data holding the 111 readings. Default 1.
+    dose_axis : int (optional)
+        Axis of data holding the dose steps. Default 0.
+    iso : boolean (optional)
+        By default False. If true, every curve is also linearly
+        interpolated at the ISO 24443 exposure dose of each
+        sample, uvdose of its UVA-PF at the first step (NaN
+        when that dose lies outside the doses measured).
+    interpolate : boolean (optional)
+        By default False. If true, CW is interpolated between
+        readings, see criticalwave.
+    wavelengths : list or numpy.array (optional)
+        Wavelength of each reading in nm, when data is not
+        read from 290 to 400 nm at dλ=1. Readings are linearly
+        interpolated onto that grid before evaluation.
+    errors : string (optional)
+        "mask" checks every spectrum and C first (see validate)
+        and gives NaN (and a CW of -1) at every step of the
+        samples with any failed spectrum. "raise" raises
+        ShapeError, OptionError or ColumnError instead of
+        printing and returning None.
+    spectrum : string (optional)
+        Key of the SPF weighting (see register_spectrum).
+        Default "spf", the erythema action spectrum × UV-SSR.
+    uva_spectrum : string (optional)
+        Key of the UVA-PF weighting (see register_spectrum).
+        Default "uvapf", the PPD action spectrum × UVA source.
+
+    Returns
+    -------
+    return : list
+        [["dose","SPF","UVAPF","CW"]] followed by numpy.array of
+        dose step × sample for each of them. With iso, the header
+        continues with "D","SPF_D","UVAPF_D","CW_D": the ISO dose
+        of each sample and the results interpolated there, with
+        the sample dimensions only. With errors="mask", returns
+        (results, report), report being the output of validate()
+        for the samples.
+
+    """
+    timer=_call("photostability")
+    if errors not in (None,"mask","raise"):
+        print("Error: Enter a valid errors option")
+        return
+    data=np.asarray(data)
+    if data.dtype!=np.float32:
+        data=np.asarray(data,dtype="float")
+    if axis is None:
+        axis=1
+    if dose_axis is None:
+        dose_axis=0
+    if data.ndim<2 or not -data.ndim<=axis<data.ndim or not -data.ndim<=dose_axis<data.ndim \
+            or axis%data.ndim==dose_axis%data.ndim:
+        return _fail(errors,ShapeError,"Dose steps and readings must be two different axes of data")
+    if wavelengths is not None:
+        data=resample(data,wavelengths,axis,errors=errors)
+        if data is None:
+            return
+    if data.shape[axis]!=111:
+        return _fail(errors,ShapeError,"Invalid row number")
+    data=np.moveaxis(data,(dose_axis,axis),(0,-1))
+    steps=data.shape[0]
+    sample_shape=data.shape[1:-1]
+    doses=np.asarray(doses,dtype="float")
+    if doses.ndim==1:
+        doses=doses.reshape((-1,)+(1,)*len(sample_shape))
+    try:
+        doses=np.broadcast_to(doses,(steps,)+sample_shape)
+        C=np.broadcast_to(np.asarray(C,dtype="float"),sample_shape)
+    except ValueError:
+        return _fail(errors,ShapeError,"Dimensions of data and value arrays do not match")
+    if integration is None:
+        integration="trapz"
+    if integration not in ("trapz","simpson"):
+        return _fail(errors,OptionError,"Error: Enter a valid integration method")
+    spectrum=check_spectrum(spectrum,"spf",errors)
+    uva_spectrum=check_spectrum(uva_spectrum,"uvapf",errors)
+    if spectrum is None or uva_spectrum is None:
+        return
+    if iso==True:
+        if steps<2:
+            return _fail(errors,ShapeError,"At least two dose steps are needed")
+        if not (np.diff(doses,axis=0)>0).all():
+            return _fail(errors,ShapeError,"Doses must be strictly increasing")
+    matrix=data.reshape(-1,111)
+    C_rows=np.broadcast_to(C,(steps,)+sample_shape).reshape(-1)
+    flags=_screen(errors,matrix,C_rows,(steps,)+sample_shape)
+    if flags is not None:
+        # A sample fails as a whole if any of its steps does.
+        flags=np.bitwise_or.reduce(flags.reshape((steps,)+sample_shape),axis=0)
+    if timer:
+        timer.mark("validation")
+    transmitted=transmittance(matrix,C_rows)
+    if timer:
+        timer.mark("exponentiation")
+    spf=protection(matrix,C_rows,spectrum,integration,timer=timer,transmitted=transmitted)
+    uvapf=protection(matrix[:,30:],C_rows,uva_spectrum,integration,timer=timer,transmitted=transmitted[:,30:])
+    cw=_critical(matrix,integration,interpolate,timer)
+    if timer:
+        timer.mark("search")
+    curves=[column.reshape((steps,)+sample_shape) for column in (spf,uvapf,cw)]
+    if flags is not None and flags.any():
+        failed=flags!=0
+        curves=[np.where(failed,np.nan if curve.dtype.kind=="f" else -1,curve) for curve in curves]
+    results=[["dose","SPF","UVAPF","CW"],np.array(doses)]+curves
+    if iso==True:
+        D=uvdose(curves[1][0])
+        # Steps without a CW (-1) must not be interpolated as wavelengths.
+        cw=np.where(curves[2]<0,np.nan,curves[2]) if interpolate!=True else curves[2]
+        results[0].extend(["D","SPF_D","UVAPF_D","CW_D"])
+        results.append(D)
+        results.extend(_at_dose(doses,[curves[0],curves[1],cw],D))
+    if timer:
+        timer.finish(integration=integration,columns=matrix.shape[0])
+    if errors=="mask":
+        return results,_report(flags)
+    return results
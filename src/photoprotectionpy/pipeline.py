@@ -0,0 +1,204 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024 Santiago Guerrero-Higareda
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import numpy as np
+from ._kernels import check_spectrum,protection,resample,transmittance
+from .adjusted_spf import _find_c
+from .critical_wavelength import _critical
+from .uv_exposuredose import uvdose
+from .instrumentation import _call
+from .results import _results
+from .validation import OptionError,ShapeError,_expand,_fail,_report,_screen
+def iso24443(pre,post,values,parameters=None,integration=None,solver=None,
+             tol=None,xtol=None,axis=None,interpolate=None,wavelengths=None,errors=None,
+             spectrum=None,uva_spectrum=None,output=None):
+    """
+    Evaluate the full ISO 24443 sequence in a single pass: initial
+    *in vitro* SPF, coefficient of adjustment "C", adjusted *in vitro*
+    SPF, UVA-PF<sub>0<sub>, UV exposure dose, UVA-PF and CW.
+
+    Parameters
+    ----------
+    pre : list, pandas.DataFrame or numpy.array
+        Absorbance before UV exposure. Each column of the array
+        is a treatment, where rows correspond to each read
+        measured from 290 to 400 nm (dλ=1).
+    post : list, pandas.DataFrame or numpy.array
+        Absorbance after UV exposure, with the same layout
+        as pre.
+    values : float and/or array
+        Target(s) or spected SPF(s), one per treatment or a
+        single value for all of them.
+    parameters : float and/or array (optional)
+        [Δλ,iterations] used to determine C, see adjspf.
+    integration : string
+        Choose between "trapz" (default)
+        or "simpson"
+    solver : string (optional)
+        Method used to find C: "step" (default), "newton"
+        or "bisect", see adjspf.
+    tol : float (optional)
+        Absolute tolerance on the SPF for "newton" and
+        "bisect". Default 1e-06.
+    xtol : float (optional)
+        Absolute tolerance on C for "newton" and "bisect".
+        Default 1e-09.
+    axis : int (optional)
+        Axis of pre and post holding the 111 readings. When
+        given, results are returned as numpy.array with the
+        shape of the data without the wavelength axis.
+    interpolate : boolean (optional)
+        By default False. If true, CW is interpolated between
+        readings, see criticalwave.
+    wavelengths : list or numpy.array (optional)
+        Wavelength of each reading in nm, when data is not
+        read from 290 to 400 nm at dλ=1 (e.g. 0.5, 2 or
+        5 nm steps). Readings are linearly interpolated onto
+        that grid before evaluation.
+    errors : string (optional)
+        "mask" checks the pre and post exposure readings and
+        the targets of every treatment first (see validate)
+        and evaluates only the valid ones, giving NaN (and a
+        CW of -1) for the rest. "raise" raises ShapeError,
+        OptionError or ColumnError instead of printing and
+        returning None. By default readings are evaluated
+        as given.
+    spectrum : string (optional)
+        Key of the SPF weighting (see register_spectrum).
+        Default "spf", the erythema action spectrum × UV-SSR.
+    uva_spectrum : string (optional)
+        Key of the UVA-PF weighting (see register_spectrum).
+        Default "uvapf", the PPD action spectrum × UVA source.
+    output : string (optional)
+        "results" returns a Results (see as_results) with these
+        columns and the "converged" and "iterations" of the
+        search of C, shaped like the batch, instead of lists.
+        With errors="mask", the "failed", "flags" and "reasons"
+        of the report are further columns.
+
+    Returns
+    -------
+    return : list
+        [["SPF","C","adjSPF","UVAPF0","D","UVAPF","CW"]]
+        followed by the values of each treatment for every
+        result, in that order. With errors="mask", returns
+        (results, report), report being the output of
+        validate() for the batch.
+
+    """
+    timer=_call("iso24443")
+    if errors not in (None,"mask","raise"):
+        print("Error: Enter a valid errors option")
+        return
+    if parameters is None:
+        dl=1e-5
+        iterations=150000
+    else:
+        params=np.asarray(parameters)
+        if params.size!=2:
+            return _fail(errors,OptionError,"Error: Too many parameters")
+        dl=params[0]
+        iterations=int(params[1])
+    if solver is None:
+        solver="step"
+    if solver not in ("step","newton","bisect"):
+        return _fail(errors,OptionError,"Error: Enter a valid solver")
+    if solver!="step":
+        if parameters is None:
+            iterations=100
+        if tol is None:
+            tol=1e-6
+        if xtol is None:
+            xtol=1e-9
+    pre=np.asarray(pre,dtype="float")
+    post=np.asarray(post,dtype="float")
+    values=np.asarray(values,dtype="float")
+    if pre.shape!=post.shape:
+        return _fail(errors,ShapeError,"Dimensions of pre and post exposure data do not match")
+    if wavelengths is not None:
+        pre=resample(pre,wavelengths,axis,errors=errors)
+        if pre is None:
+            return
+        post=resample(post,wavelengths,axis)
+    if axis is None:
+        if pre.ndim>2 or pre.shape[0]!=111:
+            return _fail(errors,ShapeError,"Invalid row number")
+        pre=pre.T
+        post=post.T
+    else:
+        if pre.ndim==0 or pre.shape[axis]!=111:
+            return _fail(errors,ShapeError,"Invalid row number")
+        pre=np.moveaxis(pre,axis,-1)
+        post=np.moveaxis(post,axis,-1)
+    batch_shape=pre.shape[:-1]
+    try:
+        values=np.broadcast_to(values,batch_shape).reshape(-1)
+    except ValueError:
+        return _fail(errors,ShapeError,"Dimensions of data and value arrays do not match")
+    if integration is None:
+        integration="trapz"
+    if integration not in ("trapz","simpson"):
+        return _fail(errors,OptionError,"Error: Enter a valid integration method")
+    if output not in (None,"results"):
+        return _fail(errors,OptionError,"Error: Enter a valid output")
+    spectrum=check_spectrum(spectrum,"spf",errors)
+    uva_spectrum=check_spectrum(uva_spectrum,"uvapf",errors)
+    if spectrum is None or uva_spectrum is None:
+        return
+    pre=pre.reshape(-1,111)
+    post=post.reshape(-1,111)
+    flags=_screen(errors,pre,values,batch_shape,post)
+    valid=None
+    if flags is not None and flags.any():
+        valid=flags==0
+        pre=pre[valid]
+        post=post[valid]
+        values=values[valid]
+    if timer:
+        timer.mark("validation")
+    spf=protection(pre,None,spectrum,integration,timer=timer)
+    C,converged,n=_find_c(pre,values,integration,solver,dl,iterations,tol,xtol,timer,None,spectrum)
+    # The C-adjusted pre-exposure transmittance gives both the adjusted
+    # SPF and, from 320 nm on, UVA-PF0.
+    transmitted=transmittance(pre,C)
+    if timer:
+        timer.mark("exponentiation")
+    adjusted=protection(pre,C,spectrum,integration,timer=timer,transmitted=transmitted)
+    uvapf0=protection(pre[:,30:],C,uva_spectrum,integration,timer=timer,transmitted=transmitted[:,30:])
+    uvapf=protection(post[:,30:],C,uva_spectrum,integration,timer=timer)
+    cw=_critical(post,integration,interpolate,timer)
+    if timer:
+        timer.mark("search")
+        timer.finish(integration=integration,solver=solver,columns=C.size,
+                     iterations=n,converged=converged,capped=~converged & (n>=iterations))
+    results=[["SPF","C","adjSPF","UVAPF0","D","UVAPF","CW"],
+             spf,C,adjusted,uvapf0,uvdose(uvapf0),uvapf,cw]
+    if valid is not None:
+        results[1:]=[_expand(column,valid,np.nan if column.dtype.kind=="f" else -1) for column in results[1:]]
+    if output=="results":
+        table=dict(zip(results[0],[column.reshape(batch_shape) for column in results[1:]]))
+        if valid is not None:
+            converged=_expand(converged,valid,False)
+            n=_expand(n,valid,0)
+        table.update({"converged":converged.reshape(batch_shape),"iterations":n.reshape(batch_shape)})
+        return _results(table,None if flags is None else flags.reshape(batch_shape))
+    if axis is None:
+        results[1:]=[list(column) for column in results[1:]]
+    else:
+        results[1:]=[column.reshape(batch_shape) for column in results[1:]]
+    if errors=="mask":
+        return results,_report(flags.reshape(batch_shape))
+    return results
@@ -0,0 +1,301 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024 Santiago Guerrero-Higareda
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import io
+import os
+import numpy as np
+def _open(source):
+    """
+    Return a seekable handle on source and whether it must be closed.
+    """
+    if isinstance(source,(str,bytes,os.PathLike)):
+        return open(source,"rb"),True
+    if isinstance(source,io.TextIOWrapper):
+        return source.buffer,False
+    return source,False
+
+def _unquote(field):
+    """
+    field without the double quotes of a quoted CSV field.
+    """
+    quote='"' if isinstance(field,str) else b'"'
+    if len(field)>1 and field[:1]==quote and field[-1:]==quote:
+        return field[1:-1].replace(quote*2,quote)
+    return field
+
+def _split(line,delimiter):
+    """
+    Split one line of an export into stripped, unquoted fields,
+    ignoring a trailing delimiter.
+    """
+    fields=[field.strip() for field in line.rstrip("\r\n" if isinstance(line,str) else b"\r\n").split(delimiter)]
+    if len(fields)>1 and not fields[-1]:
+        fields.pop()
+    return [_unquote(field) for field in fields]
+
+def _to_array(block):
+    """
+    block of fields as a float array, or None (after printing) when
+    a field is not a number.
+    """
+    try:
+        return np.asarray(block,dtype=float)
+    except ValueError:
+        print("Invalid absorbance value")
+        return None
+
+def _line_offsets(handle,size):
+    """
+    Offsets of the start of every non-empty line of handle.
+    """
+    newline="\n" if isinstance(handle.read(0),str) else b"\n"
+    offsets=[]
+    start=position=handle.tell()
+    # Whether the current line has anything besides whitespace or "\r";
+    # a line can span several pieces.
+    content=False
+    while True:
+        piece=handle.read(size)
+        if not piece:
+            break
+        begin=0
+        found=piece.find(newline)
+        while found>=0:
+            if content or piece[begin:found].strip():
+                offsets.append(start)
+            start=position+found+1
+            content=False
+            begin=found+1
+            found=piece.find(newline,begin)
+        content=content or bool(piece[begin:].strip())
+        position+=len(piece)
+    if content:
+        offsets.append(start)
+    return offsets
+
+def _read_fields(handle,position,count,delimiter,size):
+    """
+    Read up to count fields of the line starting at position.
+
+    Returns
+    -------
+    fields, position, finished : list, int, boolean
+        Fields read, offset of the next unread field and whether
+        the end of the line was reached.
+
+    """
+    newline="\n" if isinstance(delimiter,str) else b"\n"
+    handle.seek(position)
+    pieces=[]
+    text=handle.read(0)
+    while True:
+        piece=handle.read(size)
+        pieces.append(piece)
+        text=text[:0].join(pieces)
+        end=text.find(newline)
+        limit=len(text) if end<0 else end
+        if end>=0 or not piece or text.count(delimiter,0,limit)>=count:
+            break
+        size*=2
+    parts=text[:limit].split(delimiter,count)
+    if len(parts)>count:
+        consumed=sum(len(part) for part in parts[:count])+count*len(delimiter)
+        return parts[:count],position+consumed,False
+    return parts,position+limit,True
+
+def read_chunks(source,chunk=None,delimiter=None,header=None,index=None,layout=None):
+    """
+    Read absorbance spectra from a delimited text export in blocks
+    of treatments, keeping only one block in memory at a time.
+
+    Parameters
+    ----------
+    source : string, path or file-like object
+        CSV/TSV export. File-like objects must be seekable for
+        the "columns" layout.
+    chunk : int (optional)
+        Number of treatments per block. Default 1024.
+    delimiter : string (optional)
+        Field separator, "," by default. Use "\t" for TSV. A
+        delimiter at the end of lines is ignored.
+    header : boolean (optional)
+        By default False. If true, the first line holds the
+        treatment names ("columns") or the wavelengths ("rows").
+        Names in double quotes are unquoted.
+    index : boolean (optional)
+        By default False. If true, the first field of every line
+        holds the wavelength ("columns") or the treatment name
+        ("rows").
+    layout : string (optional)
+        "columns" (default) when each column is a treatment and
+        rows are the readings from 290 to 400 nm (dλ=1), as in
+        the other functions, or "rows" when each line is a
+        treatment.
+
+    Yields
+    ------
+    names, block : list, numpy.array
+        Names of the treatments in the block (their position in
+        the file when there are none) and their absorbance, one
+        column per treatment and 111 rows.
+
+    """
+    if chunk is None:
+        chunk=1024
+    if delimiter is None:
+        delimiter=","
+    if layout is None:
+        layout="columns"
+    if layout not in ("columns","rows"):
+        print("Error: Enter a valid layout")
+        return
+    handle,close=_open(source)
+    try:
+        binary=not isinstance(handle.read(0),str)
+        if binary:
+            delimiter=delimiter.encode()
+        if layout=="rows":
+            yield from _read_rows(handle,chunk,delimiter,header,index,binary)
+        else:
+            yield from _read_columns(handle,chunk,delimiter,header,index,binary)
+    finally:
+        if close:
+            handle.close()
+
+def _read_rows(handle,chunk,delimiter,header,index,binary):
+    """
+    Blocks of a "rows" export, see read_chunks.
+    """
+    lines=(line for line in handle if line.strip())
+    if header==True:
+        labels=_split(next(lines,""),delimiter)[1 if index==True else 0:]
+        try:
+            valid=np.array_equal(np.asarray(labels,dtype=float),np.arange(290,401))
+        except ValueError:
+            valid=False
+        if not valid:
+            print("Invalid wavelength layout")
+            return
+    names=[]
+    block=[]
+    count=0
+    for line in lines:
+        fields=_split(line,delimiter)
+        if index==True:
+            name=fields.pop(0)
+            names.append(name.decode() if binary else name)
+        else:
+            names.append(count)
+        if len(fields)!=111:
+            print("Invalid row number")
+            return
+        block.append(fields)
+        count+=1
+        if len(block)==chunk:
+            block=_to_array(block)
+            if block is None:
+                return
+            yield names,block.T
+            names=[]
+            block=[]
+    if block:
+        block=_to_array(block)
+        if block is None:
+            return
+        yield names,block.T
+
+def _read_columns(handle,chunk,delimiter,header,index,binary,size=1<<16):
+    """
+    Blocks of a "columns" export, see read_chunks.
+    """
+    offsets=_line_offsets(handle,size)
+    names_offset=None
+    if header==True:
+        names_offset=offsets.pop(0)
+    if len(offsets)!=111:
+        print("Invalid row number")
+        return
+    if index==True:
+        labels=[]
+        for r,offset in enumerate(offsets):
+            field,offsets[r],finished=_read_fields(handle,offset,1,delimiter,size)
+            labels.append(_unquote(field[0].strip()))
+        try:
+            valid=np.array_equal(np.asarray(labels,dtype=float),np.arange(290,401))
+        except ValueError:
+            valid=False
+        if not valid:
+            print("Invalid wavelength layout")
+            return
+        if names_offset is not None:
+            names_offset=_read_fields(handle,names_offset,1,delimiter,size)[1]
+    count=0
+    finished=False
+    while not finished:
+        if names_offset is not None:
+            names,names_offset,names_finished=_read_fields(handle,names_offset,chunk,delimiter,size)
+            names=[_unquote(name.strip()) for name in names]
+            if names_finished and names and not names[-1]:
+                names.pop()
+            names=[name.decode() if binary else name for name in names]
+        block=[]
+        for r,offset in enumerate(offsets):
+            fields,offsets[r],finished=_read_fields(handle,offset,chunk,delimiter,size)
+            if finished and fields and not fields[-1].strip():
+                # A trailing delimiter ends the line with an empty field.
+                fields.pop()
+            if block and len(fields)!=len(block[0]):
+                print("Dimensions of data do not match")
+                return
+            block.append(fields)
+        if not block[0]:
+            break
+        if names_offset is None:
+            names=list(range(count,count+len(block[0])))
+        elif len(names)!=len(block[0]):
+            print("Dimensions of data do not match")
+            return
+        count+=len(block[0])
+        block=_to_array(block)
+        if block is None:
+            return
+        yield names,block
+
+def stream(source,function,*args,chunk=None,delimiter=None,header=None,index=None,layout=None,**kwargs):
+    """
+    Apply one of the package functions to every block of spectra of
+    a delimited text export, yielding results as blocks are read.
+
+    Parameters
+    ----------
+    source : string, path or file-like object
+        CSV/TSV export, see read_chunks.
+    function : callable
+        ispf, adjspf, uvapf or criticalwave. It is called as
+        function(block, *args, axis=0, **kwargs), so additional
+        values are broadcast to every treatment of a block.
+    chunk, delimiter, header, index, layout : optional
+        See read_chunks.
+
+    Yields
+    ------
+    names, result : list, numpy.array and/or list
+        Names of the treatments in the block and the result of
+        function on them.
+
+    """
+    for names,block in read_chunks(source,chunk,delimiter,header,index,layout):
+        yield names,function(block,*args,axis=0,**kwargs)
@@ -0,0 +1,250 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024 Santiago Guerrero-Higareda
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import json
+import os
+import numpy as np
+from .validation import ShapeError,_report
+
+class Results:
+    """
+    Columnar results: one contiguous numpy.array per column (e.g. C,
+    adjSPF, UVAPF, CW, converged), all with the shape of the batch.
+    Columns holding several values per treatment, like the dA of a
+    gradient, add trailing dimensions.
+
+    Returned by the metrics with output="results"; other results can
+    be converted with as_results.
+
+    Parameters
+    ----------
+    columns : dict
+        Array of each column, in order. Object arrays (e.g. labels)
+        are stored as strings.
+
+    """
+    def __init__(self,columns):
+        self.columns={}
+        for name,column in dict(columns).items():
+            column=np.asarray(column)
+            if column.dtype==object:
+                column=column.astype(str)
+            # A no-op for the arrays the metrics produce; 0-d
+            # columns (a single treatment) stay 0-d.
+            if not column.flags.c_contiguous:
+                column=np.ascontiguousarray(column)
+            self.columns[str(name)]=column
+        shapes=[column.shape for column in self.columns.values()]
+        self.shape=min(shapes,key=len) if shapes else (0,)
+        if any(shape[:len(self.shape)]!=self.shape for shape in shapes):
+            raise ShapeError("Columns do not share the shape of the batch")
+
+    @property
+    def names(self):
+        return list(self.columns)
+
+    def __getitem__(self,name):
+        return self.columns[name]
+
+    def __contains__(self,name):
+        return name in self.columns
+
+    def __iter__(self):
+        return iter(self.columns)
+
+    def __len__(self):
+        return int(np.prod(self.shape))
+
+    def __repr__(self):
+        return "Results(shape=%s, columns=%s)"%(self.shape,self.names)
+
+    def keys(self):
+        return self.columns.keys()
+
+    def items(self):
+        return self.columns.items()
+
+    def to_list(self):
+        """
+        The header-row layout of the metrics, [[names], column, ...].
+        """
+        return [self.names]+list(self.columns.values())
+
+    def _flat(self):
+        """
+        Every column as a view with one value per treatment, None
+        (after printing) if a column holds several.
+        """
+        flat={}
+        for name,column in self.columns.items():
+            if column.ndim!=len(self.shape):
+                print("Error: %s holds several values per treatment"%name)
+                return
+            flat[name]=column.reshape(-1)
+        return flat
+
+    def to_records(self):
+        """
+        Copy of the columns as a numpy structured array with the
+        shape of the batch.
+        """
+        dtype=[(name,column.dtype,column.shape[len(self.shape):]) for name,column in self.columns.items()]
+        records=np.empty(self.shape,dtype=dtype)
+        for name,column in self.columns.items():
+            records[name]=column
+        return records
+
+    def to_pandas(self):
+        """
+        pandas.DataFrame with one row per treatment whose columns
+        share memory with these (no copy is made with pandas 2).
+        """
+        import pandas as pd
+        flat=self._flat()
+        if flat is None:
+            return
+        return pd.DataFrame(flat,copy=False)
+
+    def to_arrow(self):
+        """
+        pyarrow.Table with one row per treatment. Numeric columns
+        share memory with these; boolean and string ones are
+        converted to the Arrow layout.
+        """
+        import pyarrow as pa
+        flat=self._flat()
+        if flat is None:
+            return
+        return pa.table({name:pa.array(column) for name,column in flat.items()})
+
+    def save(self,path):
+        """
+        Write the columns to a directory holding index.json and one
+        little-endian binary file per column, readable with
+        Results.load or numpy.memmap.
+        """
+        os.makedirs(path,exist_ok=True)
+        index={"version":1,"shape":list(self.shape),"columns":[]}
+        for i,(name,column) in enumerate(self.columns.items()):
+            dtype=column.dtype.newbyteorder("<") if column.dtype.byteorder!="|" else column.dtype
+            with open(os.path.join(path,"%d.bin"%i),"wb") as handle:
+                handle.write(np.ascontiguousarray(column,dtype=dtype).tobytes())
+            index["columns"].append({"name":name,"dtype":dtype.str,"shape":list(column.shape)})
+        # The index is written last, so an interrupted save cannot be loaded.
+        temporary=os.path.join(path,"index.json.tmp")
+        with open(temporary,"w") as handle:
+            json.dump(index,handle)
+        os.replace(temporary,os.path.join(path,"index.json"))
+
+    @classmethod
+    def load(cls,path,mmap=None):
+        """
+        Read results written by save.
+
+        Parameters
+        ----------
+        path : string or path
+            Directory written by save.
+        mmap : boolean (optional)
+            By default True: columns are read-only views of the
+            files (numpy.memmap), read from disk only when used.
+            If false, they are read into memory.
+
+        """
+        try:
+            with open(os.path.join(path,"index.json")) as handle:
+                index=json.load(handle)
+        except FileNotFoundError:
+            print("Error: No results found")
+            return
+        columns={}
+        for i,column in enumerate(index["columns"]):
+            file=os.path.join(path,"%d.bin"%i)
+            dtype=np.dtype(column["dtype"])
+            shape=tuple(column["shape"])
+            if mmap==False or 0 in shape:
+                columns[column["name"]]=np.fromfile(file,dtype=dtype).reshape(shape)
+            else:
+                columns[column["name"]]=np.memmap(file,dtype=dtype,mode="r",shape=shape)
+        return cls(columns)
+
+def _results(table,flags=None):
+    """
+    Results of table, followed by the columns of the validate() report
+    when flags is given (errors="mask").
+    """
+    if flags is not None:
+        report=_report(flags)
+        table.update(zip(report[0],report[1:]))
+    return Results(table)
+
+def _table(result):
+    """
+    Whether result has a header row, e.g. [["C","adjSPF"],C,SPF].
+    """
+    return isinstance(result,list) and bool(result) and isinstance(result[0],list) \
+        and all(isinstance(name,str) for name in result[0])
+
+def as_results(result,names=None):
+    """
+    Convert the result of any function of the package to Results.
+
+    Parameters
+    ----------
+    result : list, tuple, numpy.array, float or int
+        A result with a header row, e.g. [["C","adjSPF"],C,SPF]
+        from adjspf "all" (or [["C","adjSPF"],[C,SPF]] for a
+        single treatment), the bare value(s) of a metric, e.g.
+        the CW of criticalwave, a tuple of columns, e.g. (C,SPF)
+        from adjspf "all" with Simpson integration, or the
+        (values, report) tuple of errors="mask", whose report
+        columns are appended.
+    names : string or list (optional)
+        Name of each column when result has no header row.
+        Default "result" for a single value or array and
+        "result0", "result1", ... for the columns of a tuple.
+
+    Returns
+    -------
+    return : Results
+        None if result is None (a failed call).
+
+    """
+    if result is None or isinstance(result,Results):
+        return result
+    if isinstance(result,tuple) and len(result)==2 and _table(result[1]) \
+            and result[1][0]==["failed","flags","reasons"]:
+        values=as_results(result[0],names)
+        if values is None:
+            return
+        columns=dict(values.items())
+        columns.update(zip(result[1][0],result[1][1:]))
+        return Results(columns)
+    if _table(result):
+        names,result=result[0],result[1:]
+        # A single treatment: one row holding a value per name.
+        if len(names)>1 and len(result)==1 and np.ndim(result[0])==1 and len(result[0])==len(names):
+            result=list(result[0])
+    elif isinstance(result,tuple):
+        if names is None or isinstance(names,str):
+            names=["%s%d"%(names or "result",i) for i in range(len(result))]
+        result=list(result)
+    elif names is None or isinstance(names,str):
+        names,result=[names or "result"],[result]
+    if len(names)!=len(result):
+        print("Dimensions of names and results do not match")
+        return
+    return Results(dict(zip(names,result)))
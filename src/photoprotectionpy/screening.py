@@ -0,0 +1,171 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024 Santiago Guerrero-Higareda
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import numpy as np
+from ._kernels import check_spectrum,protection,resample
+from .critical_wavelength import _locate,_tail_integrals
+from .instrumentation import _call
+_metrics=("spf","uvapf","ratio","cw")
+
+def _score(mixtures,absorbance,tails,integration,interpolate,timer=None,spectra=("spf","uvapf")):
+    """
+    SPF, UVA-PF, UVA-PF/SPF and CW of every row of mixtures, given the
+    component absorbances (one row each) and their tail integrals.
+    """
+    mixed=mixtures@absorbance
+    if timer:
+        timer.mark("mixing")
+    spf=protection(mixed,None,spectra[0],integration,timer=timer)
+    uvapf=protection(mixed[:,30:],None,spectra[1],integration,timer=timer)
+    # Tail integrals are linear in absorbance, so they mix like the spectra.
+    cw=_locate(mixtures@tails,interpolate)
+    if timer:
+        timer.mark("integration")
+    return spf,uvapf,uvapf/spf,cw
+
+def screen(components,concentrations,integration=None,constraints=None,top=None,
+           rank=None,chunk=None,interpolate=None,wavelengths=None,spectrum=None,uva_spectrum=None):
+    """
+    Score candidate formulations mixed from UV filter spectra.
+
+    The absorbance of each candidate is the sum of the component
+    spectra weighted by its concentrations. Candidates are evaluated
+    in chunks, so millions of mixtures can be screened without
+    building their spectra all at once.
+
+    Parameters
+    ----------
+    components : list, pandas.DataFrame or numpy.array
+        Each column is the absorbance of one UV filter at unit
+        concentration, where rows correspond to each read
+        measured from 290 to 400 nm (dλ=1).
+    concentrations : list, pandas.DataFrame or numpy.array
+        Each row is a candidate, with one column per component.
+    integration : string
+        Choose between "trapz" (default)
+        or "simpson"
+    constraints : dict (optional)
+        Bounds that candidates must meet, as {metric: (low, high)}
+        with metric "spf", "uvapf", "ratio" (UVA-PF/SPF) or "cw".
+        Either bound may be None, e.g. {"ratio": (1/3, None),
+        "cw": (370, None)}.
+    top : int (optional)
+        Return only the top candidates meeting the constraints,
+        best first. By default every candidate meeting them is
+        returned in input order.
+    rank : string (optional)
+        Metric used to choose the top candidates, highest first.
+        Default "spf".
+    chunk : int (optional)
+        Number of candidates evaluated at once. Default 16384.
+    interpolate : boolean (optional)
+        By default False. If true, CW is interpolated between
+        readings, see criticalwave.
+    wavelengths : list or numpy.array (optional)
+        Wavelength of each reading in nm, when components are
+        not read from 290 to 400 nm at dλ=1. Readings are
+        linearly interpolated onto that grid before evaluation.
+    spectrum : string (optional)
+        Key of the SPF weighting (see register_spectrum).
+        Default "spf", the erythema action spectrum × UV-SSR.
+    uva_spectrum : string (optional)
+        Key of the UVA-PF weighting (see register_spectrum).
+        Default "uvapf", the PPD action spectrum × UVA source.
+
+    Returns
+    -------
+    return : list
+        [["index","SPF","UVAPF","UVAPF/SPF","CW"]] followed by
+        the row of each returned candidate in concentrations
+        and its results, one array per column. UVA-PF is
+        computed without adjustment (C=1).
+
+    """
+    timer=_call("screen")
+    components=np.asarray(components,dtype="float")
+    concentrations=np.asarray(concentrations,dtype="float")
+    if wavelengths is not None:
+        components=resample(components,wavelengths)
+        if components is None:
+            return
+    if components.ndim==1:
+        components=components[:,None]
+    if components.ndim!=2 or components.shape[0]!=111:
+        print("Invalid row number")
+        return
+    if concentrations.ndim==1:
+        concentrations=concentrations[None,:]
+    if concentrations.ndim!=2 or concentrations.shape[1]!=components.shape[1]:
+        print("Dimensions of components and concentrations do not match")
+        return
+    if integration is None:
+        integration="trapz"
+    if integration not in ("trapz","simpson"):
+        print("Error: Enter a valid integration method")
+        return
+    spectra=(check_spectrum(spectrum,"spf"),check_spectrum(uva_spectrum,"uvapf"))
+    if None in spectra:
+        return
+    if constraints is None:
+        constraints={}
+    for metric,bounds in constraints.items():
+        if metric not in _metrics or len(bounds)!=2:
+            print("Error: Enter valid constraints")
+            return
+    if rank is None:
+        rank="spf"
+    if rank not in _metrics:
+        print("Error: Enter a valid metric")
+        return
+    if top is not None and int(top)<1:
+        print("Error: top must be a positive integer")
+        return
+    if chunk is None:
+        chunk=16384
+    if timer:
+        timer.mark("validation")
+    absorbance=components.T
+    tails=_tail_integrals(components.T,integration)
+    found=[]
+    for start in range(0,concentrations.shape[0],chunk):
+        mixtures=concentrations[start:start+chunk]
+        scores=_score(mixtures,absorbance,tails,integration,interpolate,timer,spectra)
+        passed=np.ones(mixtures.shape[0],dtype=bool)
+        for metric,(low,high) in constraints.items():
+            values=scores[_metrics.index(metric)]
+            if low is not None:
+                passed&=values>=low
+            if high is not None:
+                passed&=values<=high
+        index=np.flatnonzero(passed)+start
+        found.append([index]+[values[passed] for values in scores])
+        if top is not None:
+            # Keep only the running best so memory does not grow with the batch.
+            found=[[np.concatenate(column) for column in zip(*found)]]
+            key=found[0][1+_metrics.index(rank)]
+            if key.size>top:
+                best=np.argpartition(-key,int(top)-1)[:int(top)]
+                found=[[column[best] for column in found[0]]]
+        if timer:
+            timer.mark("search")
+    columns=[np.concatenate(column) for column in zip(*found)] if found else \
+        [np.zeros(0,dtype=int)]+[np.zeros(0)]*4
+    if top is not None:
+        order=np.lexsort((columns[0],-columns[1+_metrics.index(rank)]))
+        columns=[column[order] for column in columns]
+    if timer:
+        timer.finish(integration=integration,columns=concentrations.shape[0])
+    return [["index","SPF","UVAPF","UVAPF/SPF","CW"]]+columns
@@ -0,0 +1,311 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024 Santiago Guerrero-Higareda
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+
+Local HTTP/JSON service evaluating single spectra in micro-batches.
+
+Not imported by the package itself; use
+``from photoprotectionpy.service import Service, serve``.
+"""
+import asyncio
+import json
+import math
+import numpy as np
+from .initial_spf import ispf
+from .adjusted_spf import adjspf
+from .uva_protectionfactor import uvapf
+from .critical_wavelength import criticalwave
+
+def _number(value):
+    """
+    value as a float, None if it is NaN or infinite (not valid JSON).
+    """
+    value=float(value)
+    return value if math.isfinite(value) else None
+
+def _ispf(data,values,options):
+    spf=ispf(data,options["integration"],axis=0)
+    return None if spf is None else [{"SPF":_number(v)} for v in spf]
+
+def _uvapf(data,values,options):
+    result=uvapf(data,values,options["integration"],axis=0)
+    return None if result is None else [{"UVAPF":_number(v)} for v in result]
+
+def _adjspf(data,values,options):
+    result=adjspf(data,"all",values,integration=options["integration"],solver=options["solver"],
+                  full_output=True,axis=0)
+    if result is None:
+        return
+    return [{"C":_number(C),"adjSPF":_number(spf),"converged":bool(converged)}
+            for C,spf,converged in zip(result[1],result[2],result[3])]
+
+def _criticalwave(data,values,options):
+    cw=criticalwave(data,options["integration"],axis=0,interpolate=options["interpolate"])
+    if cw is None:
+        return
+    return [{"CW":_number(v) if options["interpolate"] else int(v)} for v in cw]
+
+# operation: (batch function, name of the per-request value or None, options)
+_operations={
+    "ispf":(_ispf,None,("integration",)),
+    "uvapf":(_uvapf,"C",("integration",)),
+    "adjspf":(_adjspf,"target",("integration","solver")),
+    "criticalwave":(_criticalwave,None,("integration","interpolate")),
+}
+_defaults={"integration":"trapz","solver":"newton","interpolate":False}
+_valid={"integration":("trapz","simpson"),"solver":("step","newton","bisect"),"interpolate":(True,False)}
+
+class Service:
+    """
+    Coalesces concurrent single-spectrum requests into batches.
+
+    Requests for the same operation and options that arrive within
+    window seconds of the first one are stacked and evaluated with a
+    single batch call (axis=0), in a worker thread so that new
+    requests keep being accepted meanwhile.
+
+    Parameters
+    ----------
+    window : float (optional)
+        Seconds a batch waits for more requests. Default 0.005.
+    max_batch : int (optional)
+        Batch size that triggers evaluation before the window
+        ends. Default 4096.
+
+    """
+    def __init__(self,window=None,max_batch=None):
+        self.window=0.005 if window is None else window
+        self.max_batch=4096 if max_batch is None else max_batch
+        self.pending={}
+        self.timers={}
+        self.running=set()
+        self.queued=0
+        self.requests=0
+        self.errors=0
+        self.batches=0
+        self.batched=0
+        self.largest=0
+        self.sizes={}
+
+    async def evaluate(self,operation,data,**request):
+        """
+        Result of one spectrum.
+
+        Parameters
+        ----------
+        operation : string
+            "ispf", "uvapf" (needs C), "adjspf" (needs target,
+            returns C and adjSPF from mode "all") or "criticalwave".
+        data : list or numpy.array
+            111 absorbance readings from 290 to 400 nm (dλ=1).
+        **request
+            C or target, and optionally integration ("trapz",
+            "simpson"), solver ("newton" by default, see adjspf)
+            and interpolate (see criticalwave).
+
+        Returns
+        -------
+        result : dict
+            e.g. {"SPF": 12.3}, with None for values that are NaN
+            or infinite. Raises ValueError for an invalid request.
+
+        """
+        if operation not in _operations:
+            raise ValueError("Unknown operation %r"%operation)
+        function,value_name,option_names=_operations[operation]
+        options=tuple(request.get(name,_defaults[name]) for name in option_names)
+        for name,option in zip(option_names,options):
+            if option not in _valid[name]:
+                raise ValueError("Invalid %s %r"%(name,option))
+        if value_name is not None and value_name not in request:
+            raise ValueError("Missing %s"%value_name)
+        try:
+            spectrum=np.asarray(data,dtype="float")
+            value=float(request[value_name]) if value_name else 0.0
+        except (TypeError,ValueError):
+            raise ValueError("data and values must be numbers") from None
+        if spectrum.shape!=(111,):
+            raise ValueError("data must be 111 numbers")
+        key=(operation,options)
+        future=asyncio.get_running_loop().create_future()
+        entries=self.pending.setdefault(key,[])
+        entries.append((spectrum,value,future))
+        self.queued+=1
+        self.requests+=1
+        if len(entries)>=self.max_batch:
+            self._flush(key)
+        elif len(entries)==1:
+            self.timers[key]=asyncio.get_running_loop().call_later(self.window,self._flush,key)
+        try:
+            return await future
+        finally:
+            self.queued-=1
+
+    def _flush(self,key):
+        timer=self.timers.pop(key,None)
+        if timer is not None:
+            timer.cancel()
+        entries=self.pending.pop(key,None)
+        if entries:
+            task=asyncio.ensure_future(self._run(key,entries))
+            # The loop only keeps weak references to tasks.
+            self.running.add(task)
+            task.add_done_callback(self.running.discard)
+
+    async def _run(self,key,entries):
+        operation,options=key
+        function,value_name,option_names=_operations[operation]
+        options=dict(_defaults,**dict(zip(option_names,options)))
+        size=len(entries)
+        self.batches+=1
+        self.batched+=size
+        self.largest=max(self.largest,size)
+        bucket=1<<(size-1).bit_length()
+        self.sizes[bucket]=self.sizes.get(bucket,0)+1
+        data=np.stack([spectrum for spectrum,value,future in entries],-1)
+        values=np.array([value for spectrum,value,future in entries])
+        try:
+            results=await asyncio.get_running_loop().run_in_executor(None,function,data,values,options)
+            if results is None:
+                raise ValueError("Invalid request")
+        except Exception as error:
+            self.errors+=size
+            for spectrum,value,future in entries:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (spectrum,value,future),result in zip(entries,results):
+            if not future.done():
+                future.set_result(result)
+
+    def metrics(self):
+        """
+        Queue and batching statistics.
+
+        Returns
+        -------
+        metrics : dict
+            "queue_depth" (requests waiting for a result),
+            "requests", "errors", "batches", "mean_batch_size",
+            "max_batch_size" and "batch_sizes" (number of batches
+            per size, rounded up to a power of two), plus the
+            window and max_batch settings.
+
+        """
+        return {"queue_depth":self.queued,"requests":self.requests,"errors":self.errors,
+                "batches":self.batches,
+                "mean_batch_size":self.batched/self.batches if self.batches else 0.0,
+                "max_batch_size":self.largest,
+                "batch_sizes":{str(size):count for size,count in sorted(self.sizes.items())},
+                "window":self.window,"max_batch":self.max_batch}
+
+    async def _respond(self,writer,status,body):
+        payload=json.dumps(body).encode()
+        reason={200:"OK",400:"Bad Request",404:"Not Found",405:"Method Not Allowed"}[status]
+        writer.write(b"HTTP/1.1 %d %s\r\nContent-Type: application/json\r\nContent-Length: %d\r\n\r\n"
+                     %(status,reason.encode(),len(payload))+payload)
+        await writer.drain()
+
+    async def _handle(self,reader,writer):
+        """
+        Serve the HTTP requests of one connection, kept alive until
+        the client closes it or asks to.
+        """
+        try:
+            while True:
+                line=await reader.readline()
+                if not line:
+                    break
+                method,target,version=(line.decode("latin-1").split()+["",""])[:3]
+                headers={}
+                while True:
+                    header=await reader.readline()
+                    if header in (b"\r\n",b"\n",b""):
+                        break
+                    name,_,value=header.decode("latin-1").partition(":")
+                    headers[name.strip().lower()]=value.strip()
+                try:
+                    length=int(headers.get("content-length",0) or 0)
+                    if length<0:
+                        raise ValueError
+                except ValueError:
+                    # Without a length the body cannot be skipped, so the
+                    # connection ends here.
+                    await self._respond(writer,400,{"error":"Invalid Content-Length"})
+                    break
+                body=await reader.readexactly(length)
+                operation=target.strip("/")
+                if method=="GET" and operation=="metrics":
+                    await self._respond(writer,200,self.metrics())
+                elif operation not in _operations:
+                    await self._respond(writer,404,{"error":"Unknown operation %r"%operation})
+                elif method!="POST":
+                    await self._respond(writer,405,{"error":"Use POST"})
+                else:
+                    try:
+                        request=json.loads(body or b"{}")
+                        if not isinstance(request,dict) or "data" not in request:
+                            raise ValueError("Body must be a JSON object with data")
+                        result=await self.evaluate(operation,**request)
+                    except (ValueError,TypeError) as error:
+                        await self._respond(writer,400,{"error":str(error)})
+                    else:
+                        await self._respond(writer,200,result)
+                if headers.get("connection","").lower()=="close" or version=="HTTP/1.0":
+                    break
+        except (ConnectionError,asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self,host=None,port=None,path=None):
+        """
+        Start listening for HTTP requests.
+
+        Parameters
+        ----------
+        host : string (optional)
+            Interface to bind. Default "127.0.0.1".
+        port : int (optional)
+            TCP port. Default 8024; 0 picks a free port.
+        path : string (optional)
+            Listen on this Unix socket instead of TCP.
+
+        Returns
+        -------
+        server : asyncio.Server
+            POST /ispf, /uvapf, /adjspf or /criticalwave with a
+            JSON body such as {"data": [...111 readings], "C": 1.2}
+            returns the result of evaluate(); GET /metrics returns
+            metrics().
+
+        """
+        if path is not None:
+            return await asyncio.start_unix_server(self._handle,path=path)
+        return await asyncio.start_server(self._handle,"127.0.0.1" if host is None else host,
+                                          8024 if port is None else port)
+
+def serve(host=None,port=None,path=None,window=None,max_batch=None):
+    """
+    Run a Service until interrupted, see Service and Service.start.
+    """
+    async def main():
+        server=await Service(window,max_batch).start(host,port,path)
+        async with server:
+            await server.serve_forever()
+    try:
+        asyncio.run(main())
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024 Santiago Guerrero-Higareda
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import numpy as np
+from . import _kernels
+
+def register_spectrum(key,action,source=None,kind=None,wavelengths=None,replace=None):
+    """
+    Register an action spectrum and source so that ispf, adjspf,
+    uvapf, iso24443, photostability, screen and bootstrap can weight
+    protection factors with it instead of the ISO 24443 tables.
+
+    The effect spectrum (action × source) is normalized to a peak of
+    1 and compiled into quadrature weights for both integration
+    methods at once, so that evaluating with the key costs the same
+    as with the built-in tables.
+
+    Parameters
+    ----------
+    key : string
+        Name given to the spectrum, e.g. "erythema-2019". "spf"
+        and "uvapf" are the built-in tables and cannot be replaced.
+    action : list or numpy.array
+        Action spectrum (e.g. erythema or PPD effectiveness).
+    source : list or numpy.array (optional)
+        Spectral irradiance of the source, same layout as action.
+        By default action is taken as the effect spectrum itself.
+    kind : string (optional)
+        "spf" (default) for a spectrum from 290 to 400 nm used
+        as SPF weighting, or "uvapf" for one from 320 to 400 nm
+        used as UVA-PF weighting.
+    wavelengths : list or numpy.array (optional)
+        Wavelength of each value in nm, when they are not given
+        every nm over the range of kind. Values are linearly
+        interpolated onto that grid.
+    replace : boolean (optional)
+        By default False. If true, an existing key is replaced.
+
+    Returns
+    -------
+    key : string
+        The registered key, or None if the spectrum is not valid.
+
+    """
+    if kind is None:
+        kind="spf"
+    if kind not in ("spf","uvapf"):
+        print("Error: Enter a valid kind")
+        return
+    if not isinstance(key,str) or key in ("spf","uvapf"):
+        print("Error: Enter a key other than the built-in spf and uvapf")
+        return
+    if key in _kernels.effects and replace!=True:
+        print("Error: %s is already registered, use replace=True"%key)
+        return
+    effect=np.asarray(action,dtype="float")
+    if source is not None:
+        source=np.asarray(source,dtype="float")
+        if source.shape!=effect.shape:
+            print("Dimensions of action and source do not match")
+            return
+        effect=effect*source
+    start=290 if kind=="spf" else 320
+    if effect.ndim!=1:
+        print("Invalid row number")
+        return
+    if wavelengths is not None:
+        effect=_kernels.resample(effect,wavelengths,start=start)
+        if effect is None:
+            return
+    if effect.size!=401-start:
+        print("Invalid row number")
+        return
+    if not np.isfinite(effect).all() or (effect<0).any() or not effect.any():
+        print("Error: the effect spectrum must be finite, non-negative and not all zero")
+        return
+    effect=_kernels._readonly(effect/effect.max())
+    _kernels.install({key:(kind,effect)})
+    for integration in ("trapz","simpson"):
+        for dtype in (np.float64,np.float32):
+            _kernels.typed_kernel(key,integration,dtype)
+    return key
+
+def unregister_spectrum(key):
+    """
+    Remove a spectrum added with register_spectrum.
+    """
+    if key not in _kernels.registered:
+        print("Unknown spectrum")
+        return
+    _kernels.uninstall(key)
+
+def list_spectra():
+    """
+    Spectra available as weighting of the protection factors.
+
+    Returns
+    -------
+    return : list
+        [["key","kind"]] followed by the list of keys, starting
+        with the built-in "spf" and "uvapf", and their kinds.
+
+    """
+    keys=list(_kernels.kinds)
+    return [["key","kind"],keys,[_kernels.kinds[key] for key in keys]]
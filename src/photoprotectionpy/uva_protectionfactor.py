@@ -16,8 +16,23 @@ Copyright © 2024 Santiago Guerrero-Higareda
 """
 
 import numpy as np
-import scipy.integrate as sci
-def uvapf(data,C,integration=None, batch=None):
+from ._kernels import check_buffers,check_spectrum,protection,resample,resample_gradient
+from ._parallel import map_rows
+from .instrumentation import _call
+from .results import _results
+from .validation import OptionError,ShapeError,_expand,_fail,_report,_screen
+def _uvapf(data,C,integration,timer=None,out=None,workspace=None,spectrum="uvapf",gradient=False):
+    """
+    UVA-PF of every row of data (readings from 320 to 400 nm), followed
+    by its derivatives with respect to the readings and C with gradient.
+    """
+    if gradient:
+        return protection(data,C,spectrum,integration,out,workspace,timer,True)
+    return (protection(data,C,spectrum,integration,out,workspace,timer),)
+
+def uvapf(data,C,integration=None, batch=None, axis=None, workers=None,
+          wavelengths=None, out=None, workspace=None, errors=None, spectrum=None,
+          gradient=None, output=None):
     """
     Calculate initial UVA protection factor before 
     UV exposure (UVA-PF<sub>0<sub>) or UVA protection factor 
@@ -40,112 +55,148 @@ def uvapf(data,C,integration=None, batch=None):
          By default False. If true, will determine C or SPF of 
          all data samples against a single target SPF or an
          already calculated C value.
+    axis : int (optional)
+        Axis of data holding the 111 (or 81) readings. When
+        given, data can have any number of other dimensions
+        and C is broadcast against them.
+    workers : int (optional)
+        Number of processes used to split the treatments.
+        By default, and for batches too small to benefit,
+        everything runs in the calling process.
+    wavelengths : list or numpy.array (optional)
+        Wavelength of each reading in nm, when data is not
+        read from 320 to 400 nm at dλ=1 (e.g. 0.5, 2 or
+        5 nm steps). Readings are linearly interpolated onto
+        that grid before evaluation.
+    out : numpy.array (optional)
+        Preallocated array receiving the results, with the
+        shape of data without the wavelength axis.
+    workspace : numpy.array (optional)
+        Contiguous scratch array with at least 81 elements per
+        treatment, of float32 for float32 data and float64
+        otherwise, reused instead of allocating temporaries
+        (e.g. across the chunks of a large run).
+    errors : string (optional)
+        "mask" checks every treatment and C first (see
+        validate), evaluates only the valid ones and gives
+        NaN for the rest. "raise" raises ShapeError,
+        OptionError or ColumnError instead of printing and
+        returning None. By default readings are evaluated
+        as given.
+    spectrum : string (optional)
+        Key of the UVA-PF weighting (see register_spectrum).
+        Default "uvapf", the PPD action spectrum × UVA source.
+    gradient : boolean (optional)
+        By default False. If true, also returns the analytic
+        derivatives of every UVA-PF with respect to each reading
+        (0 below 320 nm) and to C, computed in the same pass.
+    output : string (optional)
+        "results" returns a Results (see as_results) with the
+        column "UVAPF" (and "dUVAPF/dA", "dUVAPF/dC" with
+        gradient, dA with the readings along its last axis)
+        shaped like the batch, instead of lists. With
+        errors="mask", the "failed", "flags" and "reasons" of
+        the report are further columns.
          
     Returns
     -------
     UVA-PF<sub>0<sub> or UVA-PF : float
+        When axis is given, returns a numpy.array with the
+        shape of data without the wavelength axis. With
+        errors="mask", returns (UVA-PF, report), report being
+        the output of validate() for the batch. With gradient,
+        returns [["UVAPF","dUVAPF/dA","dUVAPF/dC"],UVA-PF,dA,dC],
+        where dA has the shape of data and dC that of the
+        UVA-PF array.
 
     """
-    wavelengths=[320,321,322,323,324,325,326,327,328,329,330,331,332,333,334,335,336,337,338,339,340,341,342,343,344,345,346,347,348,349,350,351,
-                  352,353,354,355,356,357,358,359,360,361,362,363,364,365,366,367,368,369,370,371,372,373,374,375,376,377,378,379,380,381,382,
-                  383,384,385,386,387,388,389,390,391,392,393,394,395,396,397,398,399,400]
-    ppd=[1.0,0.975,0.95,0.925,0.9,0.875,0.85,0.825,0.8,0.775,0.75,0.725,0.7,0.675,0.65,0.625,
-                  0.6,0.575,0.55,0.525,0.5,0.494,0.488,0.481,0.475,0.469,0.463,0.457,0.45,0.444,0.438,0.432,0.426,0.419,0.413,0.407,0.401,0.395,0.388,0.382,0.376,0.37,
-                  0.364,0.357,0.351,0.345,0.339,0.333,0.326,0.32,0.314,0.308,0.302,0.295,0.289,0.283,0.277,0.271,0.264,0.258,0.252,0.246,0.24,0.233,0.227,0.221,0.215,
-                  0.209,0.202,0.196,0.19,0.184,0.178,0.171,0.165,0.159,0.153,0.147,0.14,0.134,0.128]
-    uva_source=[4.84e-06,8.47e-06,1.36e-05,2.07e-05,3.03e-05,4.29e-05,
-                5.74e-05,7.6e-05,9.85e-05,0.000122,0.000151,0.000181,0.000213,0.000244,0.000283,0.000319,0.000359,0.000398,0.000439,0.000478,0.00052,
-                0.000561,0.0006,0.000638,0.000674,0.000712,0.000747,0.000778,0.000818,0.000843,0.000875,0.000904,0.000929,0.000949,0.000973,0.000986,
-                0.00101,0.00103,0.00105,0.00106,0.00108,0.00109,0.0011,0.0011,0.0011,0.0011,0.00109,0.00109,0.00108,0.00107,0.00105,0.00103,0.000995,
-                0.00097,0.000937,0.000906,0.000876,0.000843,0.000806,0.000761,0.000711,0.000666,0.000612,0.000556,0.000499,0.000443,0.000388,0.000336,
-                0.000287,0.000241,0.000201,0.000164,0.000131,0.000103,7.9e-05,5.98e-05,4.46e-05,3.26e-05,2.3e-05,1.58e-05,1.05e-05]
+    timer=_call("uvapf")
+    if errors not in (None,"mask","raise"):
+        print("Error: Enter a valid errors option")
+        return
     data=np.asarray(data)
-    dims=data.ndim
-    C=np.asarray(C)
-    size_C=C.size
-    if len(data.shape)==1:
-        shape=data.shape[0]
-        if shape==111:
-            data=data[30:,]
-        elif shape==81:
-            ...
-        elif shape!=111 or shape!=81:
-            print("Invalid row number")
-            return
-    elif len(data.shape)==2:
-        shape=data.shape[0]
-        if shape==111:
-            data=data[30:,]
-        elif shape==81:
-            ...
-        elif shape!=111 or shape!=81:
-            print("Invalid row number")
-            return
-    if dims>1 and size_C>1:
-        size_data=data.shape[1]
-    if batch==True:
-        batch_list=[]
-        if len(data.shape)==1:
-            print("More than one sample is needed")
+    if wavelengths is not None:
+        data=resample(data,wavelengths,axis,start=320,errors=errors)
+        if data is None:
             return
-        size_data=data.shape[1]
-        if size_C==1:
-            for i in range(size_data):
-                batch_list.append(C)
-            C=np.asarray(batch_list)
-            size_C=C.size
-        else:
-            print("More values that needed for batch mode")
-            return
-    elif batch==False:
-        if size_C==1:
-            print("More values are needed")
-            return
-        else:
-            ...
-    elif batch==None:
-        ...
-    elif batch!=False or batch!=True:
-        print("Enter a True or False")
-        return
+    C=np.asarray(C,dtype="float")
+    if axis is None:
+        if data.ndim>2 or data.shape[0] not in (111,81):
+            return _fail(errors,ShapeError,"Invalid row number")
+        readings=data.shape[0]
+        data=data[-81:].T
+        batch_shape=data.shape[:-1]
+        if batch==True:
+            if data.ndim==1:
+                return _fail(errors,ShapeError,"More than one sample is needed")
+            if C.size!=1:
+                return _fail(errors,ShapeError,"More values that needed for batch mode")
+            C=np.full(batch_shape,C.item())
+        elif batch==False:
+            if C.size==1:
+                return _fail(errors,ShapeError,"More values are needed")
+        elif batch is not None:
+            return _fail(errors,OptionError,"Enter a True or False")
+        if C.size!=data[...,0].size:
+            return _fail(errors,ShapeError,"Dimensions of data and value arrays do not match")
+        C=C.reshape(batch_shape)
     else:
-        print("Enter a True or False")
+        if data.ndim==0 or data.shape[axis] not in (111,81):
+            return _fail(errors,ShapeError,"Invalid row number")
+        readings=data.shape[axis]
+        data=np.moveaxis(data,axis,-1)[...,-81:]
+        batch_shape=data.shape[:-1]
+        try:
+            C=np.broadcast_to(C,batch_shape)
+        except ValueError:
+            return _fail(errors,ShapeError,"Dimensions of data and value arrays do not match")
     if integration is None:
         integration="trapz"
-    if isinstance(integration, str):
-        if integration=="trapz":
-            C_array=np.asarray(C)
-            uvapf=[]
-            if dims==1:
-                arrays=[ppd,uva_source,np.power(10,-data*C_array)]
-                uvapf.append(np.trapz(np.multiply(ppd,uva_source))/np.trapz(np.prod(np.vstack(arrays),axis=0)))
-            elif dims>1:
-                if size_C==size_data:
-                    for i in range(size_data):
-                        arrays=[ppd,uva_source,np.power(10,-data[:,i]*C_array[i])]
-                        uvapf.append(np.trapz(np.multiply(ppd,uva_source))/np.trapz(np.prod(np.vstack(arrays),axis=0)))
-                else:
-                    print("Dimensions of data and value arrays do not match")
-            else:
-                print("Dimensions of data and value arrays do not match")
-            return uvapf
-        elif integration=="simpson":
-            C_array=np.asarray(C)
-            uvapf=[]
-            if dims==1:
-                arrays=[ppd,uva_source,np.power(10,-data*C_array)]
-                uvapf.append(sci.simpson(np.multiply(ppd,uva_source),x=wavelengths)/sci.simpson(np.prod(np.vstack(arrays),axis=0),x=wavelengths))
-            elif dims>1:
-                if size_C==size_data:
-                    for i in range(size_data):
-                        arrays=[ppd,uva_source,np.power(10,-data[:,i]*C_array[i])]
-                        uvapf.append(sci.simpson(np.multiply(ppd,uva_source),x=wavelengths)/sci.simpson(np.prod(np.vstack(arrays),axis=0),x=wavelengths))
-                else:
-                    print("Dimensions of data and value arrays do not match")
-            else:
-                print("Dimensions of data and value arrays do not match")
-            return uvapf
-        else:
-            print("Enter a valid integration method")
+    if integration not in ("trapz","simpson"):
+        return _fail(errors,OptionError,"Enter a valid integration method")
+    if output not in (None,"results"):
+        return _fail(errors,OptionError,"Error: Enter a valid output")
+    spectrum=check_spectrum(spectrum,"uvapf",errors)
+    if spectrum is None:
+        return
+    dtype=np.float32 if data.dtype==np.float32 else np.float64
+    if not check_buffers(out,workspace,batch_shape,data.size,dtype,errors):
+        return
+    flags=_screen(errors,data,C,batch_shape)
+    if timer:
+        timer.mark("validation")
+    buffers=(None,None) if workers is not None and workers>1 else (out,workspace)
+    if flags is None or not flags.any():
+        if buffers[0] is not None:
+            buffers=(out.reshape(-1),workspace)
+        columns=map_rows(_uvapf,[data.reshape(-1,81),C.reshape(-1)],
+                         (integration,timer)+buffers+(spectrum,gradient==True),workers)
     else:
-        print("Enter a valid integration method")
+        valid=flags==0
+        columns=map_rows(_uvapf,[data[valid],C[valid]],(integration,timer,None,buffers[1],spectrum,gradient==True),
+                         workers)
+        columns=[_expand(column,valid.reshape(-1),np.nan) for column in columns]
+    uvapf=columns[0].reshape(batch_shape)
+    if out is not None and not np.shares_memory(uvapf,out):
+        out[...]=uvapf
+        uvapf=out
+    if timer:
+        timer.finish(integration=integration,columns=uvapf.size)
+    if gradient==True:
+        dA=np.zeros(batch_shape+(readings,),dtype=columns[1].dtype)
+        dA[...,-81:]=columns[1].reshape(batch_shape+(81,))
+        if wavelengths is not None:
+            dA=resample_gradient(dA,wavelengths,start=320)
+    if output=="results":
+        table={"UVAPF":uvapf}
+        if gradient==True:
+            table.update({"dUVAPF/dA":dA,"dUVAPF/dC":columns[2].reshape(batch_shape)})
+        return _results(table,flags)
+    if axis is None:
+        uvapf=list(np.atleast_1d(uvapf))
+    if gradient==True:
+        dA=dA.T if axis is None else np.moveaxis(dA,-1,axis)
+        uvapf=[["UVAPF","dUVAPF/dA","dUVAPF/dC"],uvapf,dA,columns[2].reshape(batch_shape)]
+    if errors=="mask":
+        return uvapf,_report(flags)
+    return uvapf
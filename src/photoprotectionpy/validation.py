@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+"""
+Copyright © 2024 Santiago Guerrero-Higareda
+
+   Licensed under the Apache License, Version 2.0 (the "License");
+   you may not use this file except in compliance with the License.
+   You may obtain a copy of the License at
+
+       http://www.apache.org/licenses/LICENSE-2.0
+
+   Unless required by applicable law or agreed to in writing, software
+   distributed under the License is distributed on an "AS IS" BASIS,
+   WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+   See the License for the specific language governing permissions and
+   limitations under the License.
+"""
+import numpy as np
+NAN=1
+INFINITE=2
+NEGATIVE=4
+SATURATED=8
+VALUE=16
+_reasons=((NAN,"nan"),(INFINITE,"inf"),(NEGATIVE,"negative"),(SATURATED,"saturated"),(VALUE,"invalid value"))
+
+class ValidationError(ValueError):
+    """
+    Base of the errors raised by the metrics when errors="raise".
+    """
+
+class ShapeError(ValidationError):
+    """
+    Data, values or buffers with mismatched or invalid dimensions.
+    """
+
+class OptionError(ValidationError):
+    """
+    Invalid option, e.g. an unknown integration method or solver.
+    """
+
+class ColumnError(ValidationError):
+    """
+    Columns whose readings or values failed validation.
+
+    Attributes
+    ----------
+    report : list
+        Output of validate() for the whole batch.
+
+    """
+    def __init__(self,message,report):
+        super().__init__(message)
+        self.report=report
+
+def _fail(errors,kind,message):
+    """
+    Raise kind(message) when errors is "raise", print it otherwise.
+    """
+    if errors=="raise":
+        raise kind(message)
+    print(message)
+
+def _flags(matrix,values=None,saturation=None):
+    """
+    Failure bits of every row of matrix (readings along the last axis),
+    with VALUE set where values is not a positive finite number.
+    """
+    if saturation is None:
+        saturation=5.0
+    flags=np.zeros(matrix.shape[:-1],dtype=np.uint8)
+    finite=np.isfinite(matrix)
+    if not finite.all():
+        flags|=np.where(np.isnan(matrix).any(axis=-1),NAN,0).astype(np.uint8)
+        flags|=np.where((~finite & ~np.isnan(matrix)).any(axis=-1),INFINITE,0).astype(np.uint8)
+        matrix=np.where(finite,matrix,0)
+    flags|=np.where(matrix.min(axis=-1,initial=0)<0,NEGATIVE,0).astype(np.uint8)
+    flags|=np.where(matrix.max(axis=-1,initial=0)>saturation,SATURATED,0).astype(np.uint8)
+    if values is not None:
+        with np.errstate(invalid="ignore"):
+            flags|=np.where(np.isfinite(values) & (values>0),0,VALUE).astype(np.uint8)
+    return flags
+
+def _report(flags):
+    """
+    validate() output for an array of failure bits.
+    """
+    codes,inverse=np.unique(flags,return_inverse=True)
+    names=np.array([", ".join(name for bit,name in _reasons if code & bit) for code in codes],dtype=object)
+    return [["failed","flags","reasons"],flags!=0,flags,names[inverse.reshape(-1)].reshape(flags.shape)]
+
+def _screen(errors,matrix,values,batch_shape,other=None):
+    """
+    Failure bits of every row of matrix (and of other, e.g. the
+    post-exposure readings) when errors is "mask" or "raise" (raising
+    ColumnError if any row fails), None otherwise.
+    """
+    if errors is None:
+        return
+    flags=_flags(matrix,values)
+    if other is not None:
+        flags|=_flags(other)
+    failed=np.count_nonzero(flags)
+    if errors=="raise" and failed:
+        raise ColumnError("%d of %d columns failed validation"%(failed,flags.size),
+                          _report(flags.reshape(batch_shape)))
+    return flags
+
+def _expand(values,valid,fill):
+    """
+    values of the valid rows spread over every row, fill elsewhere.
+    """
+    full=np.full(valid.shape+values.shape[1:],fill,dtype=values.dtype)
+    full[valid]=values
+    return full
+
+def validate(data,values=None,axis=None,saturation=None):
+    """
+    Check every treatment of a batch in one vectorized pass.
+
+    This is the check the metrics run with errors="mask" or
+    errors="raise" before evaluating a batch.
+
+    Parameters
+    ----------
+    data : list, pandas.DataFrame or numpy.array
+        Each column of the array is a treatment, where rows
+        correspond to each reading.
+    values : float and/or array (optional)
+        C or target SPF of each treatment, which must be positive
+        and finite.
+    axis : int (optional)
+        Axis of data holding the readings. When given, data can
+        have any number of other dimensions.
+    saturation : float (optional)
+        Absorbance above which a reading is considered saturated.
+        Default 5.
+
+    Returns
+    -------
+    return : list
+        [["failed","flags","reasons"]] followed by, for every
+        treatment, whether it failed, its failure bits (NAN=1,
+        INFINITE=2, NEGATIVE=4, SATURATED=8, VALUE=16) and the
+        comma separated reasons ("" when valid), as numpy.array
+        with the shape of data without the reading axis.
+
+    """
+    data=np.asarray(data,dtype="float")
+    if data.ndim==0:
+        print("Invalid row number")
+        return
+    data=data.T if axis is None else np.moveaxis(data,axis,-1)
+    batch_shape=data.shape[:-1]
+    if values is not None:
+        try:
+            values=np.broadcast_to(np.asarray(values,dtype="float"),batch_shape)
+        except ValueError:
+            print("Dimensions of data and value arrays do not match")
+            return
+    return _report(_flags(data,values,saturation))
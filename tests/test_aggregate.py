@@ -0,0 +1,61 @@
+import numpy as np
+import pytest
+import photoprotectionpy as pp
+from photoprotectionpy import grouping
+
+# Products b, a and c with 5, 4 and 2 plates, interleaved.
+PRODUCTS=np.array(list("babababbcac"))
+DATA=np.random.default_rng(24).uniform(0.3,0.6,(111,PRODUCTS.size))
+# A plate of b far thicker than the others.
+DATA[:,4]*=3
+
+def test_statistics_match_each_product():
+    plates,products=pp.aggregate(DATA,PRODUCTS,min_plates=3)
+    assert plates[0]==["product","plate","SPF","SPF_outlier","UVAPF","UVAPF_outlier","CW","CW_outlier"]
+    assert list(plates[2])==[0,0,1,1,2,2,3,4,0,3,1]
+    np.testing.assert_allclose(plates[3],pp.ispf(DATA,axis=0),rtol=1e-12)
+    np.testing.assert_allclose(plates[5],pp.uvapf(DATA,1.0,axis=0),rtol=1e-12)
+    np.testing.assert_array_equal(plates[7],pp.criticalwave(DATA,axis=0))
+    assert list(products[1])==["a","b","c"]
+    np.testing.assert_array_equal(products[2],[4,5,2])
+    np.testing.assert_array_equal(products[3],[True,True,False])
+    for i,product in enumerate("abc"):
+        spf=plates[3][PRODUCTS==product]
+        np.testing.assert_allclose(products[4][i],spf.mean(),rtol=1e-12)
+        np.testing.assert_allclose(products[5][i],spf.std(ddof=1),rtol=1e-9)
+        np.testing.assert_allclose(products[6][i],100*spf.std(ddof=1)/spf.mean(),rtol=1e-9)
+
+def test_outliers():
+    plates,products=pp.aggregate(DATA,PRODUCTS,metrics=["spf","ratio"])
+    spf=plates[3]
+    expected=np.zeros(PRODUCTS.size,dtype=bool)
+    for product in "abc":
+        values=spf[PRODUCTS==product]
+        deviation=np.abs(values-np.median(values))
+        with np.errstate(divide="ignore",invalid="ignore"):
+            expected[PRODUCTS==product]=0.6745*deviation/np.median(deviation)>3.5
+    np.testing.assert_array_equal(plates[4],expected)
+    assert plates[4][4] and plates[4].sum()==1
+    assert products[0][-1]=="outliers"
+    np.testing.assert_array_equal(products[-1],[0,1,0])
+    # A looser threshold flags nothing.
+    assert not pp.aggregate(DATA,PRODUCTS,metrics=["spf"],outliers=1e3)[0][4].any()
+
+def test_mask():
+    data=DATA.copy()
+    data[50,0]=np.nan
+    (plates,products),report=pp.aggregate(data,PRODUCTS,metrics=["spf"],errors="mask")
+    assert report[1][0] and report[1].sum()==1
+    assert np.isnan(plates[3][0])
+    np.testing.assert_array_equal(products[2],[4,4,2])
+    np.testing.assert_allclose(products[4][1],plates[3][1:][PRODUCTS[1:]=="b"].mean(),rtol=1e-12)
+
+def test_invalid():
+    assert pp.aggregate(DATA) is None
+    assert pp.aggregate(DATA,PRODUCTS[:5]) is None
+    assert pp.aggregate(DATA,PRODUCTS,metrics=["spf","nothing"]) is None
+
+def test_sd_of_large_values_with_small_spread():
+    inverse=np.zeros(3,dtype=int)
+    n,mean,sd,cv=grouping._group_stats(np.array([1e9+1,1e9+2,1e9+3]),inverse,1)
+    np.testing.assert_allclose(sd,[1.0],rtol=1e-9)
@@ -0,0 +1,57 @@
+import numpy as np
+import pytest
+import photoprotectionpy as pp
+
+DATA=np.random.default_rng(10).uniform(0.05,1.2,(111,10))
+BAD=DATA.copy()
+BAD[60,3]=np.nan
+BAD[60,8]=np.nan
+
+def test_append_and_read(tmp_path):
+    assert pp.archive_append(tmp_path,DATA[:,:6],ids=["p%d"%i for i in range(6)])==6
+    assert pp.archive_append(tmp_path,DATA[:,6:])==10
+    spectra=pp.archive_open(tmp_path)
+    assert isinstance(spectra,np.memmap)
+    np.testing.assert_array_equal(spectra,DATA.T)
+    blocks=list(pp.archive_blocks(tmp_path,chunk=4,start=2))
+    assert [ids for ids,block in blocks]==[["p2","p3","p4","p5"],["6","7","8","9"]]
+    np.testing.assert_array_equal(blocks[1][1],DATA[:,6:])
+
+def test_carriage_return_in_ids(tmp_path):
+    ids=["a\r","b\rc","d"]
+    pp.archive_append(tmp_path,DATA[:,:3],ids=ids)
+    assert [names for names,block in pp.archive_blocks(tmp_path)]==[ids]
+
+def test_float32(tmp_path):
+    pp.archive_append(tmp_path,DATA,dtype="float32")
+    assert pp.archive_open(tmp_path).dtype==np.float32
+    np.testing.assert_array_equal(pp.archive_open(tmp_path),DATA.T.astype(np.float32))
+
+def test_evaluate(tmp_path):
+    pp.archive_append(tmp_path,DATA)
+    np.testing.assert_allclose(pp.archive_evaluate(tmp_path,pp.ispf,chunk=3),pp.ispf(DATA,axis=0),rtol=1e-12)
+    result=pp.archive_evaluate(tmp_path,pp.adjspf,"all",3,solver="newton",chunk=4,stop=7)
+    expected=pp.adjspf(DATA[:,:7],"all",3,solver="newton",axis=0)
+    assert result[0]==expected[0]
+    np.testing.assert_allclose(result[1:],expected[1:],rtol=1e-12)
+
+@pytest.fixture
+def archive(tmp_path):
+    pp.archive_append(tmp_path,BAD)
+    return tmp_path
+
+def test_results(archive):
+    result=pp.archive_evaluate(archive,pp.adjspf,"all",3,solver="newton",chunk=4,output="results")
+    expected=pp.adjspf(BAD,"all",3,solver="newton",axis=0,output="results")
+    assert isinstance(result,pp.Results) and result.names==expected.names
+    for name in expected:
+        # Matrix products over smaller blocks may round differently.
+        np.testing.assert_allclose(result[name],expected[name],rtol=1e-12)
+
+def test_mask(archive):
+    values,report=pp.archive_evaluate(archive,pp.ispf,chunk=4,errors="mask")
+    expected,expected_report=pp.ispf(BAD,axis=0,errors="mask")
+    np.testing.assert_array_equal(values,expected)
+    assert report[0]==expected_report[0]
+    for column,expected_column in zip(report[1:],expected_report[1:]):
+        np.testing.assert_array_equal(column,expected_column)
@@ -0,0 +1,24 @@
+import numpy as np
+import pytest
+import photoprotectionpy as pp
+
+DATA=np.random.default_rng(2).uniform(0.05,1.2,(2,3,111,5))
+
+@pytest.mark.parametrize("integration",["trapz","simpson"])
+def test_batch_dimensions(integration):
+    spf=pp.ispf(DATA,integration,axis=2)
+    assert spf.shape==(2,3,5)
+    np.testing.assert_allclose(spf[1,2],pp.ispf(DATA[1,2],integration),rtol=1e-12)
+    np.testing.assert_array_equal(pp.criticalwave(DATA,integration,axis=2)[0,1],
+                                  pp.criticalwave(DATA[0,1],integration))
+
+@pytest.mark.parametrize("integration",["trapz","simpson"])
+def test_values_broadcast(integration):
+    C=np.array([0.5,0.8,1.0,1.2,0.9])
+    uvapf=pp.uvapf(DATA,C,integration,axis=2)
+    adjusted=pp.adjspf(DATA,"adj",C,integration=integration,axis=2)
+    assert uvapf.shape==adjusted.shape==(2,3,5)
+    for j in range(5):
+        np.testing.assert_allclose(uvapf[1,0,j],pp.uvapf(DATA[1,0,:,j:j+1],C[j:j+1],integration)[0],rtol=1e-12)
+    np.testing.assert_allclose(adjusted,pp.adjspf(np.moveaxis(DATA,2,0),"adj",C,integration=integration,axis=0),
+                               rtol=1e-12)
@@ -0,0 +1,52 @@
+import sys
+import numpy as np
+import pytest
+import photoprotectionpy as pp
+
+# The package exports the bootstrap function under the module's name.
+bootstrap_module=sys.modules["photoprotectionpy.bootstrap"]
+
+DATA=np.random.default_rng(7).uniform(0.05,1.2,(111,40))
+GROUPS=np.repeat(np.arange(10),4)
+
+@pytest.mark.parametrize("metric",["spf","uvapf","cw"])
+def test_statistics(metric):
+    result=pp.bootstrap(DATA,GROUPS,metric,C=0.8,seed=1,replicates=2000)
+    assert result[0]==["product","n","mean","SD","CV","CI_low","CI_high"]
+    if metric=="spf":
+        values=pp.ispf(DATA*0.8,axis=0)
+    elif metric=="uvapf":
+        values=pp.uvapf(DATA,0.8,axis=0)
+    else:
+        values=pp.criticalwave(DATA,axis=0).astype(float)
+    values=values.reshape(10,4)
+    np.testing.assert_array_equal(result[1],np.arange(10))
+    np.testing.assert_array_equal(result[2],4)
+    np.testing.assert_allclose(result[3],values.mean(axis=1),rtol=1e-12)
+    np.testing.assert_allclose(result[4],values.std(axis=1,ddof=1),rtol=1e-9)
+    np.testing.assert_allclose(result[5],result[4]/result[3]*100,rtol=1e-12)
+    assert (values.min(axis=1)<=result[6]).all() and (result[6]<=result[7]).all()
+    assert (result[7]<=values.max(axis=1)).all()
+
+def test_seed():
+    first=pp.bootstrap(DATA,GROUPS,seed=3,replicates=500)
+    second=pp.bootstrap(DATA,GROUPS,seed=3,replicates=500)
+    np.testing.assert_array_equal(first[6],second[6])
+    np.testing.assert_array_equal(first[7],second[7])
+
+def test_chunks_do_not_change_results(monkeypatch):
+    expected=pp.bootstrap(DATA,GROUPS,seed=1,replicates=2000)
+    monkeypatch.setattr(bootstrap_module,"_draws",100)
+    result=pp.bootstrap(DATA,GROUPS,seed=1,replicates=2000)
+    for column,expected_column in zip(result[1:],expected[1:]):
+        np.testing.assert_array_equal(column,expected_column)
+
+def test_missing_cw_is_left_out():
+    data=DATA.copy()
+    # No CW is found for a spectrum of NaN (-1 from criticalwave).
+    data[:,0]=np.nan
+    result=pp.bootstrap(data,GROUPS,"cw",seed=1,replicates=500)
+    cw=pp.criticalwave(DATA[:,1:4],axis=0)
+    assert result[2][0]==3
+    assert result[3][0]==cw.mean()
+    assert cw.min()<=result[6][0]<=result[7][0]<=cw.max()
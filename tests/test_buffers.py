@@ -0,0 +1,36 @@
+import numpy as np
+import photoprotectionpy as pp
+
+DATA=np.random.default_rng(17).uniform(0.05,1.2,(111,8))
+
+def test_float32():
+    expected=pp.ispf(DATA,axis=0)
+    spf=pp.ispf(DATA.astype(np.float32),axis=0)
+    assert spf.dtype==np.float32
+    np.testing.assert_allclose(spf,expected,rtol=1e-4)
+    uvapf=pp.uvapf(DATA[30:].astype(np.float32),0.8,axis=0)
+    assert uvapf.dtype==np.float32
+    np.testing.assert_allclose(uvapf,pp.uvapf(DATA[30:],0.8,axis=0),rtol=1e-4)
+
+def test_out_and_workspace():
+    for data in (DATA,DATA.astype(np.float32)):
+        out=np.empty(8,dtype=data.dtype)
+        workspace=np.empty(data.size,dtype=data.dtype)
+        spf=pp.ispf(data,axis=0,out=out,workspace=workspace)
+        assert spf is out or np.shares_memory(spf,out)
+        np.testing.assert_array_equal(out,pp.ispf(data,axis=0))
+        adjusted=pp.adjspf(data,"adj",np.linspace(0.5,1.5,8),axis=0,out=out,workspace=workspace)
+        assert np.shares_memory(adjusted,out)
+        np.testing.assert_array_equal(out,pp.adjspf(data,"adj",np.linspace(0.5,1.5,8),axis=0))
+
+def test_invalid_buffers(capsys):
+    assert pp.ispf(DATA,axis=0,out=np.empty(7)) is None
+    assert pp.ispf(DATA,axis=0,workspace=np.empty(10)) is None
+    assert pp.ispf(DATA,axis=0,workspace=np.empty(DATA.size,dtype=np.float32)) is None
+    assert capsys.readouterr().out
+
+def test_high_absorbance():
+    data=np.full((111,2),40.0)
+    data[:,1]=np.linspace(30,60,111)
+    spf=pp.ispf(data,axis=0)
+    assert np.all(np.isfinite(spf)) and np.all(spf>1e20)
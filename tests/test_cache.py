@@ -0,0 +1,70 @@
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+import pytest
+import photoprotectionpy as pp
+
+DATA=np.random.default_rng(18).uniform(0.05,1.2,(111,6))
+TARGETS=np.array([2.0,3.0,2.5,4.0,3.5,2.0])
+
+@pytest.fixture(autouse=True)
+def no_cache():
+    yield
+    pp.disable_cache()
+
+def solve(data=DATA,targets=TARGETS):
+    return pp.adjspf(data,"all",targets,solver="newton",full_output=True,axis=0)
+
+def test_hits_and_misses():
+    expected=solve()
+    cache=pp.enable_cache()
+    first=solve()
+    assert pp.cache_info()["misses"]==6 and pp.cache_info()["hits"]==0
+    second=solve(DATA[:,::-1],TARGETS[::-1])
+    assert cache.info()["hits"]==6 and cache.info()["size"]==6
+    for result in (first,second):
+        for column,expected_column in zip(result[1:],expected[1:]):
+            np.testing.assert_allclose(column[::1 if result is first else -1],expected_column,rtol=1e-12)
+    # Another target is another entry.
+    solve(targets=TARGETS+1)
+    assert cache.info()["misses"]==12
+
+def test_eviction():
+    cache=pp.enable_cache(maxsize=4)
+    solve()
+    assert cache.info()["size"]==4
+    # The last four spectra are still held, the first two were evicted.
+    solve(DATA[:,2:],TARGETS[2:])
+    solve(DATA[:,:2],TARGETS[:2])
+    assert cache.info()["hits"]==4 and cache.info()["misses"]==8
+
+def test_disk_round_trip(tmp_path):
+    path=str(tmp_path/"cache.sqlite")
+    pp.enable_cache(path=path)
+    expected=solve()
+    pp.disable_cache()
+    cache=pp.enable_cache(path=path)
+    result=solve()
+    assert cache.info()["disk_hits"]==6 and cache.info()["misses"]==0
+    for column,expected_column in zip(result[1:],expected[1:]):
+        np.testing.assert_array_equal(column,expected_column)
+    cache.clear()
+    solve()
+    assert cache.info()["misses"]==6
+
+def test_disabled():
+    pp.enable_cache()
+    pp.disable_cache()
+    assert pp.cache_info() is None
+
+def test_other_threads(tmp_path):
+    expected=solve()
+    cache=pp.enable_cache(maxsize=8,path=str(tmp_path/"cache.sqlite"))
+    # Evaluated from executor threads, as the service does, with evictions
+    # and disk lookups racing each other.
+    with ThreadPoolExecutor(4) as pool:
+        results=list(pool.map(lambda i:solve(np.roll(DATA,i,axis=1),np.roll(TARGETS,i)),range(24)))
+    for i,result in enumerate(results):
+        for column,expected_column in zip(result[1:],expected[1:]):
+            np.testing.assert_allclose(column,np.roll(expected_column,i),rtol=1e-12)
+    info=cache.info()
+    assert info["hits"]+info["disk_hits"]+info["misses"]==24*6 and info["size"]<=8
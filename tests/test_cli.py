@@ -0,0 +1,76 @@
+import csv
+import numpy as np
+import pytest
+import photoprotectionpy as pp
+from photoprotectionpy.cli import main
+
+DATA=np.random.default_rng(8).uniform(0.05,1.2,(111,2))
+
+def rows(path):
+    with open(path,newline="") as handle:
+        return list(csv.reader(handle))
+
+def test_results_match_the_functions(tmp_path,monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path/"exports").mkdir()
+    np.savetxt("exports/a.csv",DATA,delimiter=",")
+    np.savetxt("exports/b.csv",DATA[:,::-1],delimiter=",")
+    assert main(["exports","-o","results.csv","-m","ispf","criticalwave"])==0
+    table=rows("results.csv")
+    assert table[0]==["file","plate","SPF","CW"]
+    assert [row[0][-5:] for row in table[1:]]==["a.csv","a.csv","b.csv","b.csv"]
+    spf=pp.ispf(DATA,axis=0)
+    np.testing.assert_allclose([float(row[2]) for row in table[1:]],np.concatenate([spf,spf[::-1]]),rtol=1e-12)
+    cw=pp.criticalwave(DATA,axis=0)
+    assert [int(row[3]) for row in table[1:]]==list(np.concatenate([cw,cw[::-1]]))
+
+def test_resume(tmp_path,monkeypatch,capsys):
+    monkeypatch.chdir(tmp_path)
+    (tmp_path/"exports").mkdir()
+    for name in "abc":
+        np.savetxt("exports/%s.csv"%name,DATA,delimiter=",")
+    assert main(["exports","-o","results.csv"])==0
+    expected=rows("results.csv")
+    # An existing output is not overwritten.
+    assert main(["exports","-o","results.csv"])==2
+    # Cut the last file short, as an interruption would.
+    with open("results.csv") as handle:
+        text=handle.read()
+    with open("results.csv","w") as handle:
+        handle.write(text[:-10])
+    capsys.readouterr()
+    assert main(["exports","-o","results.csv","--resume"])==0
+    assert rows("results.csv")==expected
+    assert "1 files evaluated, 2 skipped, 0 failed" in capsys.readouterr().err
+
+def test_options(tmp_path):
+    with pytest.raises(SystemExit):
+        main([str(tmp_path),"-o",str(tmp_path/"results.csv"),"-m","adjspf"])
+
+@pytest.mark.parametrize("workers",[1,2])
+def test_failed_file_does_not_stop_the_batch(tmp_path,capsys,workers):
+    exports=tmp_path/"exports"
+    exports.mkdir()
+    np.savetxt(exports/"a.csv",DATA,delimiter=",")
+    with open(exports/"b.csv","w") as handle:
+        handle.write("0.5,oops\n"*111)
+    np.savetxt(exports/"c.csv",DATA,delimiter=",")
+    output=tmp_path/"results.csv"
+    assert main([str(exports),"-o",str(output),"-w",str(workers)])==1
+    with open(output,newline="") as handle:
+        rows=list(csv.reader(handle))
+    # Workers write files in the order they finish.
+    assert sorted(row[0][-5:] for row in rows[1:])==["a.csv","a.csv","c.csv","c.csv"]
+    error=capsys.readouterr().err
+    assert "b.csv: no spectra could be read" in error
+    assert "2 files evaluated, 0 skipped, 1 failed" in error
+
+def test_parquet_without_pyarrow(tmp_path,monkeypatch,capsys):
+    import importlib.util
+    find_spec=importlib.util.find_spec
+    monkeypatch.setattr(importlib.util,"find_spec",lambda name,*args:None if name=="pyarrow" else find_spec(name,*args))
+    np.savetxt(tmp_path/"a.csv",DATA,delimiter=",")
+    output=tmp_path/"results.parquet"
+    assert main([str(tmp_path),"-o",str(output)])==2
+    assert "Parquet output needs pyarrow" in capsys.readouterr().err
+    assert not output.exists() and not (tmp_path/"results.parquet.partial.csv").exists()
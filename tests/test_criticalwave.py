@@ -0,0 +1,10 @@
+import numpy as np
+import photoprotectionpy as pp
+
+DATA=np.random.default_rng(11).uniform(0.05,1.2,(111,6))
+
+def test_interpolated_trapz():
+    # 90 % of the area from 290 nm, on the piecewise-linear cumulative integral.
+    cumulative=np.concatenate([np.zeros((1,6)),np.cumsum((DATA[1:]+DATA[:-1])/2,axis=0)])
+    expected=[np.interp(0.9*column[-1],column,np.arange(290,401)) for column in cumulative.T]
+    np.testing.assert_allclose(pp.criticalwave(DATA,axis=0,interpolate=True),expected,rtol=1e-12)
@@ -0,0 +1,53 @@
+import numpy as np
+import photoprotectionpy as pp
+
+DATA=np.random.default_rng(4).uniform(0.05,1.2,(111,5))
+
+def test_summary_matches_plates():
+    dataset=pp.Dataset(solver="newton")
+    dataset.set(["a1","a2","a3","b1","b2"],DATA,3,product=["a","a","a","b","b"])
+    summary=dataset.summary("UVAPF")
+    results=dataset.results()
+    uvapf=results[1+results[0].index("UVAPF")]
+    assert summary[1]==["a","b"]
+    np.testing.assert_array_equal(summary[2],[3,2])
+    np.testing.assert_allclose(summary[3],[uvapf[:3].mean(),uvapf[3:].mean()],rtol=1e-12)
+    np.testing.assert_allclose(summary[4],[uvapf[:3].std(ddof=1),uvapf[3:].std(ddof=1)],rtol=1e-9)
+
+def test_only_changed_plates_are_evaluated():
+    dataset=pp.Dataset(solver="newton")
+    dataset.set(["a1","a2","a3"],DATA[:,:3],3)
+    assert dataset.update()==3
+    assert dataset.update()==0
+    dataset.set("a2",DATA[:,4],3)
+    assert dataset.update()==1
+    results=dataset.results()
+    expected=pp.iso24443(DATA[:,4],DATA[:,4],3,solver="newton",axis=0)
+    for name in ("SPF","adjSPF","UVAPF","CW"):
+        np.testing.assert_allclose(results[1+results[0].index(name)][1],expected[1+expected[0].index(name)],rtol=1e-12)
+
+def test_exclude_and_include():
+    dataset=pp.Dataset(solver="newton")
+    dataset.set(["a1","a2","a3","a4"],DATA[:,:4],3,product="a")
+    expected=dataset.summary()
+    dataset.exclude("a4")
+    assert dataset.update()==0
+    spf=dataset.results()[4]
+    summary=dataset.summary()
+    assert summary[2][0]==3
+    np.testing.assert_allclose(summary[3],[spf[:3].mean()],rtol=1e-12)
+    dataset.include("a4")
+    np.testing.assert_allclose(dataset.summary()[3:],expected[3:],rtol=1e-12)
+
+def test_nan_plate_does_not_stick():
+    dataset=pp.Dataset(solver="newton")
+    dataset.set(["a1","a2","a3"],DATA[:,:3],3,product="a")
+    expected=dataset.summary()
+    bad=DATA[:,3].copy()
+    bad[20]=np.nan
+    dataset.set("a4",bad,3,product="a")
+    summary=dataset.summary()
+    assert summary[2][0]==3
+    np.testing.assert_allclose(summary[3],expected[3],rtol=1e-12)
+    dataset.remove("a4")
+    np.testing.assert_allclose(dataset.summary()[3:],expected[3:],rtol=1e-12)
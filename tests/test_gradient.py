@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+import photoprotectionpy as pp
+
+DATA=np.random.default_rng(23).uniform(0.05,1.2,(111,3))
+STEP=1e-6
+
+# name: (factor as a function of data and C, C at which the gradient is taken)
+METRICS={
+    # ispf is the factor at C=1.
+    "ispf":(lambda data,C,**kwargs:pp.ispf(data*C,axis=0,**kwargs),np.ones(3)),
+    "uvapf":(lambda data,C,**kwargs:pp.uvapf(data,C,axis=0,**kwargs),np.array([0.8,1.0,1.3])),
+    "adjspf":(lambda data,C,**kwargs:pp.adjspf(data,"adj",C,axis=0,**kwargs),np.array([0.8,1.0,1.3])),
+}
+
+def differences(function,C):
+    """
+    Central finite differences of function with respect to every
+    reading and to C.
+    """
+    dA=np.zeros_like(DATA)
+    for i in range(111):
+        shift=np.zeros_like(DATA)
+        shift[i]=STEP
+        dA[i]=(function(DATA+shift,C)-function(DATA-shift,C))/(2*STEP)
+    dC=(function(DATA,C+STEP)-function(DATA,C-STEP))/(2*STEP)
+    return dA,dC
+
+@pytest.mark.parametrize("metric",list(METRICS))
+def test_matches_finite_differences(metric):
+    function,C=METRICS[metric]
+    result=pp.ispf(DATA,axis=0,gradient=True) if metric=="ispf" else function(DATA,C,gradient=True)
+    assert result[0][1:]==["d%s/dA"%result[0][0],"d%s/dC"%result[0][0]]
+    np.testing.assert_allclose(result[1],function(DATA,C),rtol=1e-12)
+    dA,dC=differences(function,C)
+    assert result[2].shape==DATA.shape
+    scale=np.abs(dA).max(axis=0)
+    np.testing.assert_allclose(result[2]/scale,dA/scale,atol=1e-5)
+    np.testing.assert_allclose(result[3],dC,rtol=1e-5)
+    if metric=="uvapf":
+        # Readings below 320 nm do not enter the UVA-PF.
+        assert not result[2][:30].any()
+
+def test_list_output_and_workers():
+    expected=pp.ispf(DATA,axis=0,gradient=True)
+    result=pp.ispf(DATA,gradient=True)
+    for column,expected_column in zip(result[1:],expected[1:]):
+        np.testing.assert_allclose(column,expected_column,rtol=1e-12)
+    result=pp.adjspf(DATA,"adj",0.9,axis=0,gradient=True,workers=2)
+    for column,expected_column in zip(result[1:],pp.adjspf(DATA,"adj",0.9,axis=0,gradient=True)[1:]):
+        np.testing.assert_allclose(column,expected_column,rtol=1e-12)
+
+def test_wavelengths():
+    # On a 2 nm grid the gradient follows the readings through the resampling.
+    grid=np.arange(290,401,2)
+    data=DATA[::2]
+    function=lambda data,C:pp.ispf(data,axis=0,wavelengths=grid)
+    result=pp.ispf(data,axis=0,wavelengths=grid,gradient=True)
+    assert result[2].shape==data.shape
+    for i in (0,10,40):
+        shift=np.zeros_like(data)
+        shift[i]=STEP
+        np.testing.assert_allclose(result[2][i],(function(data+shift,1)-function(data-shift,1))/(2*STEP),rtol=1e-5)
+
+def test_only_in_adj_mode():
+    assert pp.adjspf(DATA,"all",3,axis=0,gradient=True) is None
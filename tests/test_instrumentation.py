@@ -0,0 +1,29 @@
+import json
+import numpy as np
+import photoprotectionpy as pp
+
+DATA=np.random.default_rng(15).uniform(0.05,1.2,(111,4))
+
+def test_records():
+    with pp.instrument() as recorder:
+        pp.ispf(DATA,axis=0)
+        pp.adjspf(DATA,"calc",[2,3,2,3],solver="newton",axis=0)
+    calls=recorder.to_dict()["calls"]
+    assert [call["function"] for call in calls]==["ispf","adjspf"]
+    assert calls[0]["columns"]==4
+    assert set(calls[1]["stages"])>={"validation","exponentiation","integration","search"}
+    assert all(calls[1]["converged"]) and len(calls[1]["iterations"])==4
+    summary=json.loads(recorder.to_json())["summary"]
+    assert summary["adjspf"]["calls"]==1 and summary["adjspf"]["iterations"]==sum(calls[1]["iterations"])
+    pp.ispf(DATA,axis=0)
+    assert len(recorder.records)==2
+
+def test_listener():
+    records=[]
+    pp.add_listener(records.append)
+    try:
+        pp.criticalwave(DATA,axis=0)
+    finally:
+        pp.remove_listener(records.append)
+    pp.criticalwave(DATA,axis=0)
+    assert [record["function"] for record in records]==["criticalwave"]
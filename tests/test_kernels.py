@@ -0,0 +1,46 @@
+"""
+Every path computing protection factors goes through the shared kernel,
+so saturated plates, whose transmittance underflows, give the same
+finite values everywhere.
+"""
+import numpy as np
+import pytest
+import photoprotectionpy as pp
+
+DATA=np.random.default_rng(5).uniform(300,310,(111,3))
+SPF=pp.ispf(DATA,axis=0)
+UVAPF=pp.uvapf(DATA,1.0,axis=0)
+
+def screened(metric):
+    """
+    metric of each candidate of screen() with one component each, in
+    the order of the components.
+    """
+    scores=pp.screen(DATA,np.eye(3))
+    values=np.empty(3)
+    values[scores[1]]=scores[1+scores[0].index(metric)]
+    return values
+
+def test_reference_is_finite():
+    assert np.isfinite(SPF).all() and np.isfinite(UVAPF).all()
+
+@pytest.mark.parametrize("path,expected",[
+    (lambda:pp.iso24443(DATA,DATA,1e150,solver="bisect",axis=0)[1],SPF),
+    (lambda:pp.bootstrap(DATA,[0,1,2],replicates=10)[3],SPF),
+    (lambda:pp.bootstrap(DATA,[0,1,2],"uvapf",replicates=10)[3],UVAPF),
+    (lambda:screened("SPF"),SPF),
+    (lambda:screened("UVAPF"),UVAPF),
+    (lambda:pp.photostability(DATA[None],[0],1.0)[2][0],SPF),
+    (lambda:pp.photostability(DATA[None],[0],1.0)[3][0],UVAPF),
+    (lambda:pp.aggregate(DATA,[0,1,2],metrics=["spf"])[0][3],SPF),
+    (lambda:pp.aggregate(DATA,[0,1,2],metrics=["uvapf"])[0][3],UVAPF),
+],ids=["iso24443","bootstrap-spf","bootstrap-uvapf","screen-spf","screen-uvapf",
+       "photostability-spf","photostability-uvapf","aggregate-spf","aggregate-uvapf"])
+def test_saturated_plates(path,expected):
+    np.testing.assert_allclose(path(),expected,rtol=1e-9)
+
+def test_float32_underflow():
+    data=np.random.default_rng(6).uniform(35,37,(111,3)).astype(np.float32)
+    spf=pp.photostability(data[None],[0],1.0)[2][0]
+    assert spf.dtype==np.float32
+    np.testing.assert_allclose(spf,pp.ispf(data,axis=0),rtol=1e-7)
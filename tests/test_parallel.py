@@ -0,0 +1,22 @@
+import sys
+import numpy as np
+import pytest
+import photoprotectionpy as pp
+
+DATA=np.random.default_rng(14).uniform(0.05,1.2,(111,12))
+
+@pytest.fixture(autouse=True)
+def small_threshold(monkeypatch):
+    monkeypatch.setattr(sys.modules["photoprotectionpy._parallel"],"threshold",4)
+
+def test_adjspf():
+    expected=pp.adjspf(DATA,"all",3,solver="newton",full_output=True,axis=0)
+    result=pp.adjspf(DATA,"all",3,solver="newton",full_output=True,axis=0,workers=2)
+    assert result[0]==expected[0]
+    # Matrix products over smaller blocks may round differently.
+    for column,expected_column in zip(result[1:],expected[1:]):
+        np.testing.assert_allclose(column,expected_column,rtol=1e-12)
+
+def test_uvapf():
+    C=np.linspace(0.5,1.5,12)
+    np.testing.assert_allclose(pp.uvapf(DATA,C,axis=0,workers=2),pp.uvapf(DATA,C,axis=0),rtol=1e-12)
@@ -0,0 +1,42 @@
+import numpy as np
+import photoprotectionpy as pp
+
+# Absorbance of 5 samples falling over 4 dose steps.
+BASE=np.random.default_rng(9).uniform(0.2,1.5,(111,5))
+DATA=np.stack([BASE*factor for factor in (1.0,0.9,0.75,0.6)])
+DOSES=np.array([0.0,5.0,10.0,20.0])
+C=np.linspace(0.8,1.2,5)
+
+def test_matches_the_metrics():
+    results=pp.photostability(DATA,DOSES,C)
+    assert results[0]==["dose","SPF","UVAPF","CW"]
+    for step in range(4):
+        np.testing.assert_array_equal(results[1][step],DOSES[step])
+        np.testing.assert_allclose(results[2][step],pp.adjspf(DATA[step],"adj",C,axis=0),rtol=1e-12)
+        np.testing.assert_allclose(results[3][step],pp.uvapf(DATA[step],C,axis=0),rtol=1e-12)
+        np.testing.assert_array_equal(results[4][step],pp.criticalwave(DATA[step],axis=0))
+
+def test_layout():
+    expected=pp.photostability(DATA,DOSES,C)
+    results=pp.photostability(np.moveaxis(DATA,(0,1),(2,0)),DOSES,C,axis=0,dose_axis=2)
+    for column,expected_column in zip(results[1:],expected[1:]):
+        np.testing.assert_allclose(column,expected_column,rtol=1e-12)
+
+def test_iso_dose():
+    results=pp.photostability(DATA,DOSES,C,iso=True)
+    assert results[0][4:]==["D","SPF_D","UVAPF_D","CW_D"]
+    D=results[5]
+    np.testing.assert_allclose(D,pp.uvdose(results[3][0]),rtol=1e-12)
+    for i in range(5):
+        for curve,at_dose in zip(results[2:4],results[6:8]):
+            expected=np.interp(D[i],DOSES,curve[:,i]) if D[i]<=DOSES[-1] else np.nan
+            np.testing.assert_allclose(at_dose[i],expected,rtol=1e-12)
+
+def test_mask():
+    data=DATA.copy()
+    data[2,40,1]=np.nan
+    results,report=pp.photostability(data,DOSES,C,errors="mask")
+    np.testing.assert_array_equal(report[1],[False,True,False,False,False])
+    assert np.isnan(results[2][:,1]).all() and (results[4][:,1]==-1).all()
+    expected=pp.photostability(DATA,DOSES,C)
+    np.testing.assert_allclose(results[2][:,[0,2,3,4]],expected[2][:,[0,2,3,4]],rtol=1e-12)
@@ -0,0 +1,38 @@
+"""
+iso24443 against the separate calls of the ISO 24443 sequence.
+"""
+import numpy as np
+import pytest
+import photoprotectionpy as pp
+
+RNG=np.random.default_rng(12)
+PRE=RNG.uniform(0.05,1.2,(111,4))
+POST=PRE*RNG.uniform(0.7,1.0,(111,4))
+TARGETS=np.array([2.0,3.0,2.5,4.0])
+
+@pytest.mark.parametrize("integration",["trapz","simpson"])
+@pytest.mark.parametrize("solver",["newton","bisect"])
+def test_separate_calls(solver,integration):
+    result=pp.iso24443(PRE,POST,TARGETS,integration=integration,solver=solver,axis=0)
+    assert result[0]==["SPF","C","adjSPF","UVAPF0","D","UVAPF","CW"]
+    spf,C,adjusted,uvapf0,dose,uvapf,cw=result[1:]
+    np.testing.assert_allclose(spf,pp.ispf(PRE,integration,axis=0),rtol=1e-12)
+    np.testing.assert_allclose(C,pp.adjspf(PRE,"calc",TARGETS,integration=integration,solver=solver,axis=0),
+                               rtol=1e-12)
+    np.testing.assert_allclose(adjusted,pp.adjspf(PRE,"adj",C,integration=integration,axis=0),rtol=1e-12)
+    np.testing.assert_allclose(uvapf0,pp.uvapf(PRE,C,integration,axis=0),rtol=1e-12)
+    np.testing.assert_allclose(dose,pp.uvdose(uvapf0),rtol=1e-12)
+    np.testing.assert_allclose(uvapf,pp.uvapf(POST,C,integration,axis=0),rtol=1e-12)
+    np.testing.assert_array_equal(cw,pp.criticalwave(POST,integration,axis=0))
+
+@pytest.mark.parametrize("integration",["trapz","simpson"])
+@pytest.mark.parametrize("dtype",[np.float64,np.float32])
+def test_shared_transmittance(dtype,integration):
+    from photoprotectionpy import _kernels
+    pre=PRE.T.astype(dtype)
+    C=np.array([0.5,0.8,1.0,1.3])
+    transmitted=_kernels.transmittance(pre,C)
+    rtol=1e-12 if dtype==np.float64 else 1e-6
+    for data,shared,name in [(pre,transmitted,"spf"),(pre[:,30:],transmitted[:,30:],"uvapf")]:
+        np.testing.assert_allclose(_kernels.protection(data,C,name,integration,transmitted=shared),
+                                   _kernels.protection(data,C,name,integration),rtol=rtol)
@@ -0,0 +1,83 @@
+import io
+import numpy as np
+import pytest
+import photoprotectionpy as pp
+from photoprotectionpy import reader
+
+DATA=np.random.default_rng(13).uniform(0.05,1.2,(111,5))
+NAMES=["a","b","c","d","e"]
+
+def export(layout,header,index,delimiter=","):
+    """
+    DATA written as a delimited export.
+    """
+    table=DATA if layout=="columns" else DATA.T
+    labels=list(range(290,401)) if layout=="columns" else NAMES
+    lines=[]
+    if header:
+        names=NAMES if layout=="columns" else [str(w) for w in range(290,401)]
+        lines.append(delimiter.join((["nm"] if index else [])+names))
+    for label,row in zip(labels,table):
+        lines.append(delimiter.join(([str(label)] if index else [])+[repr(float(value)) for value in row]))
+    return "\n".join(lines)+"\n"
+
+@pytest.mark.parametrize("layout",["columns","rows"])
+@pytest.mark.parametrize("header,index",[(False,False),(True,True)])
+def test_blocks(layout,header,index):
+    text=export(layout,header,index)
+    blocks=list(pp.read_chunks(io.BytesIO(text.encode()),chunk=2,header=header,index=index,layout=layout))
+    assert [block.shape for names,block in blocks]==[(111,2),(111,2),(111,1)]
+    np.testing.assert_array_equal(np.concatenate([block for names,block in blocks],axis=1),DATA)
+    names=sum([names for names,block in blocks],[])
+    if layout=="columns" and header or layout=="rows" and index:
+        assert names==NAMES
+    else:
+        assert names==list(range(5))
+
+def test_text_and_tsv():
+    text=export("columns",True,False,"\t")
+    blocks=list(pp.read_chunks(io.StringIO(text),chunk=3,delimiter="\t",header=True))
+    np.testing.assert_array_equal(np.concatenate([block for names,block in blocks],axis=1),DATA)
+
+def test_stream():
+    results=list(pp.stream(io.BytesIO(export("columns",False,False).encode()),pp.ispf,chunk=2))
+    np.testing.assert_allclose(np.concatenate([spf for names,spf in results]),pp.ispf(DATA,axis=0),rtol=1e-12)
+
+@pytest.mark.parametrize("newline",["\n","\r\n"])
+def test_single_character_lines(newline):
+    values=np.arange(111)%10
+    text=newline.join(str(value) for value in values)+newline+newline+" "+newline
+    blocks=list(pp.read_chunks(io.BytesIO(text.encode())))
+    assert len(blocks)==1
+    np.testing.assert_array_equal(blocks[0][1],values[:,None])
+
+def test_lines_across_pieces():
+    # Every line is one digit and "\r\n", read two bytes at a time.
+    text=("\r\n".join(str(value) for value in np.arange(111)%10)+"\r\n\r\n").encode()
+    assert reader._line_offsets(io.BytesIO(text),2)==list(range(0,333,3))
+
+@pytest.mark.parametrize("layout",["columns","rows"])
+@pytest.mark.parametrize("chunk",[2,5])
+@pytest.mark.parametrize("newline",["\n","\r\n"])
+def test_trailing_delimiter(layout,chunk,newline):
+    text=export(layout,True,True).replace("\n",","+newline)
+    blocks=list(pp.read_chunks(io.BytesIO(text.encode()),chunk=chunk,header=True,index=True,layout=layout))
+    np.testing.assert_array_equal(np.concatenate([block for names,block in blocks],axis=1),DATA)
+    assert sum([names for names,block in blocks],[])==NAMES
+
+@pytest.mark.parametrize("layout",["columns","rows"])
+def test_quoted_names(layout):
+    lines=export(layout,True,True).splitlines()
+    if layout=="columns":
+        lines[0]=",".join('"%s"'%name for name in lines[0].split(","))
+    else:
+        lines[1:]=['"%s"%s'%(name,line[len(name):]) for name,line in zip(NAMES,lines[1:])]
+    text="\n".join(lines)+"\n"
+    blocks=list(pp.read_chunks(io.StringIO(text),chunk=2,header=True,index=True,layout=layout))
+    assert sum([names for names,block in blocks],[])==NAMES
+
+@pytest.mark.parametrize("layout",["columns","rows"])
+def test_invalid_value(layout,capsys):
+    text=export(layout,False,False).replace(",",",x",1)
+    assert list(pp.read_chunks(io.BytesIO(text.encode()),chunk=2,layout=layout))==[]
+    assert capsys.readouterr().out=="Invalid absorbance value\n"
@@ -0,0 +1,71 @@
+import numpy as np
+import pytest
+import photoprotectionpy as pp
+
+DATA=np.random.default_rng(9).uniform(0.05,1.2,(111,4))
+
+# name: call of the metric with the given output
+METRICS={
+    "ispf":lambda **kwargs:pp.ispf(DATA,axis=0,**kwargs),
+    "uvapf":lambda **kwargs:pp.uvapf(DATA,0.9,axis=0,**kwargs),
+    "adjspf":lambda **kwargs:pp.adjspf(DATA,"all",3,solver="newton",full_output=True,axis=0,**kwargs),
+    "criticalwave":lambda **kwargs:pp.criticalwave(DATA,axis=0,interpolate=True,**kwargs),
+    "iso24443":lambda **kwargs:pp.iso24443(DATA,DATA,3,solver="newton",axis=0,**kwargs),
+}
+
+@pytest.mark.parametrize("metric",list(METRICS))
+def test_matches_the_list_output(metric):
+    result=METRICS[metric](output="results")
+    assert isinstance(result,pp.Results) and result.shape==(4,)
+    expected=pp.as_results(METRICS[metric]())
+    if len(expected.names)>1:
+        # Solver diagnostics may follow the columns of the list.
+        assert result.names[:len(expected.names)]==expected.names
+    for column,expected_column in zip(result.columns.values(),expected.columns.values()):
+        np.testing.assert_allclose(column,expected_column,rtol=1e-12)
+
+def test_conversions():
+    result=METRICS["adjspf"](output="results")
+    assert result.to_list()[0]==result.names
+    records=result.to_records()
+    assert records.shape==(4,)
+    np.testing.assert_array_equal(records["adjSPF"],result["adjSPF"])
+    assert pp.as_results(None) is None
+    assert pp.as_results(result) is result
+    with pytest.raises(ValueError):
+        pp.Results({"a":np.zeros(3),"b":np.zeros(4)})
+
+@pytest.mark.parametrize("mmap",[None,False])
+def test_save_and_load(tmp_path,mmap):
+    result=METRICS["iso24443"](output="results")
+    result.save(tmp_path/"results")
+    loaded=pp.Results.load(tmp_path/"results",mmap=mmap)
+    assert loaded.names==result.names and loaded.shape==result.shape
+    for name in result:
+        np.testing.assert_array_equal(loaded[name],result[name])
+        assert loaded[name].dtype==result[name].dtype
+    assert pp.Results.load(tmp_path/"nothing") is None
+
+def test_single_treatment_row():
+    result=pp.as_results([["C","adjSPF"],[0.5,2.0]])
+    assert result.names==["C","adjSPF"]
+    assert result.shape==() and result["C"]==0.5 and result["adjSPF"]==2.0
+
+def test_tuple_columns():
+    C=np.array([0.4,0.5,0.6])
+    SPF=np.array([2.0,2.1,2.2])
+    result=pp.as_results((C,SPF))
+    assert result.names==["result0","result1"]
+    np.testing.assert_array_equal(result["result1"],SPF)
+    assert pp.as_results((C,SPF),["C","adjSPF"]).names==["C","adjSPF"]
+
+def test_scalar_stays_scalar():
+    result=pp.as_results(3.5)
+    assert result["result"].shape==() and result.shape==() and len(result)==1
+
+def test_mask_report():
+    bad=DATA.copy()
+    bad[60,2]=np.nan
+    result=pp.as_results(pp.ispf(bad,errors="mask",axis=0))
+    assert result.names==["result","failed","flags","reasons"]
+    np.testing.assert_array_equal(result["failed"],[False,False,True,False])
@@ -0,0 +1,30 @@
+import numpy as np
+import pytest
+import photoprotectionpy as pp
+
+RNG=np.random.default_rng(17)
+COMPONENTS=RNG.uniform(0.0,0.4,(111,3))
+CONCENTRATIONS=RNG.uniform(0,3,(50,3))
+MIXED=COMPONENTS@CONCENTRATIONS.T
+
+@pytest.mark.parametrize("integration",["trapz","simpson"])
+def test_scores(integration):
+    result=pp.screen(COMPONENTS,CONCENTRATIONS,integration,chunk=16)
+    assert result[0]==["index","SPF","UVAPF","UVAPF/SPF","CW"]
+    np.testing.assert_array_equal(result[1],np.arange(50))
+    spf=pp.ispf(MIXED,integration,axis=0)
+    uvapf=pp.uvapf(MIXED,1.0,integration,axis=0)
+    np.testing.assert_allclose(result[2],spf,rtol=1e-10)
+    np.testing.assert_allclose(result[3],uvapf,rtol=1e-10)
+    np.testing.assert_allclose(result[4],uvapf/spf,rtol=1e-10)
+    np.testing.assert_array_equal(result[5],pp.criticalwave(MIXED,integration,axis=0))
+
+def test_constraints_and_top():
+    spf=pp.ispf(MIXED,axis=0)
+    cw=pp.criticalwave(MIXED,axis=0)
+    low=np.median(spf)
+    passed=np.flatnonzero((spf>=low) & (cw>=cw.min()+1))
+    result=pp.screen(COMPONENTS,CONCENTRATIONS,constraints={"spf":(low,None),"cw":(cw.min()+1,None)},chunk=7)
+    np.testing.assert_array_equal(result[1],passed)
+    best=pp.screen(COMPONENTS,CONCENTRATIONS,constraints={"spf":(low,None),"cw":(cw.min()+1,None)},top=3,chunk=7)
+    np.testing.assert_array_equal(best[1],passed[np.argsort(-spf[passed])[:3]])
@@ -0,0 +1,101 @@
+import asyncio
+import json
+import numpy as np
+import pytest
+import photoprotectionpy as pp
+from photoprotectionpy.service import Service
+
+SPECTRA=np.random.default_rng(21).uniform(0.05,1.2,(111,6))
+# A missing reading (null) is read as NaN.
+MISSING=[0.5]*111
+MISSING[50]=None
+
+def test_requests_are_batched():
+    async def run():
+        service=Service(window=0.05)
+        spf=await asyncio.gather(*[service.evaluate("ispf",SPECTRA[:,i]) for i in range(6)])
+        adjusted=await asyncio.gather(*[service.evaluate("adjspf",SPECTRA[:,i].tolist(),target=3.0)
+                                        for i in range(6)])
+        return service,spf,adjusted
+    service,spf,adjusted=asyncio.run(run())
+    np.testing.assert_allclose([result["SPF"] for result in spf],pp.ispf(SPECTRA,axis=0),rtol=1e-12)
+    expected=pp.adjspf(SPECTRA,"all",3.0,solver="newton",full_output=True,axis=0)
+    np.testing.assert_allclose([result["C"] for result in adjusted],expected[1],rtol=1e-12)
+    metrics=service.metrics()
+    assert metrics["requests"]==12 and metrics["batches"]==2 and metrics["max_batch_size"]==6
+    assert metrics["queue_depth"]==0
+
+def test_invalid_requests():
+    async def run():
+        service=Service()
+        for operation,data,request in [("spf",SPECTRA[:,0],{}),("uvapf",SPECTRA[:,0],{}),
+                                       ("ispf",SPECTRA[:50,0],{}),("ispf",["a"]*111,{}),
+                                       ("ispf",SPECTRA[:,0],{"integration":"midpoint"})]:
+            with pytest.raises(ValueError):
+                await service.evaluate(operation,data,**request)
+        return service
+    assert asyncio.run(run()).metrics()["requests"]==0
+
+def strict(name):
+    raise ValueError("%s is not valid JSON"%name)
+
+async def exchange(requests):
+    server=await Service().start(port=0)
+    async with server:
+        reader,writer=await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+        responses=[]
+        # Several requests over one kept-alive connection.
+        for method,operation,body in requests:
+            payload=json.dumps(body).encode() if body is not None else b""
+            writer.write(b"%s /%s HTTP/1.1\r\nContent-Length: %d\r\n\r\n"
+                         %(method.encode(),operation.encode(),len(payload))+payload)
+            status=await reader.readline()
+            length=0
+            while True:
+                header=await reader.readline()
+                if header==b"\r\n":
+                    break
+                name,_,value=header.decode().partition(":")
+                if name.lower()=="content-length":
+                    length=int(value)
+            responses.append((int(status.split()[1]),json.loads(await reader.readexactly(length),parse_constant=strict)))
+        writer.close()
+    return responses
+
+def test_http():
+    responses=asyncio.run(exchange([
+        ("POST","ispf",{"data":SPECTRA[:,0].tolist()}),
+        ("POST","uvapf",{"data":SPECTRA[:,1].tolist(),"C":0.8}),
+        ("POST","ispf",{"data":[1.0]*10}),
+        ("POST","nothing",{}),
+        ("GET","ispf",None),
+        ("GET","metrics",None),
+    ]))
+    assert [status for status,body in responses]==[200,200,400,404,405,200]
+    np.testing.assert_allclose(responses[0][1]["SPF"],pp.ispf(SPECTRA[:,0])[0],rtol=1e-12)
+    np.testing.assert_allclose(responses[1][1]["UVAPF"],pp.uvapf(SPECTRA[:,1],0.8,axis=0),rtol=1e-12)
+    assert responses[5][1]["requests"]==2
+
+@pytest.mark.parametrize("length",[b"ten",b"-1"])
+def test_invalid_content_length(length):
+    async def send():
+        server=await Service().start(port=0)
+        async with server:
+            reader,writer=await asyncio.open_connection(*server.sockets[0].getsockname()[:2])
+            writer.write(b"POST /ispf HTTP/1.1\r\nContent-Length: %s\r\n\r\n{}"%length)
+            response=await reader.read()
+            writer.close()
+        return response
+    response=asyncio.run(send())
+    assert response.startswith(b"HTTP/1.1 400 ")
+    assert json.loads(response.partition(b"\r\n\r\n")[2])=={"error":"Invalid Content-Length"}
+
+@pytest.mark.parametrize("operation,request_values,name",[
+    ("ispf",{},"SPF"),
+    ("uvapf",{"C":1.0},"UVAPF"),
+    ("adjspf",{"target":3.0},"adjSPF"),
+    ("criticalwave",{"interpolate":True},"CW"),
+])
+def test_non_finite_values_are_null(operation,request_values,name):
+    status,body=asyncio.run(exchange([("POST",operation,dict(data=MISSING,**request_values))]))[0]
+    assert status==200 and body[name] is None
@@ -0,0 +1,49 @@
+"""
+The Newton and bisection searches for C against the original step
+walk of adjspf.
+"""
+import numpy as np
+import pytest
+import photoprotectionpy as pp
+
+DATA=np.random.default_rng(1).uniform(0.05,1.2,(111,5))
+TARGETS=[2.0,2.5,3.0,1.5,4.0]
+DL=1e-4
+
+@pytest.mark.parametrize("integration",["trapz","simpson"])
+@pytest.mark.parametrize("solver",["newton","bisect"])
+def test_against_step(solver,integration):
+    step=np.array(pp.adjspf(DATA,"calc",TARGETS,parameters=[DL,40000],integration=integration))
+    C,spf,converged,n=pp.adjspf(DATA,"all",TARGETS,integration=integration,solver=solver,full_output=True)[1:]
+    assert all(converged)
+    # The step walk returns the first multiple of dl past the root, plus dl.
+    np.testing.assert_array_less(C,step-DL+1e-9)
+    np.testing.assert_array_less(step-2*DL-1e-9,C)
+    np.testing.assert_allclose(spf,TARGETS,atol=1e-6)
+
+@pytest.mark.parametrize("integration",["trapz","simpson"])
+def test_targets_below_unadjusted(integration):
+    # SPF(C=0) is 1; the step walk cannot go below C=0.
+    targets=[0.5,0.8,0.99]
+    step=pp.adjspf(DATA[:,:3],"calc",targets,parameters=[DL,1000],integration=integration,full_output=True)
+    np.testing.assert_allclose(step[1],DL)
+    results=[pp.adjspf(DATA[:,:3],"all",targets,integration=integration,solver=solver,full_output=True)
+             for solver in ("newton","bisect")]
+    for C,spf,converged,n in (result[1:] for result in results):
+        assert all(converged) and all(np.asarray(C)<0)
+        np.testing.assert_allclose(spf,targets,atol=1e-6)
+    np.testing.assert_allclose(results[0][1],results[1][1],atol=1e-6)
+
+@pytest.mark.filterwarnings("error")
+@pytest.mark.parametrize("solver",["newton","bisect"])
+def test_unreachable_targets(solver):
+    # An all-zero spectrum keeps SPF at 1 for every C, and no C gives
+    # an SPF of 0 (which the step walk takes as reached at C=0).
+    data=DATA[:,:3].copy()
+    data[:,0]=0
+    targets=[2.0,2.0,0.0]
+    step=pp.adjspf(data[:,:2],"calc",targets[:2],parameters=[DL,40000],full_output=True)
+    C,converged,n=pp.adjspf(data,"calc",targets,solver=solver,full_output=True)[1:]
+    np.testing.assert_array_equal(step[2],[False,True])
+    np.testing.assert_array_equal(converged,[False,True,False])
+    assert step[1][1]-2*DL<C[1]<step[1][1]
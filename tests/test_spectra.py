@@ -0,0 +1,56 @@
+import numpy as np
+import pytest
+import photoprotectionpy as pp
+from photoprotectionpy import _kernels
+
+DATA=np.random.default_rng(22).uniform(0.05,1.2,(111,4))
+
+@pytest.fixture
+def copies():
+    keys=[pp.register_spectrum("erythema-copy",_kernels.erythema,_kernels.uv_ssr),
+          pp.register_spectrum("ppd-copy",_kernels.ppd*_kernels.uva_source,kind="uvapf")]
+    yield keys
+    for key in keys:
+        if key in _kernels.registered:
+            pp.unregister_spectrum(key)
+
+def test_copies_of_the_tables_give_the_same_results(copies):
+    assert copies==["erythema-copy","ppd-copy"]
+    for integration in ("trapz","simpson"):
+        np.testing.assert_allclose(pp.ispf(DATA,integration,axis=0,spectrum="erythema-copy"),
+                                   pp.ispf(DATA,integration,axis=0),rtol=1e-12)
+        np.testing.assert_allclose(pp.uvapf(DATA,0.9,integration,axis=0,spectrum="ppd-copy"),
+                                   pp.uvapf(DATA,0.9,integration,axis=0),rtol=1e-12)
+        np.testing.assert_allclose(pp.ispf(DATA.astype(np.float32),integration,axis=0,spectrum="erythema-copy"),
+                                   pp.ispf(DATA.astype(np.float32),integration,axis=0),rtol=1e-5)
+    expected=pp.adjspf(DATA,"all",3,solver="newton",full_output=True,axis=0)
+    adjusted=pp.adjspf(DATA,"all",3,solver="newton",full_output=True,axis=0,spectrum="erythema-copy")
+    np.testing.assert_allclose(adjusted[1],expected[1],rtol=1e-9)
+
+def test_register_and_unregister(copies,capsys):
+    listed=pp.list_spectra()
+    assert listed[1]==["spf","uvapf","erythema-copy","ppd-copy"]
+    assert listed[2]==["spf","uvapf","spf","uvapf"]
+    # An existing key is only replaced when asked to.
+    assert pp.register_spectrum("erythema-copy",_kernels.erythema) is None
+    assert pp.register_spectrum("erythema-copy",_kernels.erythema,replace=True)=="erythema-copy"
+    assert pp.register_spectrum("spf",_kernels.erythema) is None
+    pp.unregister_spectrum("erythema-copy")
+    assert "erythema-copy" not in pp.list_spectra()[1]
+    capsys.readouterr()
+    assert pp.ispf(DATA,axis=0,spectrum="erythema-copy") is None
+    assert capsys.readouterr().out
+    pp.unregister_spectrum("spf")
+    assert "Unknown spectrum" in capsys.readouterr().out
+
+def test_resampled_and_invalid(capsys):
+    grid=np.arange(290,400.5,0.5)
+    effect=np.interp(grid,_kernels.wavelengths,_kernels.effects["spf"])
+    try:
+        assert pp.register_spectrum("half-nm",effect*7,wavelengths=grid)=="half-nm"
+        np.testing.assert_allclose(pp.ispf(DATA,axis=0,spectrum="half-nm"),pp.ispf(DATA,axis=0),rtol=1e-12)
+    finally:
+        pp.unregister_spectrum("half-nm")
+    assert pp.register_spectrum("short",np.ones(100)) is None
+    assert pp.register_spectrum("negative",-np.ones(111)) is None
+    assert pp.register_spectrum("kind",np.ones(111),kind="uvb") is None
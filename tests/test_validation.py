@@ -0,0 +1,96 @@
+"""
+errors="mask": failed treatments give NaN (or the -1 CW sentinel) in
+place, the others the values of an unmasked evaluation.
+"""
+import numpy as np
+import pytest
+import photoprotectionpy as pp
+
+DATA=np.random.default_rng(3).uniform(0.05,1.2,(111,6))
+BAD=DATA.copy()
+BAD[60,1]=np.nan
+BAD[50,4]=-1.0
+FAILED=np.array([False,True,False,False,True,False])
+
+# name: (call on data, whether gradient is supported)
+METRICS={
+    "ispf":(lambda data,**kwargs:pp.ispf(data,**kwargs),True),
+    "uvapf":(lambda data,**kwargs:pp.uvapf(data,np.full(data.shape[1],0.9),**kwargs),True),
+    "adjspf-adj":(lambda data,**kwargs:pp.adjspf(data,"adj",np.full(data.shape[1],0.9),**kwargs),True),
+    "adjspf-calc":(lambda data,**kwargs:pp.adjspf(data,"calc",np.full(data.shape[1],3),solver="newton",**kwargs),
+                   False),
+    "adjspf-all":(lambda data,**kwargs:pp.adjspf(data,"all",np.full(data.shape[1],3),solver="newton",**kwargs),
+                  False),
+    "criticalwave":(lambda data,**kwargs:pp.criticalwave(data,**kwargs),False),
+    "iso24443":(lambda data,**kwargs:pp.iso24443(data,data,3,solver="newton",**kwargs),False),
+}
+
+def columns(result):
+    """
+    The per-treatment arrays of a result, without header or dA.
+    """
+    if isinstance(result,list) and isinstance(result[0],list):
+        return [np.asarray(column) for name,column in zip(result[0],result[1:]) if not name.endswith("/dA")]
+    return [np.asarray(result)]
+
+def check(result,expected):
+    for column,expected_column in zip(columns(result),columns(expected)):
+        assert column.shape==(6,)
+        if column.dtype.kind=="f":
+            assert np.isnan(column[FAILED]).all()
+        else:
+            assert (column[FAILED]<=0).all()
+        np.testing.assert_allclose(column[~FAILED].astype(float),expected_column.astype(float),rtol=1e-9)
+
+def test_validate():
+    data=DATA.copy()
+    data[10,0]=np.inf
+    data[20,2]=7.0
+    data[30,3]=np.nan
+    data[31,3]=-0.5
+    report=pp.validate(data,[1,1,1,1,0,np.nan])
+    assert report[0]==["failed","flags","reasons"]
+    np.testing.assert_array_equal(report[1],[True,False,True,True,True,True])
+    np.testing.assert_array_equal(report[2],[pp.validation.INFINITE,0,pp.validation.SATURATED,
+                                             pp.validation.NAN|pp.validation.NEGATIVE,
+                                             pp.validation.VALUE,pp.validation.VALUE])
+    assert list(report[3])==["inf","","saturated","nan, negative","invalid value","invalid value"]
+    assert not pp.validate(data,saturation=10)[1][2]
+
+@pytest.mark.parametrize("gradient",[False,True])
+@pytest.mark.parametrize("axis",[None,0])
+@pytest.mark.parametrize("metric",list(METRICS))
+def test_mask(metric,axis,gradient):
+    function,supports_gradient=METRICS[metric]
+    if gradient and not supports_gradient:
+        pytest.skip("no gradient")
+    kwargs={"axis":axis}
+    if gradient:
+        kwargs["gradient"]=True
+    result,report=function(BAD,errors="mask",**kwargs)
+    np.testing.assert_array_equal(report[1],FAILED)
+    check(result,function(DATA[:,~FAILED],**kwargs))
+
+@pytest.mark.parametrize("metric",list(METRICS))
+def test_raise(metric):
+    with pytest.raises(pp.ColumnError) as error:
+        METRICS[metric][0](BAD,errors="raise")
+    np.testing.assert_array_equal(error.value.report[1],FAILED)
+    with pytest.raises(pp.ShapeError):
+        METRICS[metric][0](DATA[:100],errors="raise")
+
+def test_raise_options():
+    with pytest.raises(pp.OptionError):
+        pp.ispf(DATA,"midpoint",errors="raise")
+    with pytest.raises(pp.OptionError):
+        pp.adjspf(DATA,"all",3,solver="secant",errors="raise")
+    assert issubclass(pp.ValidationError,ValueError)
+    # The default keeps printing and returning None.
+    assert pp.ispf(DATA,"midpoint") is None
+
+@pytest.mark.parametrize("gradient",[False,True])
+@pytest.mark.parametrize("metric",["ispf","uvapf","adjspf-adj"])
+def test_mask_results(metric,gradient):
+    result=METRICS[metric][0](BAD,errors="mask",gradient=gradient,output="results")
+    np.testing.assert_array_equal(result["failed"],FAILED)
+    check([result.names]+list(result.columns.values())[:-3],METRICS[metric][0](DATA[:,~FAILED],axis=0,gradient=gradient))
@@ -0,0 +1,40 @@
+"""
+Spectra read on other wavelength grids, resampled through the cached
+interpolation matrices.
+"""
+import numpy as np
+import pytest
+import photoprotectionpy as pp
+from photoprotectionpy import _kernels
+
+RNG=np.random.default_rng(16)
+GRIDS={
+    "0.5nm":np.arange(280,410.5,0.5),
+    "2nm":np.arange(290,401,2.0),
+    "5nm-descending":np.arange(405,284,-5.0),
+    "uneven":np.concatenate([[285],np.sort(RNG.uniform(286,404,70)),[405]]),
+}
+
+@pytest.mark.parametrize("grid",list(GRIDS.values()),ids=list(GRIDS))
+def test_matches_interp(grid):
+    data=RNG.uniform(0.05,1.2,(grid.size,3))
+    order=np.argsort(grid)
+    expected=np.stack([np.interp(np.arange(290,401),grid[order],column[order]) for column in data.T],axis=-1)
+    np.testing.assert_allclose(_kernels.resample(data,grid),expected,rtol=1e-12,atol=1e-15)
+    np.testing.assert_allclose(pp.ispf(data,axis=0,wavelengths=grid),pp.ispf(expected,axis=0),rtol=1e-12)
+    np.testing.assert_array_equal(pp.criticalwave(data.T,axis=1,wavelengths=grid),pp.criticalwave(expected,axis=0))
+
+def test_matrix_is_cached():
+    grid=GRIDS["2nm"]
+    _kernels.resample(np.ones((grid.size,2)),grid)
+    hits=_kernels._resampling.cache_info().hits
+    _kernels.resample(np.ones((grid.size,4)),grid.tolist())
+    assert _kernels._resampling.cache_info().hits==hits+1
+
+def test_reference_grid_is_unchanged():
+    data=RNG.uniform(0.05,1.2,(111,2))
+    assert _kernels.resample(data,np.arange(290,401)) is data
+
+def test_invalid_grid(capsys):
+    assert pp.ispf(np.ones((50,2)),wavelengths=np.linspace(300,400,50),axis=0) is None
+    assert "290 to 400" in capsys.readouterr().out
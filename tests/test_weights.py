@@ -0,0 +1,34 @@
+import os
+import subprocess
+import sys
+import numpy as np
+import pytest
+from photoprotectionpy import _kernels
+
+@pytest.mark.parametrize("n",range(3,112))
+def test_exact_polynomials(n):
+    x=np.arange(n)
+    np.testing.assert_allclose(_kernels.weights("trapz",n)@(2*x+1),(n-1)**2+(n-1),rtol=1e-12)
+    # Composite Simpson, and the quadratic correction of its last interval
+    # for an even number of readings, are exact for quadratics.
+    np.testing.assert_allclose(_kernels.weights("simpson",n)@(x**2),(n-1)**3/3,rtol=1e-12)
+    if n%2:
+        np.testing.assert_allclose(_kernels.weights("simpson",n)@(x**3),(n-1)**4/4,rtol=1e-12)
+
+def test_no_scipy():
+    code="import sys, photoprotectionpy; print(sorted({name.split('.')[0] for name in sys.modules} & {'scipy'}))"
+    environment=dict(os.environ,PYTHONPATH=os.pathsep.join(sys.path))
+    result=subprocess.run([sys.executable,"-c",code],capture_output=True,text=True,check=True,env=environment)
+    assert result.stdout.strip()=="[]"
+
+def test_lazy_exports():
+    # Only the metrics are imported with the package; the other exports
+    # load their module on first use.
+    code=("import sys, photoprotectionpy as pp; lazy=['archive','dataset','reader','screening','spectra'];"
+          "print([name for name in lazy if 'photoprotectionpy.'+name in sys.modules]);"
+          "print(pp.Dataset.__module__, pp.archive_open.__module__, 'read_chunks' in dir(pp));"
+          "from photoprotectionpy import *; print(screen.__module__)")
+    environment=dict(os.environ,PYTHONPATH=os.pathsep.join(sys.path))
+    result=subprocess.run([sys.executable,"-c",code],capture_output=True,text=True,check=True,env=environment)
+    assert result.stdout.split("\n")[:3]==["[]","photoprotectionpy.dataset photoprotectionpy.archive True",
+                                           "photoprotectionpy.screening"]